@@ -1,8 +1,13 @@
 from django.contrib import admin
+
+from awasarhub.admin_tools import LargeTableAdmin
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = ("id", "username", "email", "city", "streak_count")
-    search_fields = ("username", "email", "city")
+    # Both columns are indexed; prefix/exact lookups keep searches off a sequential scan.
+    search_fields = ("username__startswith", "email__exact")
+    search_help_text = "Username prefix or exact email"
+    date_hierarchy = "date_joined"
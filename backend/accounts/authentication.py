@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserRowCache:
+    """Per-process LRU of user rows with a TTL, keyed by the JWT user id claim.
+
+    Rows are stored as raw field values and a fresh ``User`` is built on every hit,
+    so requests never share a mutable instance. Every invalidation bumps a
+    generation; a ``put`` of a row read before that is dropped, so a lookup
+    racing a change cannot cache the old row.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def generation(self) -> int:
+        """Pass to ``put`` for a row read after this call."""
+        return self._generation
+
+    def get(self, model, key):
+        # Token claims may carry the id as a string while signals see the integer pk.
+        key = str(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rows.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._rows[key]
+                self.misses += 1
+                return None
+            self._rows.move_to_end(key)
+            self.hits += 1
+            values = entry[1]
+        return model.from_db("default", None, values)
+
+    def put(self, key, user, generation=None):
+        key = str(key)
+        values = tuple(getattr(user, f.attname) for f in user._meta.concrete_fields)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._rows[key] = (time.monotonic() + self.ttl, values)
+            self._rows.move_to_end(key)
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+
+    def invalidate(self, key):
+        key = str(key)
+        with self._lock:
+            self._generation += 1
+            self._rows.pop(key, None)
+
+    def forget(self, keys, using=None):
+        """Invalidate ``keys`` now and again once the current transaction commits.
+
+        A lookup between the change and the commit still reads the old row, which
+        the second pass removes.
+        """
+        keys = [str(key) for key in keys]
+
+        def drop():
+            with self._lock:
+                self._generation += 1
+                for key in keys:
+                    self._rows.pop(key, None)
+
+        drop()
+        transaction.on_commit(drop, using=using)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._rows.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._rows),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+user_cache = UserRowCache(
+    maxsize=getattr(settings, "AUTH_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that resolves the user from ``user_cache`` before the database."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = user_cache.get(self.user_model, user_id)
+        if user is None:
+            generation = user_cache.generation()
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.put(user_id, user, generation)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+            from rest_framework_simplejwt.utils import get_md5_hash_password
+
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,182 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+AVATAR_SIZES = (512, 128, 64)
+UPLOADS_DIR = "avatars/uploads"
+AVATAR_FORMATS = (("jpg", "JPEG", {"quality": 85, "optimize": True}), ("webp", "WEBP", {"quality": 80, "method": 4}))
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarBusy(Exception):
+    pass
+
+
+_executor = None
+_slots = None
+_init_lock = threading.Lock()
+
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                workers = getattr(settings, "AVATAR_WORKERS", 2)
+                queue = getattr(settings, "AVATAR_QUEUE_SIZE", 8)
+                _slots = threading.BoundedSemaphore(workers + queue)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="avatar")
+    return _executor, _slots
+
+
+def rendition_name(digest: str, size: int, ext: str) -> str:
+    return f"avatars/{digest}_{size}.{ext}"
+
+
+def renditions(digest: str) -> Dict[str, str]:
+    return {f"{size}.{ext}": rendition_name(digest, size, ext) for size in AVATAR_SIZES for ext, _, _ in AVATAR_FORMATS}
+
+
+def render(data: bytes) -> Dict[Tuple[int, str], bytes]:
+    """Decode once and encode every (size, extension) rendition, largest first."""
+    # Imported here so web workers do not pay for Pillow at boot.
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG can decode straight to a 1/2, 1/4 or 1/8 scale, which skips most of the IDCT work.
+    image.draft("RGB", (AVATAR_SIZES[0], AVATAR_SIZES[0]))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+
+    output = {}
+    for size in AVATAR_SIZES:
+        # Each rendition is downscaled from the previous, larger one rather than from the source.
+        image.thumbnail((size, size), Image.LANCZOS)
+        for ext, fmt, options in AVATAR_FORMATS:
+            buf = io.BytesIO()
+            image.save(buf, format=fmt, **options)
+            output[(size, ext)] = buf.getvalue()
+    return output
+
+
+def _store(name: str, content: bytes):
+    """Save ``content`` under exactly ``name``.
+
+    Storage renames on a clash instead of failing. Names are content hashes,
+    so a clash means a concurrent upload of the same image already wrote
+    identical bytes, and the renamed copy is dropped.
+    """
+    saved = default_storage.save(name, ContentFile(content))
+    if saved != name:
+        default_storage.delete(saved)
+
+
+def _process(data: bytes, digest: str) -> str:
+    primary = rendition_name(digest, AVATAR_SIZES[0], AVATAR_FORMATS[0][0])
+    if default_storage.exists(primary):
+        return primary
+    output = render(data)
+    # The primary goes last: once it exists, every rendition does.
+    for size, ext in sorted(output, key=lambda key: key == (AVATAR_SIZES[0], AVATAR_FORMATS[0][0])):
+        name = rendition_name(digest, size, ext)
+        if not default_storage.exists(name):
+            _store(name, output[(size, ext)])
+    return primary
+
+
+def assign(user_id: int, path: str, media_base: str):
+    """Point the user's avatar at ``path``; ``media_base`` is the absolute MEDIA_URL."""
+    from .models import User
+
+    User.objects.filter(pk=user_id).update(avatar_image=path, avatar=media_base + path.replace("\\", "/"))
+
+
+def _process_and_assign(data: bytes, digest: str, user_id: int, media_base: str):
+    from django.db import connection
+
+    try:
+        assign(user_id, _process(data, digest), media_base)
+    finally:
+        # Executor threads outlive requests, so nothing else closes their connection.
+        connection.close()
+
+
+def _done(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Avatar rendering failed; the previous avatar is kept", exc_info=future.exception())
+
+
+def process_upload(file, user_id: int, media_base: str) -> Tuple[str, str, bool]:
+    """Render all renditions of an uploaded avatar in the background executor.
+
+    Returns (digest, primary path, queued) without waiting for the renders;
+    ``queued`` is False when the renditions already exist. The user's avatar
+    is switched once the renditions are stored (at once if they already
+    exist), so a failed render leaves the previous one in place. Files are
+    named by a hash of the upload, so re-uploading the same image is free.
+    The image header is checked inline, and ``AvatarBusy`` is raised when
+    the bounded executor has no room left.
+    """
+    from PIL import Image
+
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    primary = rendition_name(digest, AVATAR_SIZES[0], AVATAR_FORMATS[0][0])
+    if default_storage.exists(primary):
+        assign(user_id, primary, media_base)
+        return digest, primary, False
+    Image.open(io.BytesIO(data)).verify()
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise AvatarBusy()
+    try:
+        future = executor.submit(_process_and_assign, data, digest, user_id, media_base)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    future.add_done_callback(_done)
+    return digest, primary, True
+
+
+def defer_upload(file, user_id: int, media_base: str) -> Tuple[str, str, bool]:
+    """Like ``process_upload``, but only store the original and queue the renditions.
+
+    Returns (digest, primary path, queued); ``queued`` is False when the
+    renditions already exist. The image header is still checked inline, so
+    an unreadable upload is rejected straight away. The task switches the
+    user's avatar after rendering.
+    """
+    from PIL import Image
+
+    from . import tasks
+
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    primary = rendition_name(digest, AVATAR_SIZES[0], AVATAR_FORMATS[0][0])
+    if default_storage.exists(primary):
+        assign(user_id, primary, media_base)
+        return digest, primary, False
+    Image.open(io.BytesIO(data)).verify()
+    # The source keeps whatever name storage picks; the task is told which one.
+    source = default_storage.save(f"{UPLOADS_DIR}/{digest}", ContentFile(data))
+    tasks.render_avatar.enqueue({"source": source, "digest": digest, "user_id": user_id, "media_base": media_base})
+    return digest, primary, True
+
+
+def render_stored(source: str, digest: str, user_id: Optional[int] = None, media_base: str = ""):
+    """Render the renditions of an upload saved by ``defer_upload``, switch the avatar, then drop the original."""
+    if default_storage.exists(source):
+        with default_storage.open(source, "rb") as fh:
+            data = fh.read()
+        primary = _process(data, digest)
+        if user_id is not None:
+            assign(user_id, primary, media_base)
+        default_storage.delete(source)
@@ -0,0 +1,227 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+
+class CSR:
+    """Compressed sparse row adjacency: row ``i`` is ``indices[indptr[i]:indptr[i + 1]]``."""
+
+    __slots__ = ("indptr", "indices")
+
+    def __init__(self, n: int, pairs: List[Tuple[int, int]]):
+        # ``pairs`` are (row index, user id) and must already be sorted by row.
+        counts = [0] * (n + 1)
+        for row, _ in pairs:
+            counts[row + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.indptr = array("q", counts)
+        self.indices = array("q", [uid for _, uid in pairs])
+
+    def row(self, i: Optional[int]):
+        if i is None:
+            return ()
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+
+class FollowGraph:
+    """Immutable CSR snapshot of ``Connection`` plus a small mutable delta overlay."""
+
+    def __init__(self, edges: Iterable[Tuple[int, int]], profiles: Dict[int, Tuple[str, frozenset]]):
+        self.profiles = dict(profiles)
+        self.index = {uid: i for i, uid in enumerate(sorted(self.profiles))}
+        out_pairs = []
+        in_pairs = []
+        for follower, following in edges:
+            if follower in self.index and following in self.index:
+                out_pairs.append((self.index[follower], following))
+                in_pairs.append((self.index[following], follower))
+        out_pairs.sort()
+        in_pairs.sort()
+        self.out = CSR(len(self.index), out_pairs)
+        self.inn = CSR(len(self.index), in_pairs)
+        self.edge_count = len(out_pairs)
+        self.built_at = time.monotonic()
+        # The overlay is copy-on-write so readers never see a set change size mid-iteration.
+        self._added_out: Dict[int, frozenset] = {}
+        self._added_in: Dict[int, frozenset] = {}
+        self._removed: frozenset = frozenset()
+        self._write_lock = threading.Lock()
+        self.delta_count = 0
+        # While a replacement is being built, changes are also logged here to be replayed onto it.
+        self.journal: Optional[List[Tuple[str, tuple]]] = None
+
+    def _log(self, op: str, *args):
+        if self.journal is not None:
+            self.journal.append((op, args))
+
+    def following(self, uid: int) -> Set[int]:
+        base = self.out.row(self.index.get(uid))
+        removed = self._removed
+        if removed:
+            result = {v for v in base if (uid, v) not in removed}
+        else:
+            result = set(base)
+        added = self._added_out.get(uid)
+        if added:
+            result |= added
+        return result
+
+    def followers(self, uid: int) -> Set[int]:
+        base = self.inn.row(self.index.get(uid))
+        removed = self._removed
+        if removed:
+            result = {v for v in base if (v, uid) not in removed}
+        else:
+            result = set(base)
+        added = self._added_in.get(uid)
+        if added:
+            result |= added
+        return result
+
+    def neighbours(self, uid: int) -> Set[int]:
+        return self.following(uid) | self.followers(uid)
+
+    def degree(self, uid: int) -> int:
+        """Snapshot in + out degree, ignoring the overlay; cheap enough to sort by."""
+        i = self.index.get(uid)
+        if i is None:
+            return 0
+        return self.out.indptr[i + 1] - self.out.indptr[i] + self.inn.indptr[i + 1] - self.inn.indptr[i]
+
+    def follow(self, follower: int, following: int):
+        with self._write_lock:
+            self._removed = self._removed - {(follower, following)}
+            self._added_out[follower] = self._added_out.get(follower, frozenset()) | {following}
+            self._added_in[following] = self._added_in.get(following, frozenset()) | {follower}
+            self.delta_count += 1
+            self._log("follow", follower, following)
+
+    def unfollow(self, follower: int, following: int):
+        with self._write_lock:
+            self._removed = self._removed | {(follower, following)}
+            self._added_out[follower] = self._added_out.get(follower, frozenset()) - {following}
+            self._added_in[following] = self._added_in.get(following, frozenset()) - {follower}
+            self.delta_count += 1
+            self._log("unfollow", follower, following)
+
+    def set_profile(self, uid: int, city: str, interests):
+        with self._write_lock:
+            self.profiles[uid] = _profile(city, interests)
+            self._log("set_profile", uid, city, interests)
+
+    def drop_profile(self, uid: int):
+        with self._write_lock:
+            self.profiles.pop(uid, None)
+            self._log("drop_profile", uid)
+
+    def suggest(self, uid: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """Second-degree connections of ``uid`` as (user id, mutual count), best first.
+
+        Ranked by mutual connections, then shared interests, then same city.
+        Connections are expanded smallest first and only until
+        ``PYMK_MAX_FANOUT`` second-degree entries have been counted, so a user
+        connected to hubs costs a bounded amount of work.
+        """
+        followed = self.following(uid)
+        direct = followed | self.followers(uid)
+        budget = getattr(settings, "PYMK_MAX_FANOUT", 20000)
+        counts = Counter()
+        for v in sorted(direct, key=lambda v: (self.degree(v), v)):
+            if counts and self.degree(v) > budget:
+                break
+            neighbours = self.neighbours(v)
+            counts.update(neighbours)
+            budget -= len(neighbours)
+        for excluded in followed:
+            counts.pop(excluded, None)
+        counts.pop(uid, None)
+        if not counts:
+            return []
+
+        city, interests = self.profiles.get(uid, ("", frozenset()))
+        profiles = self.profiles
+
+        def key(entry):
+            cand, mutual, (ccity, cinterests) = entry
+            return (-mutual, -len(interests & cinterests), not (city and ccity == city), cand)
+
+        # Each profile is read once, so a concurrent drop_profile cannot remove it between check and use.
+        candidates = (
+            (cand, mutual, profile) for cand, mutual in counts.items() if (profile := profiles.get(cand)) is not None
+        )
+        return [(cand, mutual) for cand, mutual, _ in heapq.nsmallest(limit, candidates, key=key)]
+
+
+def _profile(city, interests) -> Tuple[str, frozenset]:
+    return ((city or "").strip().lower(), frozenset(str(i).lower() for i in (interests or [])))
+
+
+def build_graph() -> FollowGraph:
+    from .models import Connection, User
+
+    profiles = {
+        uid: _profile(city, interests)
+        for uid, city, interests in User.objects.filter(is_active=True).values_list("id", "city", "interests")
+    }
+    edges = Connection.objects.values_list("follower_id", "following_id").iterator(chunk_size=10000)
+    return FollowGraph(edges, profiles)
+
+
+_graph: Optional[FollowGraph] = None
+_lock = threading.Lock()
+# Held by the one thread rebuilding; others keep using the current snapshot meanwhile.
+_build_lock = threading.Lock()
+
+
+def _is_stale(graph: FollowGraph) -> bool:
+    ttl = getattr(settings, "PYMK_SNAPSHOT_TTL", 900)
+    max_delta = getattr(settings, "PYMK_MAX_DELTA", 10000)
+    return time.monotonic() - graph.built_at > ttl or graph.delta_count > max_delta
+
+
+def get_graph() -> FollowGraph:
+    global _graph
+    graph = _graph
+    if graph is not None and not _is_stale(graph):
+        return graph
+    # Without a snapshot there is nothing to serve, so wait for whoever is building it.
+    if not _build_lock.acquire(blocking=graph is None):
+        return graph
+    try:
+        current = _graph
+        if current is not None and not _is_stale(current):
+            return current
+        if current is not None:
+            with current._write_lock:
+                current.journal = []
+        fresh = build_graph()
+        with _lock:
+            current = _graph
+            if current is not None and current.journal is not None:
+                # Changes made while building may be missing from what build_graph read; applying
+                # them again is harmless.
+                with current._write_lock:
+                    for op, args in current.journal:
+                        getattr(fresh, op)(*args)
+                    current.journal = None
+            _graph = fresh
+        return fresh
+    finally:
+        _build_lock.release()
+
+
+def loaded_graph() -> Optional[FollowGraph]:
+    """The current snapshot if one was built in this process, without building it."""
+    return _graph
+
+
+def reset_graph():
+    global _graph
+    with _lock:
+        _graph = None
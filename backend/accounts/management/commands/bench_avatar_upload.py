@@ -0,0 +1,90 @@
+import io
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.avatars import _pool, render
+from accounts.models import User
+from accounts.views import AvatarUploadView
+
+
+def _sample_jpeg(width, height, seed=0):
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    image.paste((255, seed * 37 % 256, 0), (0, 0, 64, 64))
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def _legacy(data):
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    image.thumbnail((512, 512))
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Benchmark avatar decoding/encoding and the avatar upload endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--width", type=int, default=4000)
+        parser.add_argument("--height", type=int, default=3000)
+        parser.add_argument("--iterations", type=int, default=10)
+
+    def _report(self, label, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f"{label:<28} median {statistics.median(timings) * 1000:8.1f} ms   "
+            f"max {timings[-1] * 1000:8.1f} ms"
+        )
+
+    def handle(self, *args, **options):
+        width, height, n = options["width"], options["height"], options["iterations"]
+        data = _sample_jpeg(width, height)
+        self.stdout.write(f"Source: {width}x{height} JPEG, {len(data) / 1024:.0f} KiB, {n} iterations")
+
+        for label, fn in (("legacy (512 JPEG only)", _legacy), ("pipeline (6 renditions)", render)):
+            timings = []
+            for _ in range(n):
+                start = time.perf_counter()
+                fn(data)
+                timings.append(time.perf_counter() - start)
+            self._report(label, timings)
+
+        factory = APIRequestFactory()
+        view = AvatarUploadView.as_view()
+        timings = []
+        # The per-user upload rate limit would stop the run after a couple of requests.
+        admission = {**settings.ADMISSION_CONTROL, "upload": {**settings.ADMISSION_CONTROL["upload"], "rates": ()}}
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root, ADMISSION_CONTROL=admission):
+            with transaction.atomic():
+                user = User.objects.create(username="__bench_avatar__")
+                for i in range(n):
+                    upload = SimpleUploadedFile("a.jpg", _sample_jpeg(width, height, seed=i + 1), content_type="image/jpeg")
+                    request = factory.post("/api/auth/avatar/upload/", {"avatar": upload}, format="multipart")
+                    force_authenticate(request, user=user)
+                    start = time.perf_counter()
+                    response = view(request)
+                    timings.append(time.perf_counter() - start)
+                    if response.status_code not in (200, 202):
+                        self.stderr.write(f"Upload failed: {response.status_code} {response.content!r}")
+                        break
+                    # Renditions render after the response; wait for them so uploads do not overlap.
+                    _, slots = _pool()
+                    capacity = settings.AVATAR_WORKERS + settings.AVATAR_QUEUE_SIZE
+                    for _ in range(capacity):
+                        slots.acquire()
+                    for _ in range(capacity):
+                        slots.release()
+                transaction.set_rollback(True)
+        if timings:
+            self._report("upload endpoint (response)", timings)
@@ -0,0 +1,44 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from accounts.graph import FollowGraph, _profile
+
+
+class Command(BaseCommand):
+    help = "People-you-may-know suggestion benchmark on a synthetic graph with hubs, with and without the fan-out cap"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50000)
+        parser.add_argument("--follows", type=int, default=20, help="Follows per ordinary user")
+        parser.add_argument("--hubs", type=int, default=50, help="Users everyone tends to follow")
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        users, hubs = options["users"], options["hubs"]
+        cities = ["pune", "delhi", "mumbai", "kathmandu"]
+        topics = ["python", "design", "finance", "health", "law", "music"]
+        profiles = {uid: _profile(rng.choice(cities), rng.sample(topics, 2)) for uid in range(1, users + 1)}
+        edges = set()
+        for uid in range(1, users + 1):
+            for _ in range(options["follows"]):
+                # Half the follows go to a hub, so hubs end up with most of the graph behind them.
+                target = rng.randint(1, hubs) if rng.random() < 0.5 else rng.randint(1, users)
+                if target != uid:
+                    edges.add((uid, target))
+        start = time.perf_counter()
+        graph = FollowGraph(edges, profiles)
+        self.stdout.write(f"built {users} users / {graph.edge_count} edges in {time.perf_counter() - start:.2f}s")
+
+        sample = [rng.randint(1, users) for _ in range(options["requests"])]
+        for label, fanout in (("uncapped", 10 ** 12), ("capped", None)):
+            overrides = {} if fanout is None else {"PYMK_MAX_FANOUT": fanout}
+            with override_settings(**overrides):
+                start = time.perf_counter()
+                for uid in sample:
+                    graph.suggest(uid)
+                elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label:<9} {len(sample)} requests in {elapsed:6.2f}s  {elapsed / len(sample) * 1000:8.1f} ms/request")
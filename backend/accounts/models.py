@@ -1,7 +1,23 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as AuthUserManager
 from django.db import models
 
 
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # update() sends no post_save, so the cached rows behind JWT auth are dropped here.
+        from .authentication import user_cache
+
+        pks = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        user_cache.forget(pks, using=self.db)
+        return rows
+
+
+class UserManager(AuthUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     city = models.CharField(max_length=120, blank=True)
     country = models.CharField(max_length=120, blank=True)
@@ -15,6 +31,11 @@ class User(AbstractUser):
     streak_count = models.PositiveIntegerField(default=0)
     preferences = models.JSONField(default=dict, blank=True)
 
+    objects = UserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["email"]), models.Index(fields=["date_joined"])]
+
     def location_tuple(self):
         if self.latitude is not None and self.longitude is not None:
             return (self.latitude, self.longitude)
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import graph
+from .authentication import user_cache
+from .models import Connection, User
+
+
+@receiver(post_save, sender=Connection)
+def connection_saved(sender, instance, created, **kwargs):
+    g = graph.loaded_graph()
+    if g is not None and created:
+        g.follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Connection)
+def connection_deleted(sender, instance, **kwargs):
+    g = graph.loaded_graph()
+    if g is not None:
+        g.unfollow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, using, update_fields=None, **kwargs):
+    user_cache.forget([instance.pk], using=using)
+    g = graph.loaded_graph()
+    if g is None:
+        return
+    if not instance.is_active:
+        g.drop_profile(instance.pk)
+    elif update_fields is None or {"city", "interests", "is_active"} & set(update_fields):
+        g.set_profile(instance.pk, instance.city, instance.interests)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    user_cache.forget([instance.pk], using=using)
+    g = graph.loaded_graph()
+    if g is not None:
+        g.drop_profile(instance.pk)
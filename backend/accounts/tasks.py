@@ -0,0 +1,8 @@
+from taskqueue.queue import task
+
+from . import avatars
+
+
+@task(priority=10, max_attempts=3)
+def render_avatar(payload):
+    avatars.render_stored(payload["source"], payload["digest"], payload.get("user_id"), payload.get("media_base", ""))
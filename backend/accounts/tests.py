@@ -0,0 +1,185 @@
+import io
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts import avatars, graph
+from accounts.authentication import CachedJWTAuthentication, UserRowCache, user_cache
+from accounts.graph import FollowGraph, _profile
+from accounts.models import User
+
+
+def _jpeg(color=(200, 30, 30)):
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), color).save(buf, format="JPEG")
+    return SimpleUploadedFile("a.jpg", buf.getvalue(), content_type="image/jpeg")
+
+
+def _drain():
+    """Wait until the avatar executor has finished everything submitted so far."""
+    _, slots = avatars._pool()
+    capacity = settings.AVATAR_WORKERS + settings.AVATAR_QUEUE_SIZE
+    for _ in range(capacity):
+        slots.acquire()
+    for _ in range(capacity):
+        slots.release()
+
+
+class AvatarUploadTests(TransactionTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create(username="pic", avatar="http://testserver/media/old.jpg", avatar_image="old.jpg")
+
+    def test_avatar_switches_after_rendering(self):
+        digest, path, queued = avatars.process_upload(_jpeg(), self.user.id, "http://testserver/media/")
+        self.assertTrue(queued)
+        _drain()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_image.name, path)
+        self.assertEqual(self.user.avatar, f"http://testserver/media/{path}")
+        for name in avatars.renditions(digest).values():
+            self.assertTrue(avatars.default_storage.exists(name))
+
+    def test_failed_render_keeps_previous_avatar(self):
+        with mock.patch.object(avatars, "render", side_effect=OSError("corrupt")), self.assertLogs("accounts.avatars"):
+            avatars.process_upload(_jpeg(), self.user.id, "http://testserver/media/")
+            _drain()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.avatar_image.name, self.user.avatar), ("old.jpg", "http://testserver/media/old.jpg"))
+
+    def test_deferred_render_switches_avatar(self):
+        with mock.patch("accounts.tasks.render_avatar.enqueue") as enqueue:
+            digest, path, queued = avatars.defer_upload(_jpeg(), self.user.id, "http://testserver/media/")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_image.name, "old.jpg")
+        payload = enqueue.call_args.args[0]
+        avatars.render_stored(payload["source"], payload["digest"], payload["user_id"], payload["media_base"])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_image.name, path)
+
+
+def _graph(edges, cities=None):
+    profiles = {uid: _profile((cities or {}).get(uid, ""), []) for uid in range(1, 8)}
+    return FollowGraph(edges, profiles)
+
+
+class FollowGraphTests(SimpleTestCase):
+    def test_overlay_follow_and_unfollow(self):
+        g = _graph([(1, 2), (2, 3)])
+        g.follow(1, 4)
+        g.unfollow(1, 2)
+        self.assertEqual(g.following(1), {4})
+        self.assertEqual(g.followers(2), set())
+        self.assertEqual(g.followers(4), {1})
+        g.follow(1, 2)
+        self.assertEqual(g.following(1), {2, 4})
+        self.assertEqual(g.delta_count, 3)
+
+    def test_suggest_ranks_by_mutuals_then_city(self):
+        g = _graph([(1, 2), (1, 3), (2, 4), (3, 4), (2, 5), (3, 6)], cities={1: "Pune", 6: "pune"})
+        self.assertEqual(g.suggest(1), [(4, 2), (6, 1), (5, 1)])
+
+    def test_suggest_skips_followed_and_dropped_users(self):
+        g = _graph([(1, 2), (2, 3), (2, 4), (1, 4)])
+        g.drop_profile(3)
+        self.assertEqual(g.suggest(1), [])
+
+    @override_settings(PYMK_MAX_FANOUT=1)
+    def test_fanout_cap_expands_smallest_connections_first(self):
+        # 2 has a single neighbour besides 1; hub 3 has many and is skipped once the budget is spent.
+        g = _graph([(1, 2), (1, 3), (2, 4), (5, 3), (6, 3), (7, 3)])
+        self.assertEqual([cand for cand, _ in g.suggest(1)], [4])
+
+
+class GraphRebuildTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(graph.reset_graph)
+
+    def test_changes_during_rebuild_are_replayed(self):
+        old = _graph([(1, 2)])
+        old.built_at = time.monotonic() - 10 ** 6
+        graph._graph = old
+
+        def build():
+            # build_graph read the database before these landed.
+            old.follow(1, 3)
+            old.set_profile(5, "Delhi", ["law"])
+            old.drop_profile(6)
+            return _graph([(1, 2)])
+
+        with mock.patch.object(graph, "build_graph", side_effect=build):
+            fresh = graph.get_graph()
+        self.assertIsNot(fresh, old)
+        self.assertEqual(fresh.following(1), {2, 3})
+        self.assertEqual(fresh.profiles[5], ("delhi", frozenset({"law"})))
+        self.assertNotIn(6, fresh.profiles)
+        self.assertIsNone(old.journal)
+        self.assertIs(graph.get_graph(), fresh)
+
+
+class UserRowCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="cached", city="Pune")
+
+    def test_lru_and_ttl(self):
+        cache = UserRowCache(maxsize=2, ttl=60)
+        other = User.objects.create(username="other")
+        third = User.objects.create(username="third")
+        cache.put(self.user.pk, self.user)
+        cache.put(other.pk, other)
+        self.assertEqual(cache.get(User, str(self.user.pk)).username, "cached")
+        cache.put(third.pk, third)
+        # ``other`` was least recently used.
+        self.assertIsNone(cache.get(User, other.pk))
+        self.assertIsNotNone(cache.get(User, self.user.pk))
+        expired = UserRowCache(maxsize=2, ttl=-1)
+        expired.put(self.user.pk, self.user)
+        self.assertIsNone(expired.get(User, self.user.pk))
+
+    def test_hits_are_fresh_instances(self):
+        cache = UserRowCache(maxsize=2, ttl=60)
+        cache.put(self.user.pk, self.user)
+        first = cache.get(User, self.user.pk)
+        first.city = "changed"
+        self.assertEqual(cache.get(User, self.user.pk).city, "Pune")
+
+    def test_rows_read_before_an_invalidation_are_not_cached(self):
+        cache = UserRowCache(maxsize=2, ttl=60)
+        generation = cache.generation()
+        cache.invalidate(self.user.pk)
+        cache.put(self.user.pk, self.user, generation)
+        self.assertIsNone(cache.get(User, self.user.pk))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create(username="token", city="Pune")
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+
+    def test_second_lookup_skips_the_database(self):
+        self.assertEqual(self.auth.get_user(self.token).pk, self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.auth.get_user(self.token).city, "Pune")
+
+    def test_changes_invalidate_the_cached_row(self):
+        self.auth.get_user(self.token)
+        self.user.city = "Delhi"
+        self.user.save()
+        self.assertEqual(self.auth.get_user(self.token).city, "Delhi")
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import RegisterView, MeView, TokenObtainPairView, TokenRefreshView, UserPostsView, FollowUserView, UserConnectionsView, PublicUserProfileView, PublicUserPostsView, PublicUserConnectionsView, UserSearchView, AvatarUploadView
+from feed import async_views
+from .views import RegisterView, MeView, TokenObtainPairView, TokenRefreshView, UserPostsView, FollowUserView, UserConnectionsView, PublicUserProfileView, PublicUserPostsView, PublicUserConnectionsView, UserSearchView, AvatarUploadView, PeopleYouMayKnowView, AuthCacheStatsView
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
@@ -7,11 +8,15 @@ urlpatterns = [
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("me/", MeView.as_view(), name="me"),
     path("posts/", UserPostsView.as_view(), name="user-posts"),
+    path("posts/async/", async_views.user_posts, name="user-posts-async"),
     path("profile/<str:username>/", PublicUserProfileView.as_view(), name="public-profile"),
     path("profile/<str:username>/posts/", PublicUserPostsView.as_view(), name="public-profile-posts"),
+    path("profile/<str:username>/posts/async/", async_views.public_user_posts, name="public-profile-posts-async"),
     path("profile/<str:username>/connections/", PublicUserConnectionsView.as_view(), name="public-profile-connections"),
     path("follow/<str:username>/", FollowUserView.as_view(), name="follow-user"),
     path("connections/", UserConnectionsView.as_view(), name="user-connections"),
     path("search/", UserSearchView.as_view(), name="user-search"),
+    path("suggestions/", PeopleYouMayKnowView.as_view(), name="user-suggestions"),
+    path("cache-stats/", AuthCacheStatsView.as_view(), name="auth-cache-stats"),
     path("avatar/upload/", AvatarUploadView.as_view(), name="avatar-upload"),
 ]
@@ -5,18 +5,15 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .serializers import RegisterSerializer, UserSerializer
 from jobs.models import Job
 from opportunities.models import Opportunity
-from jobs.serializers import JobSerializer
-from opportunities.serializers import OpportunitySerializer
-from engagement.models import EngagementLog, Comment
+from feed.aggregates import decorated_posts, newest_first
 from .models import Connection, User
+from .graph import get_graph
+from .authentication import user_cache
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from django.conf import settings
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-from PIL import Image
-import io
-import time
+from .avatars import AvatarBusy, defer_upload, process_upload, renditions
+from awasarhub.admission import admission
 
 
 class RegisterView(generics.CreateAPIView):
@@ -43,30 +40,11 @@ class UserPostsView(APIView):
 
     def get(self, request):
         user = request.user
-        jobs = Job.objects.filter(posted_by=user)
-        opportunities = Opportunity.objects.filter(posted_by=user)
-        
-        job_data = JobSerializer(jobs, many=True).data
-        opp_data = OpportunitySerializer(opportunities, many=True).data
-        
-        for j in job_data:
-            j['type'] = 'job'
-            j['likes'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='like').count()
-            j['comments'] = Comment.objects.filter(content_type='job', content_id=j['id']).count()
-            j['reposts'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='repost').count()
-            j['shares'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='share').count()
-            j['liked_by_user'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='like', user=request.user).exists()
-
-        for o in opp_data:
-            o['type'] = 'opportunity'
-            o['likes'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='like').count()
-            o['comments'] = Comment.objects.filter(content_type='opportunity', content_id=o['id']).count()
-            o['reposts'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='repost').count()
-            o['shares'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='share').count()
-            o['liked_by_user'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='like', user=request.user).exists()
-
-        all_posts = sorted(job_data + opp_data, key=lambda x: x['created_at'], reverse=True)
-        return Response(all_posts)
+        job_data, opp_data = decorated_posts(
+            request, Job.objects.filter(posted_by=user), Opportunity.objects.filter(posted_by=user)
+        )
+
+        return Response(newest_first(job_data, opp_data))
 
 
 class FollowUserView(APIView):
@@ -133,30 +111,11 @@ class PublicUserPostsView(APIView):
 
     def get(self, request, username):
         user = get_object_or_404(User, username=username)
-        jobs = Job.objects.filter(posted_by=user)
-        opportunities = Opportunity.objects.filter(posted_by=user)
-        
-        job_data = JobSerializer(jobs, many=True).data
-        opp_data = OpportunitySerializer(opportunities, many=True).data
-        
-        for j in job_data:
-            j['type'] = 'job'
-            j['likes'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='like').count()
-            j['comments'] = Comment.objects.filter(content_type='job', content_id=j['id']).count()
-            j['reposts'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='repost').count()
-            j['shares'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='share').count()
-            j['liked_by_user'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='like', user=request.user).exists()
-
-        for o in opp_data:
-            o['type'] = 'opportunity'
-            o['likes'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='like').count()
-            o['comments'] = Comment.objects.filter(content_type='opportunity', content_id=o['id']).count()
-            o['reposts'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='repost').count()
-            o['shares'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='share').count()
-            o['liked_by_user'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='like', user=request.user).exists()
-
-        all_posts = sorted(job_data + opp_data, key=lambda x: x['created_at'], reverse=True)
-        return Response(all_posts)
+        job_data, opp_data = decorated_posts(
+            request, Job.objects.filter(posted_by=user), Opportunity.objects.filter(posted_by=user)
+        )
+
+        return Response(newest_first(job_data, opp_data))
 
 
 class UserSearchView(APIView):
@@ -177,9 +136,46 @@ class UserSearchView(APIView):
         return Response(serializer.data)
 
 
+class PeopleYouMayKnowView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        suggestions = get_graph().suggest(request.user.id, limit)
+        users = User.objects.in_bulk([uid for uid, _ in suggestions])
+        results = []
+        for uid, mutual in suggestions:
+            user = users.get(uid)
+            if user is None:
+                continue
+            results.append({
+                "id": user.id,
+                "username": user.username,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "avatar": user.avatar,
+                "headline": user.headline,
+                "city": user.city,
+                "mutual_count": mutual,
+            })
+        return Response(results)
+
+
+class AuthCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(user_cache.stats())
+
+
 class AvatarUploadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @admission("upload")
     def post(self, request):
         file = request.FILES.get('avatar')
         if not file:
@@ -189,23 +185,29 @@ class AvatarUploadView(APIView):
         if not file.content_type.lower() in ['image/jpeg', 'image/png', 'image/webp']:
             return Response({"detail": "Only JPEG/PNG/WebP allowed"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Renditions are rendered in the background (task worker or in-process executor); their names
+        # are known already, and the user's avatar switches over once they are stored.
+        media_base = request.build_absolute_uri(settings.MEDIA_URL)
         try:
-            image = Image.open(file)
-            image = image.convert('RGB')
-            image.thumbnail((512, 512))
-            buf = io.BytesIO()
-            image.save(buf, format='JPEG', quality=85)
-            buf.seek(0)
-
-            filename = f"avatars/u{request.user.id}_{int(time.time())}.jpg"
-            path = default_storage.save(filename, ContentFile(buf.read()))
-
-            request.user.avatar_image = path
-            # Public URL
-            public_url = request.build_absolute_uri(settings.MEDIA_URL + path.replace('\\', '/'))
-            request.user.avatar = public_url
-            request.user.save(update_fields=['avatar_image', 'avatar'])
-
-            return Response({"avatar": public_url})
-        except Exception as e:
+            if getattr(settings, "AVATAR_DEFERRED", False):
+                digest, path, queued = defer_upload(file, request.user.id, media_base)
+            else:
+                digest, path, queued = process_upload(file, request.user.id, media_base)
+        except AvatarBusy:
+            return Response(
+                {"detail": "Avatar processing is busy, try again shortly"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "5"},
+            )
+        except Exception:
             return Response({"detail": "Failed to process image"}, status=status.HTTP_400_BAD_REQUEST)
+
+        public_url = media_base + path.replace('\\', '/')
+
+        return Response({
+            "avatar": public_url,
+            "renditions": {
+                key: request.build_absolute_uri(settings.MEDIA_URL + name)
+                for key, name in renditions(digest).items()
+            },
+        }, status=status.HTTP_202_ACCEPTED if queued else status.HTTP_200_OK)
@@ -0,0 +1,197 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Sum
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between flush attempts while the database keeps failing.
+MAX_FLUSH_BACKOFF = 300
+
+
+def _minute(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts - ts % 60, tz=dt_timezone.utc)
+
+
+class Ledger:
+    """In-memory impression/click/spend counters per (ad, minute), flushed as bulk upserts.
+
+    Also tracks today's spend per ad (flushed totals from every worker plus this
+    worker's unflushed buffer) for budget pacing.
+
+    A failed write puts its counts back into the buffer, and further flushes
+    back off exponentially so a database outage does not cost every request
+    a failed round trip. Counts for ads deleted meanwhile are dropped, and so
+    is a batch that fails on an integrity error: retrying it can only fail again.
+    """
+
+    def __init__(self, flush_interval: float, max_keys: int):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self._buffer: Dict[Tuple[int, datetime], list] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._spent_day = None
+        self._spent: Dict[int, float] = {}
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def _add(self, ad_id: int, impressions: int, clicks: int, spend: float):
+        key = (ad_id, _minute(time.time()))
+        with self._lock:
+            row = self._buffer.get(key)
+            if row is None:
+                self._buffer[key] = [impressions, clicks, spend]
+            else:
+                row[0] += impressions
+                row[1] += clicks
+                row[2] += spend
+            self._spent[ad_id] = self._spent.get(ad_id, 0.0) + spend
+            due = len(self._buffer) >= self.max_keys or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def record_impressions(self, ads: Iterable[dict]):
+        for ad in ads:
+            self._add(ad["id"], 1, 0, ad["bid_cpm"] / 1000.0)
+
+    def record_click(self, ad_id: int, bid_cpc: float):
+        self._add(ad_id, 0, 1, bid_cpc)
+
+    def flush(self, reload_spend: bool = True, force: bool = False):
+        if not force and time.monotonic() < self._retry_at:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                buffer, self._buffer = self._buffer, {}
+                self._last_flush = time.monotonic()
+            if buffer:
+                try:
+                    self._write(buffer)
+                except IntegrityError:
+                    logger.exception("Dropped %d ad stat rows that cannot be written", len(buffer))
+                except Exception:
+                    self._restore(buffer)
+                    raise
+            if reload_spend:
+                self._reload_spend()
+        except Exception:
+            self._failures += 1
+            delay = min(self.flush_interval * 2 ** (self._failures - 1), MAX_FLUSH_BACKOFF)
+            self._retry_at = time.monotonic() + delay
+            logger.exception("Failed to flush ad stats; retrying in %.0fs", delay)
+        else:
+            self._failures = 0
+            self._retry_at = 0.0
+        finally:
+            self._flush_lock.release()
+
+    def _restore(self, buffer):
+        """Merge counts that could not be written back into the live buffer."""
+        with self._lock:
+            for key, row in buffer.items():
+                current = self._buffer.get(key)
+                if current is None:
+                    self._buffer[key] = row
+                else:
+                    current[0] += row[0]
+                    current[1] += row[1]
+                    current[2] += row[2]
+
+    def _write(self, buffer):
+        from .models import AdStat, Advertisement
+
+        # Raw SQL bypasses the router, so pick the primary explicitly.
+        db = router.db_for_write(AdStat)
+        connection = connections[db]
+        # An ad deleted while its counts were buffered would fail the whole batch on its foreign key.
+        live = set(
+            Advertisement.objects.using(db).filter(pk__in={ad_id for ad_id, _ in buffer}).values_list("pk", flat=True)
+        )
+        table = connection.ops.quote_name(AdStat._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (ad_id, minute, impressions, clicks, spend) VALUES (%s, %s, %s, %s, %s) "
+            f"ON CONFLICT (ad_id, minute) DO UPDATE SET "
+            f"impressions = {table}.impressions + excluded.impressions, "
+            f"clicks = {table}.clicks + excluded.clicks, "
+            f"spend = {table}.spend + excluded.spend"
+        )
+        params = [
+            (ad_id, connection.ops.adapt_datetimefield_value(minute), row[0], row[1], row[2])
+            for (ad_id, minute), row in buffer.items()
+            if ad_id in live
+        ]
+        if not params:
+            return
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def _reload_spend(self):
+        from .models import AdStat
+
+        midnight = _minute(time.time()).replace(hour=0, minute=0)
+        # Spend just flushed must be visible, so read it from the primary rather than a lagging replica.
+        totals = dict(
+            AdStat.objects.using(router.db_for_write(AdStat)).filter(minute__gte=midnight)
+            .values("ad_id").annotate(total=Sum("spend")).values_list("ad_id", "total")
+        )
+        with self._lock:
+            for (ad_id, minute), row in self._buffer.items():
+                if minute >= midnight:
+                    totals[ad_id] = totals.get(ad_id, 0.0) + row[2]
+            self._spent = totals
+            self._spent_day = midnight
+
+    def spent_today(self, ad_id: int) -> float:
+        if self._spent_day != _minute(time.time()).replace(hour=0, minute=0):
+            self.flush()
+        return self._spent.get(ad_id, 0.0)
+
+
+def click_billable(user_id: int, ad_id: int) -> bool:
+    """Whether a click is charged: at most ADS_CLICK_CAP per user and ad per ADS_CLICK_WINDOW, counted in the cache."""
+    limit = getattr(settings, "ADS_CLICK_CAP", 1)
+    if not limit:
+        return True
+    window = getattr(settings, "ADS_CLICK_WINDOW", 3600)
+    key = f"ads:click:{ad_id}:{user_id}:{int(time.time()) // window}"
+    cache.add(key, 0, window)
+    try:
+        return cache.incr(key) <= limit
+    except ValueError:
+        # Evicted between add and incr.
+        cache.set(key, 1, window)
+        return True
+
+
+def pacing_allows(ad: dict) -> bool:
+    """Throttle an ad that is spending ahead of an even schedule across the (UTC) day."""
+    budget = ad["daily_budget"]
+    if not budget:
+        return True
+    spent_fraction = ledger.spent_today(ad["id"]) / budget
+    if spent_fraction >= 1.0:
+        return False
+    now = datetime.now(dt_timezone.utc)
+    elapsed = (now - now.replace(hour=0, minute=0, second=0, microsecond=0)) / timedelta(days=1)
+    if spent_fraction <= elapsed:
+        return True
+    return random.random() < (1.0 - spent_fraction) / max(1.0 - elapsed, 1e-6)
+
+
+ledger = Ledger(
+    flush_interval=getattr(settings, "ADS_STATS_FLUSH_INTERVAL", 10),
+    max_keys=getattr(settings, "ADS_STATS_MAX_BUFFER", 5000),
+)
+atexit.register(ledger.flush, reload_spend=False, force=True)
@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import Advertisement
+from .models import Advertisement, AdStat
 
 
 @admin.register(Advertisement)
 class AdvertisementAdmin(admin.ModelAdmin):
-    list_display = ("id", "title", "city", "category", "bid_cpm", "bid_cpc", "enabled", "created_at")
+    list_display = ("id", "title", "city", "category", "bid_cpm", "bid_cpc", "daily_budget", "enabled", "created_at")
     search_fields = ("title", "city", "category", "tags")
+
+
+@admin.register(AdStat)
+class AdStatAdmin(admin.ModelAdmin):
+    list_display = ("id", "ad", "minute", "impressions", "clicks", "spend")
+    list_select_related = ("ad",)
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-19 14:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='daily_budget',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.CreateModel(
+            name='AdStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.DateTimeField(db_index=True)),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('spend', models.FloatField(default=0.0)),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='ads.advertisement')),
+            ],
+            options={
+                'unique_together': {('ad', 'minute')},
+            },
+        ),
+    ]
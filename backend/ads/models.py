@@ -13,9 +13,26 @@ class Advertisement(models.Model):
     link_url = models.URLField(blank=True)
     bid_cpm = models.FloatField(default=0.0)
     bid_cpc = models.FloatField(default=0.0)
+    daily_budget = models.FloatField(default=0.0)  # 0 means unlimited
     enabled = models.BooleanField(default=True)
     advertiser = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title
+
+
+class AdStat(models.Model):
+    """Impressions, clicks and spend of one ad within one minute."""
+
+    ad = models.ForeignKey(Advertisement, related_name="stats", on_delete=models.CASCADE)
+    minute = models.DateTimeField(db_index=True)
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    spend = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ("ad", "minute")
+
+    def __str__(self):
+        return f"{self.ad_id}@{self.minute:%Y-%m-%d %H:%M}"
@@ -1,8 +1,10 @@
 from rest_framework import serializers
+
+from awasarhub.sparse import SparseFieldsetMixin
 from .models import Advertisement
 
 
-class AdvertisementSerializer(serializers.ModelSerializer):
+class AdvertisementSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Advertisement
         fields = "__all__"
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import targeting
+from .models import Advertisement
+
+
+@receiver(post_save, sender=Advertisement)
+@receiver(post_delete, sender=Advertisement)
+def advertisement_changed(sender, using, **kwargs):
+    # A rebuild before commit would read the old rows and cache them until the next change.
+    transaction.on_commit(targeting.invalidate, using=using)
@@ -0,0 +1,232 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from django.conf import settings
+
+from .accounting import ledger, pacing_allows
+
+
+def _norm(value) -> str:
+    return str(value or "").strip().lower()
+
+
+class AdIndex:
+    """Compiled, read-only view of the enabled ads, bucketed by city, tag and category."""
+
+    # Upper bound of ``relevance``: city match + full tag overlap + category match.
+    MAX_RELEVANCE = 3.5
+
+    def __init__(self, ads):
+        from .serializers import AdvertisementSerializer
+
+        ctr = getattr(settings, "ADS_ESTIMATED_CTR", 0.01)
+        self.ads: Dict[int, dict] = {}
+        self.by_city: Dict[str, Set[int]] = {}
+        self.by_tag: Dict[str, Set[int]] = {}
+        self.by_category: Dict[str, Set[int]] = {}
+        self.untargeted: Set[int] = set()
+        for ad, data in zip(ads, AdvertisementSerializer(ads, many=True).data):
+            tags = frozenset(_norm(t) for t in (ad.tags or []) if _norm(t))
+            self.ads[ad.id] = {
+                "id": ad.id,
+                "city": _norm(ad.city),
+                "category": _norm(ad.category),
+                "tags": tags,
+                # Expected revenue per thousand impressions: CPM plus CPC weighted by an estimated CTR.
+                "ecpm": ad.bid_cpm + ad.bid_cpc * ctr * 1000,
+                "bid_cpm": ad.bid_cpm,
+                "bid_cpc": ad.bid_cpc,
+                "daily_budget": ad.daily_budget,
+                "data": data,
+                "card": {
+                    "content_type": "AD",
+                    "title": ad.title,
+                    "body": ad.body,
+                    "source_url": ad.link_url,
+                    "city": ad.city,
+                    "latitude": ad.latitude,
+                    "longitude": ad.longitude,
+                    "created_at": ad.created_at.isoformat(),
+                },
+            }
+            if ad.city:
+                self.by_city.setdefault(_norm(ad.city), set()).add(ad.id)
+            else:
+                self.untargeted.add(ad.id)
+            for tag in tags:
+                self.by_tag.setdefault(tag, set()).add(ad.id)
+            if ad.category:
+                self.by_category.setdefault(_norm(ad.category), set()).add(ad.id)
+        # Ads by descending eCPM, so selection can stop once no remaining ad can beat the top k.
+        self.by_ecpm = sorted(self.ads, key=lambda ad_id: self.ads[ad_id]["ecpm"], reverse=True)
+        self.built_at = time.monotonic()
+
+    def candidates(self, city: str, interests: Set[str], strict_city: bool) -> Set[int]:
+        if strict_city and city:
+            return set(self.by_city.get(city, ()))
+        found = set(self.untargeted)
+        found |= self.by_city.get(city, set())
+        for interest in interests:
+            found |= self.by_tag.get(interest, set())
+            found |= self.by_category.get(interest, set())
+        return found or set(self.ads)
+
+    def matches(self, ad: dict, city: str, interests: Set[str], strict_city: bool) -> bool:
+        """Whether ``candidates`` would include ``ad`` (ignoring its fall back to every ad)."""
+        if strict_city and city:
+            return ad["city"] == city
+        return (
+            ad["id"] in self.untargeted or (city and ad["city"] == city)
+            or bool(ad["tags"] & interests) or (ad["category"] and ad["category"] in interests)
+        )
+
+    def relevance(self, ad: dict, city: str, interests: Set[str]) -> float:
+        score = 1.0
+        if city and ad["city"] == city:
+            score += 1.0
+        if ad["tags"] and interests:
+            score += len(ad["tags"] & interests) / len(ad["tags"])
+        if ad["category"] and ad["category"] in interests:
+            score += 0.5
+        return score
+
+
+class FrequencyCap:
+    """Fixed-window impression counters per (user, ad), bounded to the most recent users."""
+
+    def __init__(self, limit: int, window: int, max_users: int = 100000):
+        self.limit = limit
+        self.window = window
+        self.max_users = max_users
+        self._users: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _counts(self, user_id: int, bucket: int) -> Dict[int, int]:
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] != bucket:
+            entry = (bucket, {})
+            self._users[user_id] = entry
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return entry[1]
+
+    def capped(self, user_id: int) -> Set[int]:
+        """Ads ``user_id`` has already seen ``limit`` times in the current window."""
+        if not self.limit:
+            return set()
+        bucket = int(time.time()) // self.window
+        with self._lock:
+            counts = self._counts(user_id, bucket)
+            return {ad_id for ad_id, count in counts.items() if count >= self.limit}
+
+    def record(self, user_id: int, ad_ids: List[int]):
+        bucket = int(time.time()) // self.window
+        with self._lock:
+            counts = self._counts(user_id, bucket)
+            for ad_id in ad_ids:
+                counts[ad_id] = counts.get(ad_id, 0) + 1
+
+
+_index: Optional[AdIndex] = None
+_dirty = True
+_lock = threading.Lock()
+frequency_cap = FrequencyCap(
+    limit=getattr(settings, "ADS_FREQUENCY_CAP", 3),
+    window=getattr(settings, "ADS_FREQUENCY_WINDOW", 3600),
+)
+
+
+def invalidate():
+    global _dirty
+    _dirty = True
+
+
+def get_index() -> AdIndex:
+    global _index, _dirty
+    index = _index
+    ttl = getattr(settings, "ADS_INDEX_TTL", 60)
+    if index is None or _dirty or time.monotonic() - index.built_at > ttl:
+        from .models import Advertisement
+
+        with _lock:
+            if _index is None or _dirty or time.monotonic() - _index.built_at > ttl:
+                _dirty = False
+                _index = AdIndex(list(Advertisement.objects.filter(enabled=True)))
+            index = _index
+    return index
+
+
+_catalog_view = (None, None, frozenset())
+
+
+def _catalog_exact(index: AdIndex):
+    """The shared catalog and the ids of ads it describes exactly as ``index`` does, or (None, empty)."""
+    from feed.catalog import get_catalog
+
+    global _catalog_view
+    catalog = get_catalog()
+    if catalog is None:
+        return None, frozenset()
+    cached_index, cached_catalog, exact = _catalog_view
+    if cached_index is not index or cached_catalog is not catalog:
+        # Ads edited since the snapshot was built are scored from the index instead.
+        exact = frozenset(
+            ad_id for ad_id, targeting in catalog.ad_targeting().items()
+            if ad_id in index.ads
+            and (index.ads[ad_id]["city"], index.ads[ad_id]["category"], index.ads[ad_id]["tags"]) == targeting
+        )
+        _catalog_view = (index, catalog, exact)
+    return catalog, exact
+
+
+def _relevance(index: AdIndex, city: str, interests: Set[str], strict_city: bool) -> Optional[Dict[int, float]]:
+    """``{ad id: relevance}`` for the candidate ads, vectorised over the shared catalog; None without one."""
+    catalog, exact = _catalog_exact(index)
+    if catalog is None:
+        return None
+    scores = {
+        ad_id: score for ad_id, score in catalog.ad_relevance(city, interests, strict_city).items() if ad_id in exact
+    }
+    for ad_id in index.ads.keys() - exact:
+        ad = index.ads[ad_id]
+        if index.matches(ad, city, interests, strict_city):
+            scores[ad_id] = index.relevance(ad, city, interests)
+    if not scores and not (strict_city and city):
+        scores = {ad_id: index.relevance(ad, city, interests) for ad_id, ad in index.ads.items()}
+    return scores
+
+
+def select_ads(user, limit: int, strict_city: bool = False) -> List[dict]:
+    """Pick up to ``limit`` index entries for ``user`` by eCPM x relevance.
+
+    Honours frequency caps and budget pacing, and records an impression for every ad returned.
+    """
+    index = get_index()
+    city = _norm(user.city)
+    interests = {_norm(i) for i in (user.interests or [])}
+    scores = _relevance(index, city, interests, strict_city)
+    if scores is not None:
+        candidates, relevance = scores, lambda ad: scores[ad["id"]]
+    else:
+        candidates, relevance = index.candidates(city, interests, strict_city), lambda ad: index.relevance(ad, city, interests)
+    capped = frequency_cap.capped(user.id)
+    top: List[tuple] = []
+    for ad_id in index.by_ecpm:
+        ad = index.ads[ad_id]
+        if len(top) == limit and ad["ecpm"] * index.MAX_RELEVANCE < top[0][0]:
+            break
+        if ad_id not in candidates or ad_id in capped or not pacing_allows(ad):
+            continue
+        entry = (ad["ecpm"] * relevance(ad), -ad_id, ad)
+        if len(top) < limit:
+            heapq.heappush(top, entry)
+        elif entry[:2] > top[0][:2]:
+            heapq.heapreplace(top, entry)
+    ranked = [entry[2] for entry in sorted(top, key=lambda e: e[:2], reverse=True)]
+    frequency_cap.record(user.id, [ad["id"] for ad in ranked])
+    ledger.record_impressions(ranked)
+    return ranked
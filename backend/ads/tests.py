@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError
+from django.test import TestCase, override_settings
+
+from ads.accounting import Ledger, click_billable
+from ads.models import AdStat, Advertisement
+
+
+class LedgerFlushTests(TestCase):
+    def setUp(self):
+        self.ad = Advertisement.objects.create(title="ad", bid_cpm=2.0, bid_cpc=0.5)
+        self.ledger = Ledger(flush_interval=3600, max_keys=1000)
+
+    def buffered(self):
+        return [sum(row[i] for row in self.ledger._buffer.values()) for i in range(3)]
+
+    def test_failed_write_keeps_counts(self):
+        self.ledger.record_impressions([{"id": self.ad.id, "bid_cpm": 2.0}] * 3)
+        self.ledger.record_click(self.ad.id, 0.5)
+        with mock.patch.object(Ledger, "_write", side_effect=DatabaseError("down")), self.assertLogs("ads.accounting"):
+            self.ledger.flush()
+        self.assertEqual(self.buffered(), [3, 1, 0.506])
+
+        # Counts recorded after the failure are merged with the restored ones.
+        self.ledger.record_click(self.ad.id, 0.5)
+        self.ledger.flush(force=True)
+        self.assertEqual(self.ledger._buffer, {})
+        stat = AdStat.objects.get(ad=self.ad)
+        self.assertEqual((stat.impressions, stat.clicks), (3, 2))
+        self.assertAlmostEqual(stat.spend, 1.006)
+
+    def test_flush_backs_off_after_failure(self):
+        self.ledger.record_click(self.ad.id, 0.5)
+        failing = mock.patch.object(Ledger, "_write", side_effect=DatabaseError("down"))
+        with failing as write, self.assertLogs("ads.accounting"):
+            self.ledger.flush()
+            self.ledger.flush()
+            self.ledger.spent_today(self.ad.id)
+        self.assertEqual(write.call_count, 1)
+
+    def test_deleted_ad_does_not_block_flush(self):
+        other = Advertisement.objects.create(title="gone", bid_cpm=1.0, bid_cpc=0.1)
+        self.ledger.record_click(self.ad.id, 0.5)
+        self.ledger.record_click(other.id, 0.1)
+        other.delete()
+        self.ledger.flush()
+        self.assertEqual(self.ledger._buffer, {})
+        self.assertEqual(self.ledger._failures, 0)
+        self.assertEqual(list(AdStat.objects.values_list("ad_id", "clicks")), [(self.ad.id, 1)])
+
+    def test_integrity_error_drops_batch(self):
+        self.ledger.record_click(self.ad.id, 0.5)
+        with mock.patch.object(Ledger, "_write", side_effect=IntegrityError("fk")), self.assertLogs("ads.accounting"):
+            self.ledger.flush()
+        self.assertEqual(self.ledger._buffer, {})
+        self.assertEqual(self.ledger._failures, 0)
+
+
+@override_settings(ADS_CLICK_CAP=2, ADS_CLICK_WINDOW=3600)
+class ClickCapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_clicks_are_not_billed(self):
+        self.assertEqual([click_billable(1, 7) for _ in range(4)], [True, True, False, False])
+        self.assertTrue(click_billable(2, 7))
+        self.assertTrue(click_billable(1, 8))
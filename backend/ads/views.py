@@ -1,11 +1,15 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+
+from awasarhub.sparse import SparseFieldsViewMixin, pick
 from .models import Advertisement
 from .serializers import AdvertisementSerializer
+from .targeting import get_index, select_ads
+from .accounting import click_billable, ledger
 
 
-class AdvertisementViewSet(viewsets.ModelViewSet):
+class AdvertisementViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Advertisement.objects.all().order_by("-created_at")
     serializer_class = AdvertisementSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -15,10 +19,17 @@ class AdvertisementViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
     def for_user(self, request):
-        user = request.user
-        city = user.city
-        qs = Advertisement.objects.filter(enabled=True)
-        if city:
-            qs = qs.filter(city__iexact=city)
-        data = self.serializer_class(qs[:10], many=True).data
-        return Response({"ads": data})
+        ads = select_ads(request.user, 10, strict_city=True)
+        return Response({"ads": [pick(ad["data"], request) for ad in ads]})
+
+    @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
+    def click(self, request, pk=None):
+        indexed = get_index().ads.get(int(pk)) if str(pk).isdigit() else None
+        if indexed is not None:
+            if click_billable(request.user.id, indexed["id"]):
+                ledger.record_click(indexed["id"], indexed["bid_cpc"])
+            return Response({"link_url": indexed["data"]["link_url"]})
+        ad = self.get_object()
+        if ad.enabled and click_billable(request.user.id, ad.id):
+            ledger.record_click(ad.id, ad.bid_cpc)
+        return Response({"link_url": ad.link_url})
@@ -0,0 +1,52 @@
+"""Admin helpers for tables too large to ``COUNT(*)`` on every page view."""
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def _postgres_estimate(queryset):
+    """Row estimate from planner statistics: pg_class for a whole table, EXPLAIN for a filtered one."""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # reltuples is -1 for a table that has never been analysed.
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return plan[0]["Plan"]["Plan Rows"]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose ``count`` never scans more than ``ADMIN_COUNT_CAP`` rows.
+
+    On PostgreSQL, results the planner expects to exceed the cap are counted
+    from its statistics. Elsewhere, or when the estimate is small, rows are
+    counted exactly up to the cap and anything larger reports the cap, so
+    page links stop there.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        cap = getattr(settings, "ADMIN_COUNT_CAP", 10000)
+        if connections[queryset.db].vendor == "postgresql":
+            estimate = _postgres_estimate(queryset)
+            if estimate is not None and estimate > cap:
+                return int(estimate)
+        return min(queryset.order_by()[:cap + 1].count(), cap)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin defaults for very large tables."""
+
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "N results (M total)".
+    show_full_result_count = False
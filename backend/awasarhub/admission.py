@@ -0,0 +1,264 @@
+"""Admission control for expensive endpoints.
+
+Each endpoint class in ``ADMISSION_CONTROL`` gets:
+
+* a concurrency limit: at most ``concurrency`` requests of the class run at
+  once. The slots are an in-process semaphore per worker, or, with
+  ``ADMISSION_SHARED``, leases in the default cache shared by every worker
+  (each slot is a key added with a TTL, so a crashed worker cannot leak one);
+* a bounded wait: up to ``queue`` more requests wait at most ``timeout``
+  seconds for a slot; anything beyond that is refused straight away;
+* per-user rate limits through django-ratelimit, one counter per entry in
+  ``rates`` (e.g. a short burst window plus a sustained one).
+
+Refused requests get a 503 (overload) or 429 (rate limit) with Retry-After,
+before any expensive work starts.
+
+Async views go through ``admit``/``Gate.arelease``, which run the cache calls
+in a thread so they neither block the event loop nor trip Django's
+async-unsafe guard (the database cache).
+"""
+import asyncio
+import functools
+import itertools
+import logging
+import threading
+import time
+import uuid
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.http import JsonResponse
+from django_ratelimit.core import get_usage
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {"concurrency": 8, "queue": 16, "timeout": 2.0, "rates": (), "retry_after": 2}
+SHARED_POLL_INTERVAL = 0.02
+# Cache backends that live inside one process, so ADMISSION_SHARED cannot share anything through them.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def _process_local_cache() -> bool:
+    backend = getattr(settings, "CACHES", {}).get(DEFAULT_CACHE_ALIAS, {}).get(
+        "BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+    )
+    return backend in PROCESS_LOCAL_CACHES
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if getattr(settings, "ADMISSION_SHARED", False) and _process_local_cache():
+        return [checks.Warning(
+            "ADMISSION_SHARED is on but the default cache is process-local, so each worker enforces its own limits.",
+            hint="Point CACHES['default'] at Redis, memcached or the database cache.",
+            id="awasarhub.W001",
+        )]
+    return []
+
+
+class _LocalSlots:
+    def __init__(self, concurrency: int):
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+
+    def try_acquire(self):
+        return True if self._semaphore.acquire(blocking=False) else None
+
+    def wait(self, timeout: float):
+        return True if self._semaphore.acquire(timeout=max(timeout, 0)) else None
+
+    def release(self, token):
+        self._semaphore.release()
+
+
+class _SharedSlots:
+    """Slots as cache keys; ``cache.add`` is atomic on memcached, Redis and the database cache."""
+
+    def __init__(self, name: str, concurrency: int, lease: float):
+        self._keys = [f"admission:{name}:{i}" for i in range(concurrency)]
+        self._lease = lease
+        self._start = itertools.count()
+
+    def try_acquire(self):
+        token = uuid.uuid4().hex
+        offset = next(self._start)
+        for i in range(len(self._keys)):
+            key = self._keys[(offset + i) % len(self._keys)]
+            if cache.add(key, token, self._lease):
+                return key, token
+        return None
+
+    def wait(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(SHARED_POLL_INTERVAL)
+            token = self.try_acquire()
+            if token is not None:
+                return token
+        return None
+
+    def release(self, token):
+        key, value = token
+        if cache.get(key) == value:
+            cache.delete(key)
+
+
+class Gate:
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float, shared: bool = False, lease: float = 60):
+        self.name = name
+        self.queue = queue
+        self.timeout = timeout
+        self.slots = _SharedSlots(name, concurrency, lease) if shared else _LocalSlots(concurrency)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def _enter_queue(self) -> bool:
+        with self._lock:
+            if self._waiting >= self.queue:
+                return False
+            self._waiting += 1
+            return True
+
+    def _leave_queue(self):
+        with self._lock:
+            self._waiting -= 1
+
+    def acquire(self):
+        """A slot token, or None if the queue is full or the deadline passed."""
+        token = self.slots.try_acquire()
+        if token is not None or not self._enter_queue():
+            return token
+        try:
+            return self.slots.wait(self.timeout)
+        finally:
+            self._leave_queue()
+
+    async def _atry_acquire(self):
+        if isinstance(self.slots, _SharedSlots):
+            return await sync_to_async(self.slots.try_acquire)()
+        return self.slots.try_acquire()
+
+    async def aacquire(self):
+        """``acquire`` for the event loop: polls instead of blocking the loop's thread."""
+        token = await self._atry_acquire()
+        if token is not None or not self._enter_queue():
+            return token
+        try:
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(SHARED_POLL_INTERVAL)
+                token = await self._atry_acquire()
+                if token is not None:
+                    return token
+            return None
+        finally:
+            self._leave_queue()
+
+    def release(self, token):
+        self.slots.release(token)
+
+    async def arelease(self, token):
+        if isinstance(self.slots, _SharedSlots):
+            await sync_to_async(self.slots.release)(token)
+        else:
+            self.slots.release(token)
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def config(name: str) -> dict:
+    return {**DEFAULTS, **getattr(settings, "ADMISSION_CONTROL", {}).get(name, {})}
+
+
+def get_gate(name: str) -> Gate:
+    gate = _gates.get(name)
+    if gate is None:
+        with _gates_lock:
+            gate = _gates.get(name)
+            if gate is None:
+                options = config(name)
+                shared = getattr(settings, "ADMISSION_SHARED", False)
+                if shared and _process_local_cache():
+                    logger.warning("ADMISSION_SHARED is on but the default cache is process-local; %s limits are per worker", name)
+                gate = _gates[name] = Gate(
+                    name, options["concurrency"], options["queue"], options["timeout"],
+                    shared=shared, lease=getattr(settings, "ADMISSION_LEASE_SECONDS", 60),
+                )
+    return gate
+
+
+def reset():
+    with _gates_lock:
+        _gates.clear()
+
+
+def _user_key(group, request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def rate_limited(name: str, request) -> Optional[int]:
+    """Seconds until the caller may retry if any of the class's rates is exceeded, else None."""
+    for rate in config(name)["rates"]:
+        usage = get_usage(request, group=f"admission:{name}", key=_user_key, rate=rate, increment=True)
+        if usage is not None and usage["should_limit"]:
+            return max(usage["time_left"], 1)
+    return None
+
+
+def _refuse(status: int, retry_after: int, detail: str):
+    response = JsonResponse({"detail": detail}, status=status)
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def _overloaded(name: str):
+    return _refuse(503, config(name)["retry_after"], "Server is busy, try again shortly.")
+
+
+def _throttled(retry_after: int):
+    return _refuse(429, retry_after, "Too many requests.")
+
+
+def admission(name: str):
+    """Guard a DRF view method (``self, request, ...``) with the ``name`` endpoint class."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            retry_after = rate_limited(name, request)
+            if retry_after is not None:
+                return _throttled(retry_after)
+            gate = get_gate(name)
+            token = gate.acquire()
+            if token is None:
+                return _overloaded(name)
+            try:
+                return view(self, request, *args, **kwargs)
+            finally:
+                gate.release(token)
+
+        return wrapper
+
+    return decorator
+
+
+async def admit(name: str, request):
+    """For async views: (token, None) to proceed, or (None, refusal response). Release with ``get_gate(name).arelease``."""
+    retry_after = await sync_to_async(rate_limited)(name, request)
+    if retry_after is not None:
+        return None, _throttled(retry_after)
+    token = await get_gate(name).aacquire()
+    if token is None:
+        return None, _overloaded(name)
+    return token, None
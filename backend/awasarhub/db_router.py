@@ -0,0 +1,200 @@
+import asyncio
+import contextvars
+import hashlib
+import itertools
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.utils import CursorWrapper
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# True while handling a safe request from a client that has not written recently.
+_use_replica = contextvars.ContextVar("use_replica", default=False)
+# The replica this request has read from, so a failure can be blamed on it.
+_replica_used = contextvars.ContextVar("replica_used", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+def failed_alias(exception):
+    """The alias of the connection that raised ``exception``, or None if it did not come from one.
+
+    Taken from the innermost connection or cursor frame in the traceback, so it
+    covers failures to connect as well as failed queries.
+    """
+    alias = None
+    tb = exception.__traceback__
+    while tb is not None:
+        owner = tb.tb_frame.f_locals.get("self")
+        if isinstance(owner, CursorWrapper):
+            owner = owner.db
+        if isinstance(owner, BaseDatabaseWrapper):
+            alias = owner.alias
+        tb = tb.tb_next
+    return alias
+
+
+class ReplicaHealth:
+    """Remembers, per process, which replicas answered ``SELECT 1`` recently.
+
+    Probes run in a background thread, never on the request path: a stale
+    entry keeps its last answer until the probe reports back. A replica not
+    probed yet counts as healthy; if it is not, the failed read marks it down
+    (see ``ReplicaRoutingMiddleware.process_exception``).
+    """
+
+    def __init__(self):
+        self._checked = {}
+        self._probing = set()
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias: str) -> bool:
+        ttl = getattr(settings, "DATABASE_REPLICA_HEALTH_TTL", 10)
+        checked = self._checked.get(alias)
+        if checked is None or time.monotonic() - checked[0] >= ttl:
+            self._probe_soon(alias)
+        return checked[1] if checked is not None else True
+
+    def mark_unhealthy(self, alias: str):
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), False)
+
+    def _probe_soon(self, alias: str):
+        with self._lock:
+            if alias in self._probing:
+                return
+            self._probing.add(alias)
+        threading.Thread(target=self._run_probe, args=(alias,), name=f"replica-probe-{alias}", daemon=True).start()
+
+    def _run_probe(self, alias: str):
+        try:
+            healthy = self._probe(alias)
+            with self._lock:
+                self._checked[alias] = (time.monotonic(), healthy)
+        finally:
+            with self._lock:
+                self._probing.discard(alias)
+            connections[alias].close()
+
+    def _probe(self, alias: str) -> bool:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except Exception:
+            logger.warning("Database replica %s is unavailable, reading from primary", alias, exc_info=True)
+            return False
+
+
+health = ReplicaHealth()
+_round_robin = itertools.count()
+
+
+class PrimaryReplicaRouter:
+    """Send reads of safe, unpinned requests to a healthy replica and everything else to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get():
+            return "default"
+        aliases = replica_aliases()
+        if not aliases:
+            return "default"
+        start = next(_round_robin)
+        for i in range(len(aliases)):
+            alias = aliases[(start + i) % len(aliases)]
+            if health.is_healthy(alias):
+                _replica_used.set(alias)
+                return alias
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        # Read-your-writes within the request too: once it writes, later reads go to the primary.
+        _use_replica.set(False)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+_recent_writers = {}
+_recent_writers_lock = threading.Lock()
+
+
+def _client_key(request):
+    credential = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return hashlib.blake2b(credential.encode(), digest_size=12).hexdigest()
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Enable replica reads for safe requests, pinning recent writers to the primary.
+
+    A write pins the client for ``DATABASE_REPLICA_PIN_SECONDS`` (read-your-writes):
+    through a cookie, which every worker sees, and through an in-process map keyed
+    by the client's credentials for clients that drop cookies.
+    """
+
+    def process_request(self, request):
+        now = time.time()
+        pinned = False
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > now
+        except ValueError:
+            pass
+        key = _client_key(request)
+        if not pinned and key is not None:
+            pinned = _recent_writers.get(key, 0) > now
+        _use_replica.set(request.method in SAFE_METHODS and not pinned)
+        _replica_used.set(None)
+
+    def process_exception(self, request, exception):
+        if _replica_used.get() is None or not isinstance(exception, (OperationalError, InterfaceError)):
+            return None
+        alias = failed_alias(exception)
+        if alias not in replica_aliases():
+            # The primary failed (say, SQLite's "database is locked"); the replicas are fine and a retry would not help.
+            return None
+        # The replica failed mid-request: take it out of rotation and answer this
+        # safe (so repeatable) request again from the primary.
+        logger.warning("Database replica %s failed during %s, retrying on primary", alias, request.path, exc_info=True)
+        health.mark_unhealthy(alias)
+        _use_replica.set(False)
+        _replica_used.set(None)
+        match = request.resolver_match
+        if match is None:
+            return None
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        return view(request, *match.args, **match.kwargs)
+
+    def process_response(self, request, response):
+        _use_replica.set(False)
+        _replica_used.set(None)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+            until = time.time() + pin_seconds
+            response.set_cookie(PIN_COOKIE, f"{until:.3f}", max_age=pin_seconds, httponly=True, samesite="Lax")
+            key = _client_key(request)
+            if key is not None:
+                with _recent_writers_lock:
+                    _recent_writers[key] = until
+                    if len(_recent_writers) > 10000:
+                        now = time.time()
+                        for stale in [k for k, v in _recent_writers.items() if v <= now]:
+                            del _recent_writers[stale]
+        return response
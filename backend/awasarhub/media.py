@@ -0,0 +1,139 @@
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Paths carrying a content hash (e.g. avatars/<sha256 prefix>_512.jpg) never change in place.
+HASHED_PATH = re.compile(r"(^|/)[0-9a-f]{16,}[_.-]")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(stat) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _cache_control(path: str) -> str:
+    if HASHED_PATH.search(path):
+        return "public, max-age=31536000, immutable"
+    return f"public, max-age={getattr(settings, 'MEDIA_MAX_AGE', 3600)}"
+
+
+def _not_modified(request, etag: str, mtime: int) -> bool:
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return "*" in etags or etag in etags
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return since is not None and int(mtime) <= since
+
+
+def _byte_range(request, size: int, etag: str, mtime: int):
+    """Return (start, end) inclusive, ``None`` for a full response, or ``False`` if unsatisfiable."""
+    header = request.META.get("HTTP_RANGE")
+    if not header:
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != int(mtime):
+            return None
+    match = RANGE_HEADER.match(header.strip())
+    if not match:
+        # Multiple or malformed ranges: serving the whole entity is always allowed.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path: str, start: int, length: int):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from ``MEDIA_ROOT`` with ETag, conditional GET and byte-range support.
+
+    With ``MEDIA_ACCEL_REDIRECT_PREFIX`` set, the transfer itself is delegated to the
+    reverse proxy through ``MEDIA_ACCEL_REDIRECT_HEADER`` (X-Accel-Redirect by default).
+    """
+    fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    try:
+        stat = fullpath.stat()
+    except OSError:
+        raise Http404("Not found")
+    if not fullpath.is_file():
+        raise Http404("Not found")
+
+    etag = _etag(stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": _cache_control(path),
+        "Accept-Ranges": "bytes",
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for key, value in headers.items():
+            response.headers[key] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or "application/octet-stream"
+
+    accel_prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "")
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        header = getattr(settings, "MEDIA_ACCEL_REDIRECT_HEADER", "X-Accel-Redirect")
+        response[header] = accel_prefix.rstrip("/") + "/" + path.lstrip("/")
+        return response
+
+    byte_range = _byte_range(request, stat.st_size, etag, stat.st_mtime)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    if byte_range is None:
+        if request.method == "HEAD":
+            response = HttpResponse(content_type=content_type, headers=headers)
+        else:
+            # FileResponse hands the open file to wsgi.file_wrapper, i.e. sendfile() where available.
+            response = FileResponse(fullpath.open("rb"), content_type=content_type, headers=headers)
+        response["Content-Length"] = str(stat.st_size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        body = () if request.method == "HEAD" else _read_range(os.fspath(fullpath), start, length)
+        response = StreamingHttpResponse(body, status=206, content_type=content_type, headers=headers)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(length)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     "ads",
     "engagement",
     "briefing",
+    "taskqueue",
 ]
 
 MIDDLEWARE = [
@@ -56,6 +57,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "awasarhub.wsgi.application"
+ASGI_APPLICATION = "awasarhub.asgi.application"
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL:
@@ -65,24 +67,131 @@ if DATABASE_URL:
         "default": dj_database_url.parse(DATABASE_URL, conn_max_age=600, ssl_require=False)
     }
 else:
+    # SQLITE_HIGH_CONCURRENCY=true enables WAL, tuned pragmas and BEGIN IMMEDIATE (see awasarhub/sqlite/base.py).
+    SQLITE_HIGH_CONCURRENCY = os.getenv("SQLITE_HIGH_CONCURRENCY", "false").lower() == "true"
     DATABASES = {
         "default": {
-            "ENGINE": "django.db.backends.sqlite3",
+            "ENGINE": "awasarhub.sqlite" if SQLITE_HIGH_CONCURRENCY else "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {"timeout": 20} if SQLITE_HIGH_CONCURRENCY else {},
         }
     }
 
+# Optional read replicas, e.g. "postgres://replica1/db,postgres://replica2/db". Locally, two SQLite files
+# work too: DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3, then `migrate --database replica_0`.
+DATABASE_REPLICA_URLS = [u for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u]
+if DATABASE_REPLICA_URLS:
+    import dj_database_url  # type: ignore
+
+    for i, url in enumerate(DATABASE_REPLICA_URLS):
+        DATABASES[f"replica_{i}"] = dj_database_url.parse(url, conn_max_age=600, ssl_require=False)
+    DATABASE_ROUTERS = ["awasarhub.db_router.PrimaryReplicaRouter"]
+    MIDDLEWARE.append("awasarhub.db_router.ReplicaRoutingMiddleware")
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "5"))
+DATABASE_REPLICA_HEALTH_TTL = int(os.getenv("DATABASE_REPLICA_HEALTH_TTL", "10"))
+
 AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
 }
 
+# Authenticated user rows are cached per worker; saves invalidate locally, the TTL bounds staleness elsewhere.
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+# "People you may know" keeps an in-memory snapshot of the follow graph per worker.
+PYMK_SNAPSHOT_TTL = int(os.getenv("PYMK_SNAPSHOT_TTL", "900"))
+PYMK_MAX_DELTA = int(os.getenv("PYMK_MAX_DELTA", "10000"))
+# Second-degree entries counted per suggestion request, however many hubs a user follows.
+PYMK_MAX_FANOUT = int(os.getenv("PYMK_MAX_FANOUT", "20000"))
+
+# Ad selection uses an in-process index of enabled ads and per-user frequency caps.
+ADS_INDEX_TTL = int(os.getenv("ADS_INDEX_TTL", "60"))
+ADS_ESTIMATED_CTR = float(os.getenv("ADS_ESTIMATED_CTR", "0.01"))
+ADS_FREQUENCY_CAP = int(os.getenv("ADS_FREQUENCY_CAP", "3"))
+ADS_FREQUENCY_WINDOW = int(os.getenv("ADS_FREQUENCY_WINDOW", "3600"))
+ADS_STATS_FLUSH_INTERVAL = float(os.getenv("ADS_STATS_FLUSH_INTERVAL", "10"))
+ADS_STATS_MAX_BUFFER = int(os.getenv("ADS_STATS_MAX_BUFFER", "5000"))
+# Clicks charged per user and ad per window; repeats still redirect but are not billed (0 = no cap).
+ADS_CLICK_CAP = int(os.getenv("ADS_CLICK_CAP", "1"))
+ADS_CLICK_WINDOW = int(os.getenv("ADS_CLICK_WINDOW", "3600"))
+
+# Collaborative-filtering factors written by `train_als` and memory-mapped by workers.
+RECOMMENDER_DIR = Path(os.getenv("RECOMMENDER_DIR", BASE_DIR / "var" / "recommender"))
+RECOMMENDER_RELOAD_INTERVAL = int(os.getenv("RECOMMENDER_RELOAD_INTERVAL", "60"))
+RECOMMENDER_BLEND = float(os.getenv("RECOMMENDER_BLEND", "0.3"))
+# Largest block of similarities build_related materialises at once (rows x items).
+RELATED_MAX_BLOCK_CELLS = int(os.getenv("RELATED_MAX_BLOCK_CELLS", "10000000"))
+# Default page size of a full (non-delta) personalized feed, best ranked first; ?limit= goes up to 1000.
+PERSONALIZED_FEED_LIMIT = int(os.getenv("PERSONALIZED_FEED_LIMIT", "100"))
+# Shared content catalog written by `manage.py build_catalog` and memory-mapped by every worker.
+CATALOG_DIR = Path(os.getenv("CATALOG_DIR", BASE_DIR / "var" / "catalog"))
+CATALOG_RELOAD_INTERVAL = int(os.getenv("CATALOG_RELOAD_INTERVAL", "30"))
+
+# "Trending" ordering: engagement weights decayed with this half-life, see feed.trending.
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_WEIGHTS = {"like": 1.0, "repost": 3.0, "comment": 2.0, "share": 4.0}
+# Posts per content type (and in total) returned by ?sort=trending.
+TRENDING_FEED_LIMIT = int(os.getenv("TRENDING_FEED_LIMIT", "100"))
+
+# Near-duplicate posts: MinHash signatures of DEDUP_BANDS x DEDUP_ROWS values, see feed.dedup.
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_ROWS = int(os.getenv("DEDUP_ROWS", "8"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+# Admission control for expensive endpoint classes, see awasarhub.admission. "rates" are
+# django-ratelimit rates per user (a burst window and a sustained one).
+ADMISSION_CONTROL = {
+    "feed": {
+        "concurrency": int(os.getenv("ADMISSION_FEED_CONCURRENCY", "8")),
+        "queue": int(os.getenv("ADMISSION_FEED_QUEUE", "16")),
+        "timeout": float(os.getenv("ADMISSION_FEED_TIMEOUT", "2")),
+        "rates": ("10/s", "120/m"),
+    },
+    "upload": {
+        "concurrency": int(os.getenv("ADMISSION_UPLOAD_CONCURRENCY", "2")),
+        "queue": int(os.getenv("ADMISSION_UPLOAD_QUEUE", "4")),
+        "timeout": float(os.getenv("ADMISSION_UPLOAD_TIMEOUT", "5")),
+        "rates": ("2/s", "20/h"),
+        "retry_after": 5,
+    },
+}
+# Count slots in the default cache across all workers instead of per process (needs a shared cache).
+ADMISSION_SHARED = os.getenv("ADMISSION_SHARED", "0") == "1"
+ADMISSION_LEASE_SECONDS = int(os.getenv("ADMISSION_LEASE_SECONDS", "60"))
+
+# Background tasks (taskqueue app, run with `manage.py run_tasks`): failed tasks are retried after
+# TASKS_RETRY_BACKOFF * 2^(attempt - 1) seconds, capped at TASKS_MAX_BACKOFF.
+TASKS_MAX_ATTEMPTS = int(os.getenv("TASKS_MAX_ATTEMPTS", "5"))
+TASKS_RETRY_BACKOFF = float(os.getenv("TASKS_RETRY_BACKOFF", "10"))
+TASKS_MAX_BACKOFF = float(os.getenv("TASKS_MAX_BACKOFF", "3600"))
+# A running task not finished within the lease is handed to another worker.
+TASKS_LEASE_SECONDS = int(os.getenv("TASKS_LEASE_SECONDS", "300"))
+# Move follow-up work out of requests onto the queue (needs a running worker).
+TRENDING_DEFERRED = os.getenv("TRENDING_DEFERRED", "0") == "1"
+AVATAR_DEFERRED = os.getenv("AVATAR_DEFERRED", "0") == "1"
+# Relate new posts as they are created instead of at the next `manage.py build_related`.
+RELATED_INCREMENTAL = os.getenv("RELATED_INCREMENTAL", "0") == "1"
+
+# Live engagement counts (SSE at /api/feed/live/, ASGI only): changes within a window are sent as one event.
+LIVE_COALESCE_SECONDS = float(os.getenv("LIVE_COALESCE_SECONDS", "1"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_MAX_POSTS = int(os.getenv("LIVE_MAX_POSTS", "200"))
+LIVE_MAX_STREAMS = int(os.getenv("LIVE_MAX_STREAMS", "1000"))
+
+# Uploads to the jobs/opportunities import endpoints (see feed.bulk_import); manage.py import_posts is unlimited.
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+
+# Admin changelists of large tables count at most this many rows (see awasarhub.admin_tools).
+ADMIN_COUNT_CAP = int(os.getenv("ADMIN_COUNT_CAP", "10000"))
+
 CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
 CORS_ALLOW_CREDENTIALS = True
 
@@ -95,5 +204,13 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", "3600"))
+# Behind nginx, set e.g. "/protected-media/" to let the proxy send the file bytes.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+MEDIA_ACCEL_REDIRECT_HEADER = os.getenv("MEDIA_ACCEL_REDIRECT_HEADER", "X-Accel-Redirect")
+
+# Avatar decoding/encoding runs in a small bounded thread pool per worker, off the request thread.
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "2"))
+AVATAR_QUEUE_SIZE = int(os.getenv("AVATAR_QUEUE_SIZE", "8"))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -0,0 +1,153 @@
+"""Sparse fieldsets: ``?fields=`` and ``?expand=`` for list/detail endpoints.
+
+``?fields=id,title,posted_by_details.username`` keeps only the named fields;
+dotted names select inside a nested serializer. Nested serializers named in
+``Meta.expandable_fields`` (the embedded author, for instance) are dropped as
+soon as either parameter is present unless they are listed in ``?expand=``
+or in ``?fields=``. Without both parameters every field is returned, as
+before. Writes (POST, PUT, PATCH) ignore both parameters.
+
+``sparse_queryset`` turns the surviving fields into ``.only()`` plus
+``select_related()``, so trimmed requests also read fewer columns.
+"""
+from typing import Dict, Iterable, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+Spec = Optional[Dict[str, "Spec"]]
+
+
+def parse_fields(value: str) -> Dict[str, Spec]:
+    """``"a,b.c,b.d"`` -> ``{"a": None, "b": {"c": None, "d": None}}``; ``None`` means the whole field."""
+    spec: Dict[str, Spec] = {}
+    for path in value.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = spec
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                break  # the whole field is already selected
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+    return spec
+
+
+def query_params(request):
+    # DRF requests have query_params; plain Django requests (the async views) have GET.
+    return getattr(request, "query_params", None) or getattr(request, "GET", {})
+
+
+def requested(request):
+    """(fields spec or None, expand set or None) from a request's query string.
+
+    Only safe methods are trimmed: a write must validate every field and echo back what it stored.
+    """
+    if request is None or getattr(request, "method", "GET") not in SAFE_METHODS:
+        return None, None
+    params = query_params(request)
+    fields = parse_fields(params["fields"]) if params.get("fields") else None
+    expand = {name.strip() for name in params["expand"].split(",") if name.strip()} if "expand" in params else None
+    return fields, expand
+
+
+def _prune(serializer, spec: Spec):
+    if not spec:
+        return
+    for name in list(serializer.fields):
+        if name not in spec:
+            serializer.fields.pop(name)
+        elif spec[name] and isinstance(serializer.fields[name], serializers.Serializer):
+            _prune(serializer.fields[name], spec[name])
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin honouring ``?fields=``/``?expand=`` from the request in the context.
+
+    ``keep`` names fields a view needs internally (e.g. ``created_at`` to merge
+    feeds) and are kept whatever the client asked for.
+    """
+
+    def __init__(self, *args, keep: Iterable[str] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = requested(self.context.get("request"))
+        if fields is None and expand is None:
+            return
+        expandable = set(getattr(self.Meta, "expandable_fields", ()))
+        spec = dict(fields) if fields is not None else {name: None for name in self.fields}
+        for name in expandable:
+            if name in spec and fields is None and name not in (expand or ()):
+                del spec[name]
+        for name in expand or ():
+            if name in expandable:
+                spec.setdefault(name, None)
+        for name in keep:
+            spec.setdefault(name, None)
+        _prune(self, spec)
+
+
+def sparse_queryset(queryset, serializer):
+    """Restrict ``queryset`` to the columns ``serializer`` reads and join the relations it embeds.
+
+    Falls back to all columns when a field reads something that is not a
+    concrete model field (a property, a method, ``source="*"``).
+    """
+    serializer = getattr(serializer, "child", serializer)
+    model = queryset.model
+    only, related = {model._meta.pk.name}, []
+    restrict = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+            restrict = False
+            continue
+        name = field.source.split(".")[0]
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            restrict = False
+            continue
+        if not model_field.concrete:
+            restrict = False
+            continue
+        only.add(name)
+        if isinstance(field, serializers.Serializer) and isinstance(model_field, models.ForeignKey):
+            related.append(name)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only) if restrict else queryset
+
+
+def serialize(serializer_class, queryset, request, keep: Iterable[str] = ()):
+    """Serialize ``queryset`` honouring the request's sparse fieldset, with the query narrowed to match."""
+    context = {"request": request}
+    probe = serializer_class(context=context, keep=keep)
+    return serializer_class(sparse_queryset(queryset, probe), many=True, context=context, keep=keep).data
+
+
+def pick(item: dict, request) -> dict:
+    """Apply a sparse fieldset to an already-serialized dict (e.g. cached ad cards)."""
+    fields, _ = requested(request)
+    if not fields:
+        return item
+    out = {}
+    for name, sub in fields.items():
+        if name in item:
+            value = item[name]
+            out[name] = {k: v for k, v in value.items() if k in sub} if sub and isinstance(value, dict) else value
+    return out
+
+
+class SparseFieldsViewMixin:
+    """ViewSet mixin narrowing the queryset of safe requests to the fields that will be serialized."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in ("GET", "HEAD"):
+            queryset = sparse_queryset(queryset, self.get_serializer())
+        return queryset
@@ -0,0 +1,71 @@
+"""SQLite backend tuned for concurrent writers.
+
+Every connection is switched to WAL with the ``SQLITE_PRAGMAS`` setting, and
+``atomic()`` blocks start with ``BEGIN IMMEDIATE`` so a transaction takes the
+write lock up front. A deferred transaction that reads first and then tries to
+write cannot wait on the busy timeout and fails with "database is locked".
+
+The catch is that *every* ``atomic()`` takes the write lock, read-only ones
+included (Django's admin wraps change views in ``atomic()`` even for GET), so
+such blocks queue behind writers. Wrap read-only blocks in ``deferred()`` to
+start them with a plain ``BEGIN``, or set ``OPTIONS["transaction_mode"]`` (the
+name Django 5.1 uses) to ``"DEFERRED"`` to opt out for a whole database.
+
+The busy timeout comes from ``OPTIONS["timeout"]`` (seconds, as for the stock
+backend); a ``busy_timeout`` in ``SQLITE_PRAGMAS`` overrides it.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative means KiB
+    "temp_store": "MEMORY",
+}
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode", "IMMEDIATE").upper()
+        if mode not in TRANSACTION_MODES:
+            raise ValueError(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}, not {mode!r}")
+        self.transaction_mode = mode
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Ours, not sqlite3.connect()'s.
+        params.pop("transaction_mode", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {**DEFAULT_PRAGMAS, **getattr(settings, "SQLITE_PRAGMAS", {})}
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
+
+
+@contextmanager
+def deferred(using=None):
+    """Start outermost ``atomic()`` blocks inside with a plain ``BEGIN``, for read-only work."""
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    previous = getattr(connection, "transaction_mode", None)
+    if previous is None:
+        # Another backend; nothing to switch.
+        yield
+        return
+    connection.transaction_mode = "DEFERRED"
+    try:
+        yield
+    finally:
+        connection.transaction_mode = previous
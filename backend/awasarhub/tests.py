@@ -0,0 +1,189 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from awasarhub import admission, db_router, sparse
+from awasarhub.sqlite import base as sqlite_base
+
+
+def _error(connection, sql="SELECT 1"):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+    except OperationalError as exc:
+        return exc
+    raise AssertionError("query did not fail")
+
+
+class ReplicaFailoverTests(TestCase):
+    def setUp(self):
+        primary = connections["default"]
+        self.replica = type(primary)({**primary.settings_dict, "NAME": "/nonexistent/replica.sqlite3"}, alias="replica_0")
+        patcher = mock.patch.object(db_router, "replica_aliases", return_value=["replica_0"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(db_router.health._checked.pop, "replica_0", None)
+        self.middleware = db_router.ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+    def handle(self, exception):
+        request = RequestFactory().get("/api/feed/")
+        request.resolver_match = SimpleNamespace(func=lambda request: HttpResponse("retried"), args=(), kwargs={})
+        self.middleware.process_request(request)
+        db_router._replica_used.set("replica_0")
+        try:
+            return self.middleware.process_exception(request, exception)
+        finally:
+            self.middleware.process_response(request, HttpResponse())
+
+    def test_failed_alias(self):
+        self.assertEqual(db_router.failed_alias(_error(self.replica)), "replica_0")
+        self.assertEqual(db_router.failed_alias(_error(connections["default"], "SELECT * FROM missing")), "default")
+        self.assertIsNone(db_router.failed_alias(OperationalError("elsewhere")))
+
+    def test_replica_failure_is_retried_on_primary(self):
+        with self.assertLogs("awasarhub.db_router", "WARNING"):
+            response = self.handle(_error(self.replica))
+        self.assertEqual(response.content, b"retried")
+        self.assertFalse(db_router.health.is_healthy("replica_0"))
+
+    def test_primary_failure_leaves_replica_alone(self):
+        self.assertIsNone(self.handle(_error(connections["default"], "SELECT * FROM missing")))
+        self.assertNotIn("replica_0", db_router.health._checked)
+
+
+class GateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_concurrency_and_queue_limits(self):
+        gate = admission.Gate("test", concurrency=1, queue=0, timeout=1)
+        token = gate.acquire()
+        self.assertIsNotNone(token)
+        self.assertIsNone(gate.acquire())
+        gate.release(token)
+        self.assertIsNotNone(gate.acquire())
+
+    def test_waiters_give_up_at_the_deadline(self):
+        gate = admission.Gate("test", concurrency=1, queue=1, timeout=0.05)
+        gate.acquire()
+        self.assertIsNone(gate.acquire())
+        self.assertEqual(gate._waiting, 0)
+
+    def test_shared_slots_are_released_only_by_their_holder(self):
+        gate = admission.Gate("shared", concurrency=2, queue=0, timeout=0, shared=True, lease=60)
+        first, second = gate.acquire(), gate.acquire()
+        self.assertIsNone(gate.acquire())
+        # A lease that expired and was taken over is not freed by its previous holder.
+        cache.set(first[0], "someone else")
+        gate.release(first)
+        self.assertIsNone(gate.acquire())
+        gate.release(second)
+        self.assertIsNotNone(gate.acquire())
+
+
+class AdmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(admission.reset)
+        admission.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="busy"))
+
+    @override_settings(ADMISSION_CONTROL={"feed": {"rates": ("2/m",)}})
+    def test_rate_limit_is_per_user(self):
+        statuses = [self.client.get("/api/feed/global_feed/").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertIn("Retry-After", self.client.get("/api/feed/global_feed/"))
+        other = APIClient()
+        other.force_authenticate(User.objects.create(username="calm"))
+        self.assertEqual(other.get("/api/feed/global_feed/").status_code, 200)
+
+    @override_settings(ADMISSION_CONTROL={"feed": {"concurrency": 1, "queue": 0, "retry_after": 7}})
+    def test_overload_is_refused_before_the_view_runs(self):
+        gate = admission.get_gate("feed")
+        token = gate.acquire()
+        response = self.client.get("/api/feed/global_feed/")
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "7"))
+        gate.release(token)
+        self.assertEqual(self.client.get("/api/feed/global_feed/").status_code, 200)
+
+
+class SparseFieldsTests(SimpleTestCase):
+    def test_parse_fields(self):
+        self.assertEqual(sparse.parse_fields("id, author.name,author.city,,tags"),
+                         {"id": None, "author": {"name": None, "city": None}, "tags": None})
+        # A whole field already selected wins over its parts.
+        self.assertEqual(sparse.parse_fields("author,author.name"), {"author": None})
+
+    def test_pick_trims_serialized_items(self):
+        item = {"id": 1, "title": "Ad", "advertiser": {"name": "Acme", "url": "x"}}
+        request = RequestFactory().get("/", {"fields": "id,advertiser.name"})
+        self.assertEqual(sparse.pick(item, request), {"id": 1, "advertiser": {"name": "Acme"}})
+        self.assertIs(sparse.pick(item, RequestFactory().get("/")), item)
+        self.assertIs(sparse.pick(item, RequestFactory().post("/?fields=id")), item)
+
+
+class HighConcurrencySQLiteTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "hc.sqlite3"
+        self.connection = self.connect()
+        connections["sqlite_hc"] = self.connection
+        self.addCleanup(connections.__delitem__, "sqlite_hc")
+        self.addCleanup(self.connection.close)
+        with self.connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE t (x INTEGER)")
+
+    def connect(self, **options):
+        settings_dict = {**connections["default"].settings_dict, "ENGINE": "awasarhub.sqlite", "NAME": str(self.path),
+                         "OPTIONS": {"timeout": 0.05, **options}}
+        return sqlite_base.DatabaseWrapper(settings_dict, alias="sqlite_hc")
+
+    def other_writer_blocked(self):
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        try:
+            other.execute("BEGIN IMMEDIATE")
+            other.execute("ROLLBACK")
+            return False
+        except sqlite3.OperationalError:
+            return True
+        finally:
+            other.close()
+
+    def test_pragmas(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 50)
+
+    def test_atomic_takes_the_write_lock_up_front(self):
+        with transaction.atomic(using="sqlite_hc"):
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM t")
+            self.assertTrue(self.other_writer_blocked())
+        self.assertFalse(self.other_writer_blocked())
+
+    def test_deferred_blocks_only_read(self):
+        with sqlite_base.deferred("sqlite_hc"), transaction.atomic(using="sqlite_hc"):
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM t")
+            self.assertFalse(self.other_writer_blocked())
+        self.assertEqual(self.connection.transaction_mode, "IMMEDIATE")
+
+    def test_transaction_mode_option(self):
+        self.assertEqual(self.connect(transaction_mode="deferred").transaction_mode, "DEFERRED")
+        with self.assertRaises(ValueError):
+            self.connect(transaction_mode="eventually")
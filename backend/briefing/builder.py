@@ -0,0 +1,101 @@
+import heapq
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from feed.models import FeedContent
+from feed.ranking import rank_score
+from jobs.models import Job
+from opportunities.models import Opportunity
+
+from .models import AIBriefing
+
+PICKS_PER_SECTION = 3
+USER_FIELDS = ("id", "username", "first_name", "interests", "latitude", "longitude")
+
+
+def load_candidates(pool_size: int = 2000) -> Dict[str, List[dict]]:
+    """The most recent rankable items of each kind, as plain dicts."""
+    return {
+        "jobs": list(
+            Job.objects.filter(duplicate_of__isnull=True).order_by("-created_at")
+            .values("id", "title", "company", "city", "tags", "latitude", "longitude")[:pool_size]
+        ),
+        "opportunities": list(
+            Opportunity.objects.filter(duplicate_of__isnull=True).order_by("-created_at")
+            .values("id", "title", "org", "category", "city", "tags", "latitude", "longitude")[:pool_size]
+        ),
+        "news": list(
+            FeedContent.objects.filter(content_type="NEWS").order_by("-created_at")
+            .values("id", "title", "city", "tags", "latitude", "longitude")[:pool_size]
+        ),
+    }
+
+
+def _top(user: dict, items: List[dict], k: int) -> List[dict]:
+    interests = user["interests"] or []
+    loc = (user["latitude"], user["longitude"]) if user["latitude"] is not None and user["longitude"] is not None else None
+    return heapq.nlargest(
+        k, items, key=lambda item: rank_score(interests, loc, item["tags"], item["latitude"], item["longitude"])
+    )
+
+
+def compose(user: dict, picks: Dict[str, List[dict]]):
+    name = user["first_name"] or user["username"]
+    lines = [f"Good morning, {name}. Here is your AwasarHub briefing."]
+    if picks["jobs"]:
+        lines.append("Jobs picked for you: " + "; ".join(
+            f"{j['title']} at {j['company']}" + (f" in {j['city']}" if j["city"] else "") for j in picks["jobs"]
+        ) + ".")
+    if picks["opportunities"]:
+        lines.append("Opportunities: " + "; ".join(
+            f"{o['title']} from {o['org']}" for o in picks["opportunities"]
+        ) + ".")
+    if picks["news"]:
+        lines.append("In the news: " + "; ".join(n["title"] for n in picks["news"]) + ".")
+    if len(lines) == 1:
+        lines.append("There is nothing new for you today. Check back tomorrow.")
+    metadata = {
+        "interests": user["interests"] or [],
+        "jobs": [j["id"] for j in picks["jobs"]],
+        "opportunities": [o["id"] for o in picks["opportunities"]],
+        "news": [n["id"] for n in picks["news"]],
+    }
+    return " ".join(lines), metadata
+
+
+def build(users: Iterable[dict], day, candidates: Dict[str, List[dict]]) -> List[AIBriefing]:
+    briefings = []
+    for user in users:
+        picks = {section: _top(user, items, PICKS_PER_SECTION) for section, items in candidates.items()}
+        script_text, metadata = compose(user, picks)
+        briefings.append(AIBriefing(user_id=user["id"], date=day, script_text=script_text, metadata=metadata))
+    return briefings
+
+
+def save(briefings: List[AIBriefing], batch_size: int = 500):
+    AIBriefing.objects.bulk_create(
+        briefings,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user", "date"],
+        update_fields=["script_text", "metadata"],
+    )
+
+
+def active_users(active_days: Optional[int] = None):
+    qs = get_user_model().objects.filter(is_active=True)
+    if active_days:
+        since = timezone.now() - timedelta(days=active_days)
+        qs = qs.filter(Q(last_login__gte=since) | Q(date_joined__gte=since))
+    return qs
+
+
+def build_for_user(user, day) -> AIBriefing:
+    """Request-path fallback for a user the nightly run missed."""
+    row = {field: getattr(user, field) for field in USER_FIELDS}
+    save(build([row], day, load_candidates(pool_size=200)))
+    return AIBriefing.objects.get(user=user, date=day)
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from briefing import builder
+
+_candidates = None
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+def _run_chunk(user_ids, day, pool_size):
+    global _candidates
+    if _candidates is None:
+        _candidates = builder.load_candidates(pool_size)
+    users = builder.active_users().filter(id__in=user_ids).values(*builder.USER_FIELDS)
+    briefings = builder.build(users, day, _candidates)
+    builder.save(briefings)
+    return len(briefings)
+
+
+class Command(BaseCommand):
+    help = "Precompute today's AIBriefing for every active user (run nightly, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Briefing date (YYYY-MM-DD), defaults to today")
+        parser.add_argument("--workers", type=int, default=1, help="Process pool size; 1 runs inline")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--pool-size", type=int, default=2000, help="Recent items of each kind to rank")
+        parser.add_argument("--active-days", type=int, default=30, help="Only users seen in this many days; 0 for all")
+
+    def handle(self, *args, **options):
+        global _candidates
+        # Inline runs share this process's cache; a later run must not rank yesterday's candidates.
+        _candidates = None
+        day = parse_date(options["date"]) if options["date"] else timezone.localdate()
+        chunk_size = options["chunk_size"]
+        user_ids = list(
+            builder.active_users(options["active_days"]).order_by("id").values_list("id", flat=True)
+        )
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+        start = time.perf_counter()
+        built = 0
+        if options["workers"] <= 1:
+            for chunk in chunks:
+                built += _run_chunk(chunk, day, options["pool_size"])
+        else:
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"], initializer=_init_worker) as pool:
+                futures = [pool.submit(_run_chunk, chunk, day, options["pool_size"]) for chunk in chunks]
+                for future in futures:
+                    built += future.result()
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {built} briefings for {day} in {time.perf_counter() - start:.1f}s"
+        ))
@@ -1,8 +1,10 @@
 from rest_framework import serializers
+
+from awasarhub.sparse import SparseFieldsetMixin
 from .models import AIBriefing
 
 
-class AIBriefingSerializer(serializers.ModelSerializer):
+class AIBriefingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = AIBriefing
         fields = "__all__"
@@ -0,0 +1,48 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from briefing.models import AIBriefing
+from jobs.models import Job
+
+
+@override_settings(ADMISSION_CONTROL={})
+class BriefingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="asha", first_name="Asha", interests=["python"])
+        User.objects.create(username="gone", is_active=False)
+        self.python = Job.objects.create(company="Acme", title="Python developer", description="Django", tags=["python"])
+        Job.objects.create(company="Globex", title="Accountant", description="Ledgers", tags=["finance"])
+
+    def build(self, day="2026-01-05"):
+        call_command("build_briefings", date=day, active_days=0, stdout=io.StringIO())
+
+    def test_nightly_run_builds_one_briefing_per_active_user(self):
+        self.build()
+        briefing = AIBriefing.objects.get()
+        self.assertEqual((briefing.user_id, briefing.date), (self.user.pk, datetime.date(2026, 1, 5)))
+        self.assertTrue(briefing.script_text.startswith("Good morning, Asha."))
+        self.assertEqual(briefing.metadata["jobs"][0], self.python.pk)
+
+    def test_rerun_replaces_the_day(self):
+        self.build()
+        newer = Job.objects.create(company="Initech", title="Senior Python developer", description="APIs", tags=["python"])
+        self.build()
+        briefing = AIBriefing.objects.get()
+        self.assertIn(newer.pk, briefing.metadata["jobs"])
+
+    def test_daily_serves_the_precomputed_briefing_or_builds_one(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        today = timezone.localdate()
+        AIBriefing.objects.create(user=self.user, date=today, script_text="precomputed")
+        self.assertEqual(client.get("/api/briefing/daily/").data["script_text"], "precomputed")
+        AIBriefing.objects.all().delete()
+        data = client.get("/api/briefing/daily/").data
+        self.assertIn("Python developer at Acme", data["script_text"])
+        self.assertEqual(AIBriefing.objects.get().date, today)
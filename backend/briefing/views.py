@@ -1,23 +1,24 @@
-from datetime import date
+from django.utils import timezone
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+
+from awasarhub.sparse import SparseFieldsViewMixin
 from .models import AIBriefing
 from .serializers import AIBriefingSerializer
+from .builder import build_for_user
 
 
-class AIBriefingViewSet(viewsets.ModelViewSet):
+class AIBriefingViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = AIBriefing.objects.all().order_by("-date")
     serializer_class = AIBriefingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
     def daily(self, request):
-        u = request.user
-        today = date.today()
-        briefing, created = AIBriefing.objects.get_or_create(user=u, date=today, defaults={
-            "script_text": "Your briefing is being prepared.",
-            "video_url": "",
-            "metadata": {"interests": u.interests},
-        })
-        return Response(self.serializer_class(briefing).data)
+        # Briefings are precomputed nightly by the build_briefings command.
+        today = timezone.localdate()
+        briefing = AIBriefing.objects.filter(user=request.user, date=today).first()
+        if briefing is None:
+            briefing = build_for_user(request.user, today)
+        return Response(self.get_serializer(briefing).data)
@@ -1,8 +1,37 @@
 from django.contrib import admin
-from .models import EngagementLog
+
+from awasarhub.admin_tools import LargeTableAdmin
+from .models import Comment, EngagementLog
+
+
+class ExactUserOrContentSearch:
+    """Search by exact username or, for a number, by content id; both are index lookups."""
+
+    search_help_text = "Exact username, or a content id"
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(content_id=int(term)), False
+        return queryset.filter(user__username=term), False
 
 
 @admin.register(EngagementLog)
-class EngagementLogAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "content_id", "action", "created_at")
-    search_fields = ("user__username", "content_id", "action")
+class EngagementLogAdmin(ExactUserOrContentSearch, LargeTableAdmin):
+    list_display = ("id", "user", "content_type", "content_id", "action", "created_at")
+    list_filter = ("action",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__exact",)
+    date_hierarchy = "created_at"
+
+
+@admin.register(Comment)
+class CommentAdmin(ExactUserOrContentSearch, LargeTableAdmin):
+    list_display = ("id", "user", "content_type", "content_id", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username__exact",)
+    date_hierarchy = "created_at"
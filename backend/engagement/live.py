@@ -0,0 +1,93 @@
+"""In-process pub/sub of engagement count changes, for the live counts stream.
+
+Writers call ``publish("job", 12, "likes", +1)`` from any thread. Each stream
+subscribes to the posts its client is showing and accumulates the deltas
+that arrive; ``Subscription.next_batch`` waits for the first change, keeps
+collecting for a short coalescing window, then hands over the net change per
+post, so a burst of likes becomes one message and a like undone within the
+window sends nothing.
+
+Only events published in the same process are seen: run the stream under
+ASGI in the process that also serves the writes.
+"""
+import asyncio
+import threading
+from typing import Dict, Iterable, Set, Tuple
+
+Key = Tuple[str, int]
+
+
+class Subscription:
+    def __init__(self, keys: Iterable[Key], loop: asyncio.AbstractEventLoop):
+        self.keys = frozenset(keys)
+        self._loop = loop
+        self._changed = asyncio.Event()
+        self._pending: Dict[Key, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def push(self, key: Key, field: str, delta: int):
+        """Record a change; safe to call from any thread."""
+        with self._lock:
+            counts = self._pending.setdefault(key, {})
+            counts[field] = counts.get(field, 0) + delta
+        try:
+            self._loop.call_soon_threadsafe(self._changed.set)
+        except RuntimeError:
+            pass  # the stream's loop has already closed
+
+    async def next_batch(self, window: float, timeout: float) -> Dict[Key, Dict[str, int]]:
+        """Net changes after the next one plus ``window`` seconds; empty if nothing happened within ``timeout``."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        await asyncio.sleep(window)
+        self._changed.clear()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        batch = {}
+        for key, counts in pending.items():
+            counts = {field: delta for field, delta in counts.items() if delta}
+            if counts:
+                batch[key] = counts
+        return batch
+
+
+_subscribers: Dict[Key, Set[Subscription]] = {}
+_lock = threading.Lock()
+_count = 0
+
+
+def subscribe(keys: Iterable[Key]) -> Subscription:
+    """Subscribe from inside the event loop that will read the subscription."""
+    global _count
+    subscription = Subscription(keys, asyncio.get_running_loop())
+    with _lock:
+        for key in subscription.keys:
+            _subscribers.setdefault(key, set()).add(subscription)
+        _count += 1
+    return subscription
+
+
+def unsubscribe(subscription: Subscription):
+    global _count
+    with _lock:
+        for key in subscription.keys:
+            listeners = _subscribers.get(key)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del _subscribers[key]
+        _count -= 1
+
+
+def subscriber_count() -> int:
+    return _count
+
+
+def publish(content_type: str, content_id, field: str, delta: int = 1):
+    key = (content_type, int(content_id))
+    with _lock:
+        listeners = list(_subscribers.get(key, ()))
+    for subscription in listeners:
+        subscription.push(key, field, delta)
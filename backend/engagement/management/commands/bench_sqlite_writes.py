@@ -0,0 +1,80 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models.signals import post_save
+
+from engagement.models import EngagementLog
+from feed.signals import engagement_created
+
+MODES = {
+    "default": {"ENGINE": "django.db.backends.sqlite3", "OPTIONS": {}},
+    "tuned": {"ENGINE": "awasarhub.sqlite", "OPTIONS": {"timeout": 20}},
+}
+
+
+class Command(BaseCommand):
+    help = "Multi-threaded engagement write benchmark: stock SQLite settings vs the tuned WAL backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--writes", type=int, default=200, help="Writes per thread")
+
+    def handle(self, *args, **options):
+        # Trending updates go to the default database, not the benchmark's; this measures the log writes alone.
+        post_save.disconnect(engagement_created, sender=EngagementLog)
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for mode, config in MODES.items():
+                    self._run(mode, config, Path(tmp) / f"{mode}.sqlite3", options["threads"], options["writes"])
+        finally:
+            post_save.connect(engagement_created, sender=EngagementLog)
+
+    def _run(self, mode, config, path, threads, writes):
+        alias = f"bench_{mode}"
+        connections.settings[alias] = connections.configure_settings(
+            {"default": connections.settings["default"], alias: {**config, "NAME": str(path)}}
+        )[alias]
+        User = get_user_model()
+        with connections[alias].schema_editor() as editor:
+            editor.create_model(User)
+            editor.create_model(EngagementLog)
+        user = User.objects.db_manager(alias).create(username=f"bench_{mode}")
+
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(writes):
+                    try:
+                        # Same shape as the like toggle: read, then write in one transaction.
+                        with transaction.atomic(using=alias):
+                            EngagementLog.objects.using(alias).filter(
+                                user=user, content_type="job", content_id=n * writes + i, action="like"
+                            ).first()
+                            EngagementLog.objects.using(alias).create(
+                                user=user, content_type="job", content_id=n * writes + i, action="like"
+                            )
+                    except OperationalError as exc:
+                        errors.append(str(exc))
+            finally:
+                connections[alias].close()
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - start
+        written = EngagementLog.objects.using(alias).count()
+        connections[alias].close()
+        self.stdout.write(
+            f"{mode:<8} {written:6d} writes in {elapsed:6.2f}s  "
+            f"{written / elapsed:8.0f} writes/s  {len(errors)} errors"
+            + (f" (e.g. {errors[0]!r})" if errors else "")
+        )
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from engagement import export
+
+
+class Command(BaseCommand):
+    help = "Stream EngagementLog or Comment rows to CSV/JSONL with constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(export.EXPORTS))
+        parser.add_argument("-o", "--output", default="-", help="File to write, or - for stdout")
+        parser.add_argument("--format", choices=export.FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--since", help="ISO date or datetime, inclusive")
+        parser.add_argument("--until", help="ISO date (inclusive) or datetime (exclusive)")
+        parser.add_argument("--action", action="append", default=[], help="Repeat to export several actions")
+        parser.add_argument("--content-type")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched per database round trip")
+
+    def handle(self, *args, **options):
+        try:
+            since = export.parse_bound(options["since"])
+            until = export.parse_bound(options["until"], end=True)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        chunks = export.stream(
+            options["kind"], options["format"], options["gzip"], since=since, until=until,
+            actions=options["action"], content_type=options["content_type"], chunk_size=options["chunk_size"],
+        )
+        start = time.perf_counter()
+        written = 0
+        out = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "wb")
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if options["output"] != "-":
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written / 1024:.0f} KiB to {options['output']} in {time.perf_counter() - start:.1f}s"
+            ))
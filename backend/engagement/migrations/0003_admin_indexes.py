@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engagement', '0002_alter_engagementlog_action_comment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='engagementlog',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['content_id', 'content_type'], name='engagement__content_71dbc3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='engagementlog',
+            index=models.Index(fields=['content_id', 'content_type', 'action'], name='engagement__content_e683ce_idx'),
+        ),
+    ]
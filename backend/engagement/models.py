@@ -17,7 +17,10 @@ class EngagementLog(models.Model):
     content_type = models.CharField(max_length=32, blank=True)
     action = models.CharField(max_length=16, choices=ACTIONS)
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["content_id", "content_type", "action"])]
 
     def __str__(self):
         return f"{self.user_id}-{self.content_id}-{self.action}"
@@ -28,7 +31,10 @@ class Comment(models.Model):
     content_id = models.IntegerField()
     content_type = models.CharField(max_length=32)  # e.g., 'job', 'opportunity'
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["content_id", "content_type"])]
 
     def __str__(self):
         return f"Comment by {self.user.username} on {self.content_type}:{self.content_id}"
@@ -0,0 +1,52 @@
+import csv
+import gzip
+import io
+import json
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from engagement import export
+from engagement.models import Comment, EngagementLog
+
+
+@override_settings(ADMISSION_CONTROL={})
+class ExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(username="staff", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.like = EngagementLog.objects.create(user=self.staff, content_type="job", content_id=1, action="like",
+                                                 metadata={"from": "feed"})
+        self.view = EngagementLog.objects.create(user=self.staff, content_type="opportunity", content_id=2, action="view")
+        Comment.objects.create(user=self.staff, content_type="job", content_id=1, text="Looks good, \"really\"")
+
+    def download(self, kind, **params):
+        response = self.client.get(f"/api/engagement/export/{kind}/", params)
+        self.assertEqual(response.status_code, 200)
+        body = b"".join(response.streaming_content)
+        return gzip.decompress(body) if params.get("gzip") else body
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.download("comments").decode())))
+        self.assertEqual(rows[0], list(export.EXPORTS["comments"][1]))
+        self.assertEqual(rows[1][4], 'Looks good, "really"')
+
+    def test_gzipped_jsonl_with_filters(self):
+        body = self.download("engagement", output="jsonl", gzip="1", action="like,share", content_type="job")
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([(r["id"], r["metadata"]) for r in records], [(self.like.pk, {"from": "feed"})])
+
+    def test_date_bounds(self):
+        today = timezone.localdate(self.like.created_at).isoformat()
+        self.assertEqual(len(self.download("engagement", output="jsonl", since=today, until=today).splitlines()), 2)
+        self.assertEqual(self.download("engagement", output="jsonl", until="2000-01-01"), b"")
+        self.assertEqual(self.client.get("/api/engagement/export/engagement/", {"since": "soon"}).status_code, 400)
+
+    def test_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="member"))
+        self.assertEqual(client.get("/api/engagement/export/engagement/").status_code, 403)
+        self.assertEqual(self.client.get("/api/engagement/export/users/").status_code, 404)
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import EngagementActionView, CommentListCreateView
+from .views import EngagementActionView, CommentListCreateView, ExportView
 
 urlpatterns = [
     path('action/', EngagementActionView.as_view(), name='engagement-action'),
     path('comments/', CommentListCreateView.as_view(), name='comment-list-create'),
+    path('export/<str:kind>/', ExportView.as_view(), name='engagement-export'),
 ]
@@ -1,6 +1,9 @@
+from django.http import StreamingHttpResponse
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from feed.aggregates import COUNTED_ACTIONS
+from . import export, live
 from .models import EngagementLog, Comment
 from .serializers import CommentSerializer, EngagementLogSerializer
 
@@ -27,6 +30,7 @@ class EngagementActionView(APIView):
             ).first()
             if existing:
                 existing.delete()
+                live.publish(content_type, content_id, 'likes', -1)
                 return Response({'status': 'unliked'})
             else:
                 EngagementLog.objects.create(
@@ -35,6 +39,7 @@ class EngagementActionView(APIView):
                     content_id=content_id, 
                     action='like'
                 )
+                live.publish(content_type, content_id, 'likes')
                 return Response({'status': 'liked'})
         else:
             EngagementLog.objects.create(
@@ -43,6 +48,7 @@ class EngagementActionView(APIView):
                 content_id=content_id,
                 action=action
             )
+            live.publish(content_type, content_id, COUNTED_ACTIONS[action])
             return Response({'status': 'logged'})
 
 class CommentListCreateView(generics.ListCreateAPIView):
@@ -57,4 +63,37 @@ class CommentListCreateView(generics.ListCreateAPIView):
         return Comment.objects.none()
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        comment = serializer.save(user=self.request.user)
+        live.publish(comment.content_type, comment.content_id, 'comments')
+
+
+class ExportView(APIView):
+    """Stream ``engagement`` or ``comments`` rows as CSV/JSONL, optionally gzipped (staff only).
+
+    Query parameters: ``output`` (csv, jsonl), ``gzip`` (1), ``since``/``until``
+    (ISO date or datetime), ``action`` (comma-separated) and ``content_type``.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, kind):
+        if kind not in export.EXPORTS:
+            return Response({'error': 'Unknown export'}, status=status.HTTP_404_NOT_FOUND)
+        params = request.query_params
+        fmt = params.get('output', 'csv')
+        if fmt not in export.FORMATS:
+            return Response({'error': 'output must be csv or jsonl'}, status=status.HTTP_400_BAD_REQUEST)
+        compress = params.get('gzip') in ('1', 'true')
+        try:
+            since = export.parse_bound(params.get('since'))
+            until = export.parse_bound(params.get('until'), end=True)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        actions = [a for a in params.get('action', '').split(',') if a]
+
+        response = StreamingHttpResponse(
+            export.stream(kind, fmt, compress, since=since, until=until, actions=actions,
+                          content_type=params.get('content_type') or None),
+            content_type='application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson'),
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export.filename(kind, fmt, compress)}"'
+        return response
@@ -1,8 +1,14 @@
 from django.contrib import admin
+
+from awasarhub.admin_tools import LargeTableAdmin
 from .models import FeedContent
 
 
 @admin.register(FeedContent)
-class FeedContentAdmin(admin.ModelAdmin):
+class FeedContentAdmin(LargeTableAdmin):
     list_display = ("id", "content_type", "title", "city", "created_at")
-    search_fields = ("title", "city", "tags")
+    list_filter = ("content_type",)
+    # Prefix match on the indexed title; tags and city would need a full scan.
+    search_fields = ("title__startswith",)
+    search_help_text = "Title prefix (case-sensitive)"
+    date_hierarchy = "created_at"
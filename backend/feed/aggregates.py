@@ -0,0 +1,75 @@
+from typing import Dict, Iterable, List, Tuple
+
+from django.db.models import Count
+
+from awasarhub.sparse import serialize
+from engagement.models import Comment, EngagementLog
+from jobs.serializers import JobSerializer
+from opportunities.serializers import OpportunitySerializer
+
+COUNTED_ACTIONS = {"like": "likes", "repost": "reposts", "share": "shares"}
+# Fields decorate() and the merge helpers read, kept under any ?fields= selection.
+POST_KEEP_FIELDS = ("id", "created_at")
+
+
+def engagement_counts(content_type: str, ids, user_id) -> Dict[int, dict]:
+    """Like/repost/share counts per content id, plus whether ``user_id`` liked it.
+
+    ``ids`` may be a list or a ``values("id")`` queryset, which is used as a subquery.
+    """
+    counts: Dict[int, dict] = {}
+    rows = (
+        EngagementLog.objects.filter(content_type=content_type, content_id__in=ids, action__in=list(COUNTED_ACTIONS))
+        .values("content_id", "action")
+        .annotate(n=Count("id"))
+        .values_list("content_id", "action", "n")
+    )
+    for content_id, action, n in rows:
+        counts.setdefault(content_id, {})[COUNTED_ACTIONS[action]] = n
+    liked = EngagementLog.objects.filter(
+        content_type=content_type, content_id__in=ids, action="like", user_id=user_id
+    ).values_list("content_id", flat=True)
+    for content_id in liked:
+        counts.setdefault(content_id, {})["liked_by_user"] = True
+    return counts
+
+
+def comment_counts(content_type: str, ids) -> Dict[int, int]:
+    return dict(
+        Comment.objects.filter(content_type=content_type, content_id__in=ids)
+        .values("content_id")
+        .annotate(n=Count("id"))
+        .values_list("content_id", "n")
+    )
+
+
+def decorate(items: List[dict], content_type: str, engagement: Dict[int, dict], comments: Dict[int, int]):
+    """Add the ``type`` and engagement fields the feed cards expect, in place."""
+    for item in items:
+        counts = engagement.get(item["id"], {})
+        item["type"] = content_type
+        item["likes"] = counts.get("likes", 0)
+        item["comments"] = comments.get(item["id"], 0)
+        item["reposts"] = counts.get("reposts", 0)
+        item["shares"] = counts.get("shares", 0)
+        item["liked_by_user"] = counts.get("liked_by_user", False)
+    return items
+
+
+def decorated_posts(request, jobs, opportunities, keep: Iterable[str] = POST_KEEP_FIELDS) -> Tuple[List[dict], List[dict]]:
+    """Serialize ``jobs`` and ``opportunities`` and add their engagement fields.
+
+    Counts are filtered by ``values("id")`` subqueries of the two querysets
+    rather than lists of ids, so large result sets stay one query each.
+    """
+    job_data = serialize(JobSerializer, jobs, request, keep=keep)
+    opp_data = serialize(OpportunitySerializer, opportunities, request, keep=keep)
+    user_id = request.user.id
+    for data, content_type, queryset in ((job_data, "job", jobs), (opp_data, "opportunity", opportunities)):
+        ids = queryset.values("id")
+        decorate(data, content_type, engagement_counts(content_type, ids, user_id), comment_counts(content_type, ids))
+    return job_data, opp_data
+
+
+def newest_first(*groups: List[dict]) -> List[dict]:
+    return sorted((item for group in groups for item in group), key=lambda x: x["created_at"], reverse=True)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class FeedConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "feed"
+
+    def ready(self):
+        from awasarhub import admission  # noqa: F401  (registers its system check)
+
+        from . import signals  # noqa: F401
@@ -0,0 +1,186 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.authentication import CachedJWTAuthentication
+from awasarhub.admission import admit, get_gate
+from awasarhub.sparse import serialize
+from engagement import live
+from jobs.models import Job
+from jobs.serializers import JobSerializer
+from opportunities.models import Opportunity
+from opportunities.serializers import OpportunitySerializer
+
+from . import sync
+from .aggregates import POST_KEEP_FIELDS, comment_counts, decorate, engagement_counts, newest_first
+from .trending import hottest, trending_first
+
+
+def _in_thread(fn):
+    """Run ``fn`` on its own worker thread and database connection.
+
+    Django's async ORM funnels every query through one shared sync thread, so it
+    cannot overlap queries; separate threads can.
+    """
+
+    def run(*args):
+        try:
+            return fn(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+async def _authenticate(request):
+    """Return (user, None) or (None, error response), mirroring IsAuthenticated."""
+    if request.method != "GET":
+        return None, _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        result = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except APIException as exc:
+        data = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return None, _json(data, status=exc.status_code)
+    if result is None:
+        return None, _json({"detail": "Authentication credentials were not provided."}, status=401)
+    return result[0], None
+
+
+async def _posts(request, jobs, opportunities, user_id, merge=newest_first):
+    job_ids = jobs.values("id")
+    opp_ids = opportunities.values("id")
+    keep = POST_KEEP_FIELDS + ("hot_score",) if merge is trending_first else POST_KEEP_FIELDS
+    job_data, opp_data, job_engagement, opp_engagement, job_comments, opp_comments = await asyncio.gather(
+        _in_thread(serialize)(JobSerializer, jobs, request, keep),
+        _in_thread(serialize)(OpportunitySerializer, opportunities, request, keep),
+        _in_thread(engagement_counts)("job", job_ids, user_id),
+        _in_thread(engagement_counts)("opportunity", opp_ids, user_id),
+        _in_thread(comment_counts)("job", job_ids),
+        _in_thread(comment_counts)("opportunity", opp_ids),
+    )
+    decorate(job_data, "job", job_engagement, job_comments)
+    decorate(opp_data, "opportunity", opp_engagement, opp_comments)
+    return merge(job_data, opp_data)
+
+
+async def global_feed(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    request.user = user
+    token, refusal = await admit("feed", request)
+    if refusal:
+        return refusal
+    try:
+        state = await _in_thread(sync.current)()
+        try:
+            since = sync.parse(request.GET.get("since"), state)
+        except ValueError as exc:
+            return _json({"detail": str(exc)}, status=400)
+        jobs, opportunities, removed = await _in_thread(sync.changed_posts)(since)
+        if request.GET.get("sort") == "trending":
+            limit = getattr(settings, "TRENDING_FEED_LIMIT", 100)
+            jobs, opportunities = await asyncio.gather(
+                _in_thread(hottest)(jobs, limit), _in_thread(hottest)(opportunities, limit)
+            )
+            items = (await _posts(request, jobs, opportunities, user.id, trending_first))[:limit]
+        else:
+            items = await _posts(request, jobs, opportunities, user.id)
+        data = {"items": items}
+        if since is not None:
+            data["deleted"] = removed
+        data.update(delta=since is not None, since=sync.token(state.value))
+        return _json(data)
+    finally:
+        await get_gate("feed").arelease(token)
+
+
+async def user_posts(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    return _json(await _posts(
+        request, Job.objects.filter(posted_by_id=user.id), Opportunity.objects.filter(posted_by_id=user.id), user.id
+    ))
+
+
+async def public_user_posts(request, username):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        author = await get_user_model().objects.aget(username=username)
+    except get_user_model().DoesNotExist:
+        return _json({"detail": "Not found."}, status=404)
+    return _json(await _posts(
+        request, Job.objects.filter(posted_by_id=author.id), Opportunity.objects.filter(posted_by_id=author.id), user.id
+    ))
+
+
+def _live_keys(value: str):
+    keys = set()
+    for item in value.split(","):
+        content_type, _, content_id = item.strip().partition(":")
+        if content_type not in ("job", "opportunity") or not content_id.isdigit():
+            raise ValueError(f"Invalid post {item.strip()!r}, expected e.g. job:12")
+        keys.add((content_type, int(content_id)))
+    return keys
+
+
+async def _live_events(keys, window, heartbeat):
+    # Subscribing inside the generator means a client gone before the first read leaves nothing behind.
+    subscription = live.subscribe(keys)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            batch = await subscription.next_batch(window, heartbeat)
+            if batch:
+                data = {f"{content_type}:{content_id}": counts for (content_type, content_id), counts in batch.items()}
+                yield f"event: counts\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        live.unsubscribe(subscription)
+
+
+async def live_counts(request):
+    """Server-sent events carrying net count changes for the posts in ``?posts=job:12,opportunity:3``.
+
+    Each ``counts`` event maps ``"<type>:<id>"`` to the changed fields, e.g.
+    ``{"job:12":{"likes":2,"comments":1}}``; clients add them to the counts
+    they already show. Needs an ASGI server, and an EventSource client that
+    can send the Authorization header.
+    """
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        keys = _live_keys(request.GET.get("posts", ""))
+    except ValueError as exc:
+        return _json({"detail": str(exc)}, status=400)
+    if len(keys) > getattr(settings, "LIVE_MAX_POSTS", 200):
+        return _json({"detail": f"At most {getattr(settings, 'LIVE_MAX_POSTS', 200)} posts per stream."}, status=400)
+    if live.subscriber_count() >= getattr(settings, "LIVE_MAX_STREAMS", 1000):
+        response = _json({"detail": "Server is busy, try again shortly."}, status=503)
+        response["Retry-After"] = "10"
+        return response
+    response = StreamingHttpResponse(
+        _live_events(
+            keys, getattr(settings, "LIVE_COALESCE_SECONDS", 1.0), getattr(settings, "LIVE_HEARTBEAT_SECONDS", 15),
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the stream
+    return response
@@ -0,0 +1,175 @@
+"""Streaming bulk import of jobs and opportunities from CSV or JSONL.
+
+Rows are parsed one at a time from a binary file object, validated with the
+same serializer rules as ``JobViewSet``/``OpportunityViewSet.create`` and
+inserted with ``bulk_create`` one batch at a time, so memory is bounded by
+the batch size rather than the file. Invalid rows are skipped and reported
+by their 1-based position in the file; each batch commits on its own, so an
+error late in a file does not undo the rows before it.
+
+``ImportFileMixin`` adds the ``import`` upload action to the job and
+opportunity viewsets, with BULK_IMPORT_MAX_BYTES/BULK_IMPORT_MAX_ROWS limits.
+"""
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from taskqueue.queue import enqueue_many
+
+from . import dedup, related, sync, tasks
+
+FORMATS = ("csv", "jsonl")
+# Fields that only the server sets; ignored if present in the input.
+SERVER_FIELDS = ("id", "posted_by", "posted_by_details", "created_at", "hot_score", "duplicate_of", "change_seq")
+_NULLABLE_FLOATS = ("latitude", "longitude")
+
+
+def _target(kind: str):
+    from jobs.models import Job
+    from jobs.serializers import JobSerializer
+    from opportunities.models import Opportunity
+    from opportunities.serializers import OpportunitySerializer
+
+    return {"job": (Job, JobSerializer), "opportunity": (Opportunity, OpportunitySerializer)}[kind]
+
+
+def detect_format(filename: str, default: str = "csv") -> str:
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def _csv_row(row: Dict[str, str]) -> dict:
+    data = {}
+    for key, value in row.items():
+        if key is None or value is None or value == "":
+            # Blank cells fall back to the model defaults instead of failing number/URL validation.
+            continue
+        if key == "tags":
+            value = json.loads(value) if value.lstrip().startswith("[") else [t.strip() for t in value.split(",") if t.strip()]
+        data[key.strip()] = value
+    return data
+
+
+def read_rows(stream, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (row number, dict) for every record of a binary stream, or (row number, error message)."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            try:
+                yield number, _csv_row(row)
+            except ValueError as exc:
+                yield number, f"Invalid tags: {exc}"
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, f"Invalid JSON: {exc}"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def import_rows(kind: str, rows: Iterable[Tuple[int, object]], user=None, batch_size: int = 1000, max_errors: int = 1000,
+                max_rows: Optional[int] = None) -> dict:
+    """Validate and insert ``rows`` from ``read_rows``; returns {"created", "failed", "errors"}.
+
+    At most ``max_errors`` error entries are kept; ``failed`` counts them all.
+    Reading stops after ``max_rows`` rows, with ``"truncated": True`` in the report.
+    """
+    model, serializer_class = _target(kind)
+    validator = serializer_class()
+    owner = "company" if kind == "job" else "org"
+    report = {"created": 0, "failed": 0, "errors": []}
+
+    def fail(number, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": number, "errors": errors})
+
+    def flush(batch):
+        with transaction.atomic():
+            # bulk_create bypasses save(), so stamp the batch for delta syncs here.
+            seq = sync.next_seq()
+            for obj in batch:
+                obj.change_seq = seq
+            created = model.objects.bulk_create(batch, batch_size=batch_size)
+            # bulk_create skips post_save, so run the ingest-time duplicate check here.
+            if created and created[0].pk is not None:
+                dedup.index_posts(kind, [
+                    (obj.pk, dedup.text_of(obj.title, obj.description, getattr(obj, owner))) for obj in created
+                ])
+                # And the related-posts indexing post_save would have queued; commits with the batch.
+                if related.incremental():
+                    enqueue_many(tasks.index_related, [{"content_type": kind, "content_id": obj.pk} for obj in created])
+        report["created"] += len(batch)
+
+    batch = []
+    for number, data in rows:
+        if max_rows is not None and number > max_rows:
+            report["truncated"] = True
+            report["errors"].append({"row": number, "errors": {"non_field_errors": [
+                f"Only the first {max_rows} rows of a file are imported; this row and the rest were skipped."
+            ]}})
+            break
+        if not isinstance(data, dict):
+            fail(number, {"non_field_errors": [data]})
+            continue
+        for field in SERVER_FIELDS:
+            data.pop(field, None)
+        for field in _NULLABLE_FLOATS:
+            if data.get(field) == "":
+                data[field] = None
+        try:
+            validated = validator.run_validation(data)
+        except ValidationError as exc:
+            fail(number, exc.detail)
+            continue
+        batch.append(model(**validated, posted_by=user))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return report
+
+
+class ImportFileMixin:
+    """``POST <list>/import/`` for a job or opportunity viewset; set ``import_kind``."""
+
+    import_kind: str
+
+    @action(detail=False, methods=["post"], url_path="import", permission_classes=[permissions.IsAuthenticated])
+    def import_file(self, request):
+        """Create many posts from an uploaded CSV or JSONL ``file``; returns a per-row error report."""
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "Upload a CSV or JSONL file as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        max_bytes = getattr(settings, "BULK_IMPORT_MAX_BYTES", 10 * 1024 * 1024)
+        if upload.size > max_bytes:
+            return Response(
+                {"detail": f"The file is larger than {max_bytes} bytes."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        fmt = request.data.get("format") or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({"detail": f"Unsupported format {fmt!r}."}, status=status.HTTP_400_BAD_REQUEST)
+        report = import_rows(
+            self.import_kind, read_rows(upload.file, fmt), user=request.user,
+            max_rows=getattr(settings, "BULK_IMPORT_MAX_ROWS", 10000),
+        )
+        return Response(report, status=status.HTTP_201_CREATED if report["created"] else status.HTTP_400_BAD_REQUEST)
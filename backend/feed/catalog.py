@@ -0,0 +1,365 @@
+"""Versioned columnar snapshot of rankable content, shared by every worker.
+
+``build`` reads feed items, jobs, opportunities and enabled ads into flat
+columns (kind, id, coordinates, created_at, tag bitsets, city/category ids
+and engagement counters), rows sorted by (kind, id). ``publish`` writes
+them as ``.npy`` files into a new version directory and flips ``CURRENT``
+atomically, like the recommender. Workers memory-map the current version
+through ``get_catalog``, so all of them read the same page-cache pages
+instead of each holding and rebuilding its own copy.
+
+The snapshot records the change sequence it was built at (see feed.sync):
+feed rows saved after that are ranked the usual way until the next build.
+
+NumPy is imported lazily so workers that never rank do not load it.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("feed", "job", "opportunity", "ad")
+COUNTERS = ("likes", "comments", "reposts", "shares")
+COLUMNS = ("kind", "ids", "latitude", "longitude", "created_at", "tags", "tag_counts", "city", "category", "counters")
+
+
+def catalog_dir() -> Path:
+    return Path(getattr(settings, "CATALOG_DIR", Path(settings.BASE_DIR) / "var" / "catalog"))
+
+
+def _popcount(words):
+    """Set bits per row of a uint64 array, summed over the last axis."""
+    import numpy as np
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(np.ascontiguousarray(words).view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def _norm(value) -> str:
+    # Same normalisation as ads.targeting.
+    return str(value or "").strip().lower()
+
+
+def _rows():
+    """(kind, id, latitude, longitude, created_at, tags, city, category) for everything rankable."""
+    from ads.models import Advertisement
+    from jobs.models import Job
+    from opportunities.models import Opportunity
+
+    from .models import FeedContent
+
+    fields = ("id", "latitude", "longitude", "created_at", "tags", "city")
+    # Feed ranking lower-cases tags as they are; ad targeting also strips them.
+    for row in FeedContent.objects.order_by("id").values_list(*fields).iterator(chunk_size=5000):
+        yield ("feed", *row[:4], [str(t).lower() for t in row[4] or []], _norm(row[5]), "")
+    for kind, model in (("job", Job), ("opportunity", Opportunity)):
+        for row in model.objects.order_by("id").values_list(*fields).iterator(chunk_size=5000):
+            yield (kind, *row[:4], [str(t).lower() for t in row[4] or []], _norm(row[5]), "")
+    for row in Advertisement.objects.filter(enabled=True).order_by("id").values_list(
+        *fields, "category"
+    ).iterator(chunk_size=5000):
+        yield ("ad", *row[:4], [_norm(t) for t in row[4] or [] if _norm(t)], _norm(row[5]), _norm(row[6]))
+
+
+def _counters(keys: Dict[tuple, int], out):
+    from django.db.models import Count
+
+    from engagement.models import Comment, EngagementLog
+
+    from .aggregates import COUNTED_ACTIONS
+
+    column = {name: i for i, name in enumerate(COUNTERS)}
+    events = (
+        EngagementLog.objects.filter(action__in=list(COUNTED_ACTIONS))
+        .values("content_type", "content_id", "action").annotate(n=Count("id"))
+        .values_list("content_type", "content_id", "action", "n")
+    )
+    for content_type, content_id, action, n in events:
+        row = keys.get((content_type or "feed", content_id))
+        if row is not None:
+            out[row, column[COUNTED_ACTIONS[action]]] = n
+    comments = (
+        Comment.objects.values("content_type", "content_id").annotate(n=Count("id"))
+        .values_list("content_type", "content_id", "n")
+    )
+    for content_type, content_id, n in comments:
+        row = keys.get((content_type or "feed", content_id))
+        if row is not None:
+            out[row, column["comments"]] = n
+
+
+def build() -> dict:
+    """Read the database into ``{"columns": {name: array}, "meta": {...}}``."""
+    import numpy as np
+
+    from . import sync
+
+    # Read the sequence first: anything saved while we read is newer than the snapshot claims.
+    change_seq = sync.current().value
+    rows = list(_rows())
+    terms: Dict[str, int] = {}
+    cities: Dict[str, int] = {}
+    categories: Dict[str, int] = {}
+    for _, _, _, _, _, tags, city, category in rows:
+        for tag in tags:
+            terms.setdefault(tag, len(terms))
+        if city:
+            cities.setdefault(city, len(cities))
+        if category:
+            categories.setdefault(category, len(categories))
+
+    n = len(rows)
+    words = max(1, (len(terms) + 63) // 64)
+    kind = np.zeros(n, dtype=np.uint8)
+    ids = np.zeros(n, dtype=np.int64)
+    latitude = np.full(n, np.nan, dtype=np.float64)
+    longitude = np.full(n, np.nan, dtype=np.float64)
+    created_at = np.zeros(n, dtype=np.int64)
+    tags = np.zeros((n, words), dtype=np.uint64)
+    city_ids = np.full(n, -1, dtype=np.int32)
+    category_ids = np.full(n, -1, dtype=np.int32)
+    counters = np.zeros((n, len(COUNTERS)), dtype=np.int32)
+    keys = {}
+    for i, (content_type, pk, lat, lon, created, row_tags, city, category) in enumerate(rows):
+        kind[i] = KINDS.index(content_type)
+        ids[i] = pk
+        if lat is not None and lon is not None:
+            latitude[i], longitude[i] = lat, lon
+        created_at[i] = int(created.timestamp())
+        for tag in set(row_tags):
+            bit = terms[tag]
+            tags[i, bit // 64] |= np.uint64(1 << (bit % 64))
+        city_ids[i] = cities.get(city, -1)
+        category_ids[i] = categories.get(category, -1)
+        keys[(content_type, pk)] = i
+    _counters(keys, counters)
+
+    columns = {
+        "kind": kind, "ids": ids, "latitude": latitude, "longitude": longitude, "created_at": created_at,
+        "tags": tags, "tag_counts": _popcount(tags).astype(np.int16), "city": city_ids,
+        "category": category_ids, "counters": counters,
+    }
+    meta = {
+        "change_seq": change_seq,
+        "built_at": time.time(),
+        "kinds": list(KINDS),
+        "counters": list(COUNTERS),
+        "terms": sorted(terms, key=terms.get),
+        "cities": sorted(cities, key=cities.get),
+        "categories": sorted(categories, key=categories.get),
+    }
+    return {"columns": columns, "meta": meta}
+
+
+def publish(snapshot: dict, keep: int = 3) -> Path:
+    """Write a new version and point ``CURRENT`` at it; older versions beyond ``keep`` are removed.
+
+    Workers still mapping a removed version keep their pages until they reload.
+    """
+    import numpy as np
+
+    root = catalog_dir()
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{snapshot['meta']['change_seq']}-{os.getpid()}"
+    staging = root / f".{version}"
+    staging.mkdir(parents=True, exist_ok=True)
+    for name in COLUMNS:
+        np.save(staging / f"{name}.npy", np.ascontiguousarray(snapshot["columns"][name]))
+    (staging / "meta.json").write_text(json.dumps(snapshot["meta"]))
+    # The directory only appears under its real name once complete, then CURRENT flips to it.
+    os.replace(staging, root / version)
+    pointer = root / f"CURRENT.{os.getpid()}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, root / "CURRENT")
+
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-keep] if keep else []:
+        if old.name != version:
+            shutil.rmtree(old, ignore_errors=True)
+    return root / version
+
+
+class Catalog:
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self.path = path
+        meta = json.loads((path / "meta.json").read_text())
+        self.change_seq = meta["change_seq"]
+        self.built_at = meta["built_at"]
+        self.terms = {term: bit for bit, term in enumerate(meta["terms"])}
+        self.cities = {city: i for i, city in enumerate(meta["cities"])}
+        self.categories = {category: i for i, category in enumerate(meta["categories"])}
+        for name in COLUMNS:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+        # Rows are sorted by (kind, id), so each kind is one contiguous, id-sorted slice.
+        bounds = np.searchsorted(self.kind, np.arange(len(KINDS) + 1))
+        self._slices = {kind: slice(int(bounds[i]), int(bounds[i + 1])) for i, kind in enumerate(KINDS)}
+        # Decoded once per version; ads.targeting re-checks it against live ads after every index invalidation.
+        self._ad_targeting = self._decode_ad_targeting()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, kind: str, ids: Sequence[int]):
+        """Row numbers of ``ids`` within ``kind``, -1 where the snapshot does not have them."""
+        import numpy as np
+
+        part = self._slices[kind]
+        known = self.ids[part]
+        wanted = np.asarray(ids, dtype=np.int64)
+        pos = np.searchsorted(known, wanted)
+        pos[pos >= len(known)] = 0
+        found = (known[pos] == wanted) if len(known) else np.zeros(len(wanted), dtype=bool)
+        return np.where(found, pos + part.start, -1)
+
+    def ids_of(self, kind: str):
+        return self.ids[self._slices[kind]]
+
+    def ad_targeting(self) -> Dict[int, tuple]:
+        """``{ad id: (city, category, tags)}`` as stored, for checking the snapshot against live ads."""
+        return self._ad_targeting
+
+    def _decode_ad_targeting(self) -> Dict[int, tuple]:
+        import numpy as np
+
+        part = self._slices["ad"]
+        terms = list(self.terms)
+        cities, categories = list(self.cities), list(self.categories)
+        out = {}
+        for row in range(part.start, part.stop):
+            bits = np.flatnonzero(np.unpackbits(self.tags[row].view(np.uint8), bitorder="little"))
+            out[int(self.ids[row])] = (
+                cities[self.city[row]] if self.city[row] >= 0 else "",
+                categories[self.category[row]] if self.category[row] >= 0 else "",
+                frozenset(terms[bit] for bit in bits),
+            )
+        return out
+
+    def term_mask(self, terms: Iterable[str]):
+        import numpy as np
+
+        mask = np.zeros(self.tags.shape[1], dtype=np.uint64)
+        for term in terms:
+            bit = self.terms.get(term)
+            if bit is not None:
+                mask[bit // 64] |= np.uint64(1 << (bit % 64))
+        return mask
+
+    def overlap(self, rows, mask):
+        """Number of ``mask`` terms each row is tagged with; only the mask's non-zero words are read."""
+        import numpy as np
+
+        words = np.flatnonzero(mask)
+        if not len(words):
+            return np.zeros(len(rows), dtype=np.int64)
+        return _popcount(self.tags[rows][:, words] & mask[words])
+
+    def ad_relevance(self, city: str, interests: set, strict_city: bool) -> Dict[int, float]:
+        """``{ad id: relevance}`` for the matching ads, as ``AdIndex.candidates``/``relevance`` define them.
+
+        Unlike ``AdIndex.candidates`` there is no fall back to every ad when none match.
+        """
+        import numpy as np
+
+        part = self._slices["ad"]
+        overlap = self.overlap(np.arange(part.start, part.stop), self.term_mask(interests))
+        counts = self.tag_counts[part]
+        city_match = self.city[part] == (self.cities.get(city, -2) if city else -2)
+        category_match = np.isin(self.category[part], [self.categories[i] for i in interests if i in self.categories])
+        if strict_city and city:
+            candidates = city_match
+        else:
+            candidates = (self.city[part] == -1) | city_match | (overlap > 0) | category_match
+        tag_score = overlap / np.maximum(counts, 1) if interests else np.zeros(len(counts))
+        relevance = 1.0 + city_match + tag_score + 0.5 * category_match
+        return dict(zip(self.ids[part][candidates].tolist(), relevance[candidates].tolist()))
+
+
+_catalog: Optional[Catalog] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[Catalog]:
+    """The current published snapshot, re-checking ``CURRENT`` at most every CATALOG_RELOAD_INTERVAL."""
+    global _catalog, _checked_at
+    interval = getattr(settings, "CATALOG_RELOAD_INTERVAL", 30)
+    if time.monotonic() - _checked_at < interval:
+        return _catalog
+    with _lock:
+        if time.monotonic() - _checked_at >= interval:
+            _checked_at = time.monotonic()
+            try:
+                version = (catalog_dir() / "CURRENT").read_text().strip()
+            except OSError:
+                _catalog = None
+            else:
+                if _catalog is None or _catalog.path.name != version:
+                    try:
+                        _catalog = Catalog(catalog_dir() / version)
+                    except (OSError, ValueError, KeyError):
+                        logger.exception("Could not load catalog version %s", version)
+    return _catalog
+
+
+def feed_ranks(catalog: Catalog, items: List, interests: List[str], user_loc) -> List[Optional[float]]:
+    """``rank_score`` of each FeedContent in ``items`` from the snapshot; None for rows newer than it."""
+    import numpy as np
+
+    from .ranking import rank_scores
+
+    rows = catalog.rows("feed", [item.id for item in items])
+    fresh = np.fromiter((item.change_seq <= catalog.change_seq for item in items), dtype=bool, count=len(items))
+    usable = (rows >= 0) & fresh
+    picked = rows[usable]
+    scores = rank_scores(
+        interests, user_loc,
+        catalog.overlap(picked, catalog.term_mask(i.lower() for i in interests or [])),
+        catalog.tag_counts[picked], catalog.latitude[picked], catalog.longitude[picked],
+    )
+    out: List[Optional[float]] = [None] * len(items)
+    for position, score in zip(np.flatnonzero(usable).tolist(), scores.tolist()):
+        out[position] = score
+    return out
+
+
+def all_feed_ranks(catalog: Catalog, interests: List[str], user_loc) -> Tuple[List[int], List[float]]:
+    """(ids, ranks) of every feed item, without loading the items.
+
+    Snapshot rows are ranked in one vectorised pass; only rows saved since the
+    snapshot was built are read from the database (and replace their stale
+    snapshot rows). Ids of items deleted since may still appear.
+    """
+    import numpy as np
+
+    from .models import FeedContent
+    from .ranking import rank_score, rank_scores
+
+    part = catalog._slices["feed"]
+    rows = np.arange(part.start, part.stop)
+    ids = np.asarray(catalog.ids[part], dtype=np.int64)
+    ranks = rank_scores(
+        interests, user_loc,
+        catalog.overlap(rows, catalog.term_mask(i.lower() for i in interests or [])),
+        catalog.tag_counts[part], catalog.latitude[part], catalog.longitude[part],
+    )
+    changed = list(
+        FeedContent.objects.filter(change_seq__gt=catalog.change_seq).only("id", "tags", "latitude", "longitude")
+    )
+    if changed:
+        stale = np.isin(ids, np.fromiter((item.id for item in changed), dtype=np.int64, count=len(changed)))
+        ids = np.concatenate([ids[~stale], np.fromiter((item.id for item in changed), dtype=np.int64, count=len(changed))])
+        ranks = np.concatenate([ranks[~stale], np.fromiter(
+            (rank_score(interests, user_loc, item.tags, item.latitude, item.longitude) for item in changed),
+            dtype=np.float64, count=len(changed),
+        )])
+    return ids.tolist(), ranks.tolist()
@@ -0,0 +1,226 @@
+"""Near-duplicate detection for jobs and opportunities with MinHash LSH.
+
+Each post's title, description and company/org are shingled into word
+3-grams and summarised by a MinHash signature, whose agreement rate between
+two posts estimates their Jaccard similarity. The signature is cut into
+bands; posts sharing any band bucket become candidates, so a check only
+compares against the few posts that collide instead of the whole corpus.
+
+A post whose best candidate is at least ``DEDUP_THRESHOLD`` similar gets
+``duplicate_of`` set to that candidate's original; feeds hide such posts and
+the admin lists them for review.
+"""
+import hashlib
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.constants import OnConflict
+
+TOKEN = re.compile(r"[a-z0-9]+")
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+_coefficients = None
+
+
+def bands() -> int:
+    return getattr(settings, "DEDUP_BANDS", 16)
+
+
+def rows_per_band() -> int:
+    return getattr(settings, "DEDUP_ROWS", 8)
+
+
+def threshold() -> float:
+    return getattr(settings, "DEDUP_THRESHOLD", 0.8)
+
+
+def text_of(title: str, description: str, owner: str) -> str:
+    return f"{owner} {title} {description}"
+
+
+def instance_text(instance) -> Tuple[str, str]:
+    content_type = instance._meta.model_name
+    owner = instance.company if content_type == "job" else instance.org
+    return content_type, text_of(instance.title, instance.description, owner)
+
+
+def shingles(text: str) -> List[int]:
+    words = TOKEN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = words
+    else:
+        grams = (" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    return list({zlib.crc32(gram.encode()) for gram in grams})
+
+
+def signature(text: str) -> Optional[array]:
+    """MinHash of ``text`` as ``bands() * rows_per_band()`` uint32 values, or None if it has no words."""
+    import numpy as np
+
+    global _coefficients
+    hashed = shingles(text)
+    if not hashed:
+        return None
+    size = bands() * rows_per_band()
+    if _coefficients is None or len(_coefficients[0]) != size:
+        rng = np.random.default_rng(1)
+        _coefficients = (
+            rng.integers(1, 1 << 32, size=size, dtype=np.uint64),
+            rng.integers(0, 1 << 32, size=size, dtype=np.uint64),
+        )
+    a, b = _coefficients
+    x = np.asarray(hashed, dtype=np.uint64)
+    # a * x + b stays below 2**64 because every operand is below 2**32.
+    values = ((a[:, None] * x[None, :] + b[:, None]) % _PRIME) & 0xFFFFFFFF
+    return array("I", values.min(axis=1).astype(np.uint32).tobytes())
+
+
+def band_keys(sig: array) -> List[str]:
+    r = rows_per_band()
+    return [
+        f"{band:02d}{hashlib.blake2b(sig[band * r:(band + 1) * r].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(bands())
+    ]
+
+
+def similarity(a: array, b: array) -> float:
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _unpack(data) -> array:
+    sig = array("I")
+    sig.frombytes(bytes(data))
+    return sig
+
+
+def _chunks(items: Sequence, size: int = 500) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_many(model, fields: Sequence[str], rows: List[tuple], ignore_conflicts: bool = False):
+    ops = connection.ops
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    sql = "%s %s (%s) VALUES (%s) %s" % (
+        ops.insert_statement(on_conflict=on_conflict),
+        ops.quote_name(model._meta.db_table),
+        ", ".join(ops.quote_name(model._meta.get_field(f).column) for f in fields),
+        ", ".join(["%s"] * len(fields)),
+        ops.on_conflict_suffix_sql(fields, on_conflict, None, None),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _model(content_type: str):
+    from jobs.models import Job
+    from opportunities.models import Opportunity
+
+    return {"job": Job, "opportunity": Opportunity}[content_type]
+
+
+def index_posts(content_type: str, posts: Sequence[Tuple[int, str]]) -> Dict[int, int]:
+    """Sign and bucket ``posts`` ((pk, text), oldest first) and mark the duplicates among them.
+
+    Posts are matched against everything already indexed and against earlier
+    posts of the same batch. Returns ``{pk: original pk}`` for the duplicates.
+    """
+    from .models import LshBucket, MinHashSignature
+
+    signed = []
+    for pk, text in posts:
+        sig = signature(text)
+        if sig is not None:
+            signed.append((pk, sig, band_keys(sig)))
+    if not signed:
+        return {}
+
+    buckets = defaultdict(set)
+    all_keys = sorted({key for _, _, keys in signed for key in keys})
+    for chunk in _chunks(all_keys):
+        for key, content_id in LshBucket.objects.filter(content_type=content_type, key__in=chunk).values_list(
+            "key", "content_id"
+        ):
+            buckets[key].add(content_id)
+
+    signatures = {}
+    indexed = sorted({content_id for ids in buckets.values() for content_id in ids})
+    for chunk in _chunks(indexed):
+        for content_id, data in MinHashSignature.objects.filter(
+            content_type=content_type, content_id__in=chunk
+        ).values_list("content_id", "signature"):
+            signatures[content_id] = _unpack(data)
+
+    model = _model(content_type)
+    originals = {}
+    for chunk in _chunks(indexed):
+        originals.update(model.objects.filter(pk__in=chunk).values_list("pk", "duplicate_of_id"))
+
+    duplicates: Dict[int, int] = {}
+    for pk, sig, keys in signed:
+        candidates = set().union(*(buckets[key] for key in keys)) - {pk}
+        if candidates:
+            # Most similar candidate wins; ties go to the oldest.
+            score, _, best = max((similarity(sig, signatures[c]), -c, c) for c in candidates)
+            if score >= threshold():
+                duplicates[pk] = duplicates.get(best) or originals.get(best) or best
+        signatures[pk] = sig
+        for key in keys:
+            buckets[key].add(pk)
+
+    # Plain executemany: one post writes bands() bucket rows, and building that many model instances
+    # for bulk_create costs more than the inserts themselves.
+    _insert_many(MinHashSignature, ("content_type", "content_id", "signature"),
+                 [(content_type, pk, sig.tobytes()) for pk, sig, _ in signed], ignore_conflicts=True)
+    _insert_many(LshBucket, ("content_type", "key", "content_id"),
+                 [(content_type, key, pk) for pk, _, keys in signed for key in keys])
+    by_original = defaultdict(list)
+    for pk, original in duplicates.items():
+        by_original[original].append(pk)
+    from . import sync
+
+    for original, pks in by_original.items():
+        sync.touch(model.objects.filter(pk__in=pks), duplicate_of_id=original)
+    return duplicates
+
+
+def index_instance(instance) -> Optional[int]:
+    """Index one newly created post; returns the pk of the post it duplicates, if any."""
+    content_type, text = instance_text(instance)
+    original = index_posts(content_type, [(instance.pk, text)]).get(instance.pk)
+    if original is not None:
+        instance.duplicate_of_id = original
+    return original
+
+
+def unindexed(content_type: str):
+    """Posts without a signature yet, as an id-ordered ``values_list`` of (pk, title, description, owner)."""
+    from .models import MinHashSignature
+
+    owner = "company" if content_type == "job" else "org"
+    done = MinHashSignature.objects.filter(content_type=content_type).values("content_id")
+    return (
+        _model(content_type).objects.exclude(pk__in=done).order_by("pk")
+        .values_list("pk", "title", "description", owner)
+    )
+
+
+def forget(content_type: str, content_id: int):
+    from .models import LshBucket, MinHashSignature
+
+    LshBucket.objects.filter(content_type=content_type, content_id=content_id).delete()
+    MinHashSignature.objects.filter(content_type=content_type, content_id=content_id).delete()
+
+
+def clear(content_type: str):
+    from . import sync
+    from .models import LshBucket, MinHashSignature
+
+    LshBucket.objects.filter(content_type=content_type).delete()
+    MinHashSignature.objects.filter(content_type=content_type).delete()
+    sync.touch(_model(content_type).objects.filter(duplicate_of__isnull=False), duplicate_of=None)
@@ -0,0 +1,80 @@
+import csv
+import json
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from feed import bulk_import
+from jobs.serializers import JobSerializer
+
+WORDS = "python django react senior junior engineer remote team build apis data cloud product design".split()
+CITIES = ["Kathmandu", "Pokhara", "Lalitpur", "Biratnagar", ""]
+
+
+def _rows(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "company": f"Company {i % 500}",
+            "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+            "city": rng.choice(CITIES),
+            "latitude": f"{27 + rng.random():.5f}" if i % 3 else "",
+            "longitude": f"{85 + rng.random():.5f}" if i % 3 else "",
+            "tags": ",".join(rng.sample(WORDS, 3)),
+            # Every 100th row is invalid, to exercise the error report.
+            "link_url": "not a url" if i % 100 == 99 else f"https://example.com/jobs/{i}",
+        }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the streaming bulk import against per-row serializer saves (changes are rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--baseline-rows", type=int, default=2_000, help="Rows for the one-by-one comparison")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path, jsonl_path = f"{tmp}/jobs.csv", f"{tmp}/jobs.jsonl"
+            with open(csv_path, "w", newline="") as out:
+                writer = csv.DictWriter(out, fieldnames=list(next(_rows(1))))
+                writer.writeheader()
+                writer.writerows(_rows(rows))
+            with open(jsonl_path, "w") as out:
+                for row in _rows(rows):
+                    out.write(json.dumps(row) + "\n")
+
+            self._baseline(options["baseline_rows"])
+            for fmt, path in (("csv", csv_path), ("jsonl", jsonl_path)):
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    with open(path, "rb") as stream:
+                        report = bulk_import.import_rows(
+                            "job", bulk_import.read_rows(stream, fmt), batch_size=options["batch_size"]
+                        )
+                    elapsed = time.perf_counter() - start
+                    transaction.set_rollback(True)
+                self.stdout.write(
+                    f"bulk {fmt:<5} {rows:7d} rows in {elapsed:6.1f}s  {rows / elapsed:8.0f} rows/s  "
+                    f"{report['created']} created, {report['failed']} rejected"
+                )
+
+    def _baseline(self, n):
+        with transaction.atomic():
+            start = time.perf_counter()
+            for row in _rows(n):
+                row = {k: v for k, v in row.items() if v != ""}
+                row["tags"] = row["tags"].split(",")
+                serializer = JobSerializer(data=row)
+                if serializer.is_valid():
+                    with transaction.atomic():
+                        serializer.save()
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        self.stdout.write(f"one-by-one  {n:7d} rows in {elapsed:6.1f}s  {n / elapsed:8.0f} rows/s")
@@ -0,0 +1,80 @@
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from feed import async_views
+from feed.views import FeedViewSet
+from jobs.models import Job
+from opportunities.models import Opportunity
+
+
+class Command(BaseCommand):
+    help = "Compare sync and async global_feed latency with a simulated database round-trip delay"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delay-ms", type=float, default=5.0, help="Added to every SQL query")
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--username", help="User to request as (defaults to the first user)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user = User.objects.filter(username=options["username"]).first() if options["username"] else User.objects.first()
+        if user is None:
+            raise CommandError("No user found; run seed_demo first.")
+        delay = options["delay_ms"] / 1000.0
+
+        def delayed(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delayed)
+
+        # Every connection, including those opened by the async view's worker threads, gets the delay.
+        connection_created.connect(install)
+        connection.ensure_connection()
+        if delayed not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delayed)
+
+        sync_view = FeedViewSet.as_view({"get": "global_feed"})
+        sync_factory = APIRequestFactory()
+        token = str(AccessToken.for_user(user))
+        async_factory = RequestFactory()
+
+        def run_sync():
+            request = sync_factory.get("/api/feed/global_feed/")
+            force_authenticate(request, user=user)
+            return sync_view(request)
+
+        def run_async():
+            request = async_factory.get("/api/feed/global_feed/async/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            return async_to_sync(async_views.global_feed)(request)
+
+        self.stdout.write(
+            f"{Job.objects.count()} jobs, {Opportunity.objects.count()} opportunities, "
+            f"{options['delay_ms']:.1f} ms per query, {options['iterations']} iterations"
+        )
+        try:
+            for label, fn in (("sync global_feed", run_sync), ("async global_feed", run_async)):
+                timings = []
+                for _ in range(options["iterations"]):
+                    start = time.perf_counter()
+                    response = fn()
+                    timings.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f"{label} returned {response.status_code}")
+                self.stdout.write(
+                    f"{label:<20} median {statistics.median(timings) * 1000:8.1f} ms   "
+                    f"max {max(timings) * 1000:8.1f} ms"
+                )
+        finally:
+            connection_created.disconnect(install)
+            connection.execute_wrappers.remove(delayed)
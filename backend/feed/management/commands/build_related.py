@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from feed import related
+
+
+class Command(BaseCommand):
+    help = "Rebuild the related-posts index (top-K TF-IDF neighbours of every job and opportunity)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-k", type=int, default=10, help="Neighbours kept per item")
+        parser.add_argument("--block-size", type=int, default=1000, help="Rows multiplied at a time")
+        parser.add_argument("--min-df", type=int, default=1, help="Ignore terms in fewer documents")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = related.build_index(k=options["k"], block_size=options["block_size"], min_df=options["min_df"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} items in {time.perf_counter() - start:.1f}s"))
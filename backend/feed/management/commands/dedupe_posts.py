@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from feed import dedup
+
+
+class Command(BaseCommand):
+    help = "Backfill MinHash signatures for existing jobs/opportunities and flag near-duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--rebuild", action="store_true", help="Drop existing signatures and flags first")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        batch_size = options["batch_size"]
+        for content_type in ("job", "opportunity"):
+            if options["rebuild"]:
+                dedup.clear(content_type)
+            indexed = flagged = last_pk = 0
+            while True:
+                # Each batch is committed before the next is read, so an interrupted run resumes where it stopped.
+                rows = list(dedup.unindexed(content_type).filter(pk__gt=last_pk)[:batch_size])
+                if not rows:
+                    break
+                last_pk = rows[-1][0]
+                batch = [(pk, dedup.text_of(title, description, owner)) for pk, title, description, owner in rows]
+                with transaction.atomic():
+                    flagged += len(dedup.index_posts(content_type, batch))
+                indexed += len(batch)
+                self.stdout.write(f"{content_type}: {indexed} indexed, {flagged} duplicates")
+            self.stdout.write(self.style.SUCCESS(f"{content_type}: done ({indexed} indexed, {flagged} duplicates)"))
+        self.stdout.write(f"Finished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,46 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from feed import bulk_import
+
+
+class Command(BaseCommand):
+    help = "Bulk-import jobs or opportunities from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["job", "opportunity"])
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=bulk_import.FORMATS, help="Defaults to the file extension")
+        parser.add_argument("--user", help="Username recorded as posted_by")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--errors", help="Write the per-row error report to this JSONL file")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user {options['user']!r}")
+        fmt = options["format"] or bulk_import.detect_format(options["path"])
+        start = time.perf_counter()
+        with open(options["path"], "rb") as stream:
+            report = bulk_import.import_rows(
+                options["kind"], bulk_import.read_rows(stream, fmt), user=user,
+                batch_size=options["batch_size"], max_errors=float("inf") if options["errors"] else 20,
+            )
+        elapsed = time.perf_counter() - start
+        if options["errors"]:
+            with open(options["errors"], "w") as out:
+                for entry in report["errors"]:
+                    out.write(json.dumps(entry) + "\n")
+        else:
+            for entry in report["errors"]:
+                self.stderr.write(f"row {entry['row']}: {json.dumps(entry['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} created, {report['failed']} failed in {elapsed:.1f}s "
+            f"({(report['created'] + report['failed']) / elapsed:.0f} rows/s)"
+        ))
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.models import Job
+
+# name: (weight, method, route); {job} and {username} are filled in per request.
+DEFAULT_MIX = {
+    "global_feed": (30, "GET", "/api/feed/global_feed/"),
+    "personalized": (20, "GET", "/api/feed/personalized/"),
+    "engage": (15, "POST", "/api/engagement/action/"),
+    "comments": (10, "GET", "/api/engagement/comments/?content_type=job&content_id={job}"),
+    "comment": (5, "POST", "/api/engagement/comments/"),
+    "profile": (10, "GET", "/api/auth/profile/{username}/"),
+    "posts": (10, "GET", "/api/auth/posts/"),
+}
+LOGIN = ("POST", "/api/auth/token/")
+
+
+class HttpClient:
+    """One keep-alive HTTP/1.1 connection, reopened whenever the server closes it."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(payload)}"]
+        if body is not None:
+            headers.append("Content-Type: application/json")
+        if token:
+            headers.append(f"Authorization: Bearer {token}")
+        data = ("\r\n".join(headers) + "\r\n\r\n").encode() + payload
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+                return await self._response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server dropped an idle keep-alive connection; retry once on a fresh one.
+                self.close()
+                if attempt:
+                    raise
+
+    async def _response(self):
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value.lower():
+                chunked = True
+            elif name == "connection" and value.lower() == "close":
+                close = True
+        if chunked:
+            body = b""
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                body += chunk[:-2]
+        elif length is not None:
+            body = await self.reader.readexactly(length)
+        else:
+            body = await self.reader.read()
+            close = True
+        if close:
+            self.close()
+        return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = "Replay a weighted mix of API calls from many logged-in users against a running server and report latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Server to test, e.g. http://127.0.0.1:8000 (default: start one)")
+        parser.add_argument("--server", choices=["gunicorn", "runserver"], help="Server to start when --url is not given")
+        parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+        parser.add_argument("--users", type=int, default=50, help="Seeded users loadtest_0..N-1 (created if missing)")
+        parser.add_argument("--password", default="Pass123!")
+        parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous virtual users")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load")
+        parser.add_argument("--warmup", type=float, default=3, help="Seconds of load before measuring")
+        parser.add_argument(
+            "--mix", help=f"Override weights, e.g. 'global_feed=50,personalized=0' (names: {', '.join(DEFAULT_MIX)})"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        usernames = self._seed_users(options["users"], options["password"])
+        job_ids = list(Job.objects.values_list("id", flat=True)[:500])
+        if not job_ids:
+            raise CommandError("No jobs to engage with; run seed_demo first.")
+        mix = self._mix(options["mix"])
+
+        server = None
+        url = options["url"]
+        if not url:
+            port = _free_port()
+            server = self._start_server(options["server"], port, options["workers"])
+            url = f"http://127.0.0.1:{port}"
+        parts = urlsplit(url)
+        try:
+            if server is not None:
+                self._wait_for(parts.hostname, parts.port, server)
+            stats = asyncio.run(self._run(parts.hostname, parts.port or 80, usernames, job_ids, mix, options))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+        self._report(stats, options["duration"])
+
+    def _seed_users(self, count, password):
+        User = get_user_model()
+        usernames = [f"loadtest_{i}" for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        hashed = make_password(password)  # hash once; every load-test user shares it
+        User.objects.bulk_create([
+            User(username=name, password=hashed, interests=["coding", "ai"], city="Kathmandu")
+            for name in usernames if name not in existing
+        ])
+        User.objects.filter(username__in=existing).update(password=hashed)
+        return usernames
+
+    def _mix(self, override):
+        mix = dict(DEFAULT_MIX)
+        for item in (override or "").split(","):
+            if not item.strip():
+                continue
+            name, _, weight = item.partition("=")
+            if name.strip() not in mix:
+                raise CommandError(f"Unknown route {name.strip()!r} in --mix.")
+            mix[name.strip()] = (float(weight),) + mix[name.strip()][1:]
+        mix = [entry for entry in mix.values() if entry[0] > 0]
+        if not mix:
+            raise CommandError("The request mix is empty.")
+        return mix
+
+    def _start_server(self, kind, port, workers):
+        if kind is None:
+            kind = "gunicorn" if shutil.which("gunicorn") else "runserver"
+        if kind == "gunicorn":
+            if not shutil.which("gunicorn"):
+                raise CommandError("gunicorn is not installed.")
+            cmd = ["gunicorn", "awasarhub.wsgi", "-w", str(workers), "-b", f"127.0.0.1:{port}", "--log-level", "warning"]
+        else:
+            # Single process, one thread per request; only meant for a quick local run.
+            cmd = [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload"]
+        self.stdout.write(f"Starting: {' '.join(cmd)}")
+        return subprocess.Popen(
+            cmd, cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def _wait_for(self, host, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError("The server exited during startup.")
+            try:
+                with socket.create_connection((host, port), timeout=0.5):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not start listening on {host}:{port}.")
+
+    async def _run(self, host, port, usernames, job_ids, mix, options):
+        rng = random.Random(options["seed"])
+        stats = defaultdict(lambda: {"latencies": [], "errors": 0, "statuses": defaultdict(int)})
+
+        def record(label, status, elapsed, measured):
+            if measured:
+                entry = stats[label]
+                entry["latencies"].append(elapsed)
+                entry["statuses"][status] += 1
+                if status >= 400:
+                    entry["errors"] += 1
+
+        # Log every user in through the real token endpoint.
+        tokens = {}
+        login_slots = asyncio.Semaphore(options["concurrency"])
+
+        async def login(name):
+            async with login_slots:
+                client = HttpClient(host, port)
+                start = time.perf_counter()
+                status, body = await client.request(*LOGIN, body={"username": name, "password": options["password"]})
+                record(" ".join(LOGIN), status, time.perf_counter() - start, True)
+                client.close()
+                if status == 200:
+                    tokens[name] = json.loads(body)["access"]
+
+        await asyncio.gather(*(login(name) for name in usernames))
+        if not tokens:
+            raise CommandError("No user could log in.")
+        names = list(tokens)
+
+        weights = [w for w, _, _ in mix]
+        start_at = time.monotonic()
+        measure_from = start_at + options["warmup"]
+        stop_at = measure_from + options["duration"]
+
+        async def virtual_user(n):
+            client = HttpClient(host, port)
+            local = random.Random(rng.random())
+            name = names[n % len(names)]
+            try:
+                while time.monotonic() < stop_at:
+                    _, method, route = local.choices(mix, weights)[0]
+                    job = local.choice(job_ids)
+                    path = route.format(job=job, username=local.choice(names))
+                    body = None
+                    if route == "/api/engagement/action/":
+                        body = {"content_type": "job", "content_id": job, "action": local.choice(["like", "share"])}
+                    elif method == "POST":
+                        body = {"content_type": "job", "content_id": job, "text": "load test comment"}
+                    started = time.monotonic()
+                    try:
+                        status, _ = await client.request(method, path, body=body, token=tokens[name])
+                    except (OSError, asyncio.IncompleteReadError):
+                        status = 599
+                        client.close()
+                    record(f"{method} {route.split('?')[0]}", status, time.monotonic() - started, started >= measure_from)
+            finally:
+                client.close()
+
+        await asyncio.gather(*(virtual_user(n) for n in range(options["concurrency"])))
+        return stats
+
+    def _report(self, stats, duration):
+        header = f"{'route':<44} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        total = errors = 0
+        for label in sorted(stats):
+            entry = stats[label]
+            latencies = sorted(entry["latencies"])
+            count = len(latencies)
+            # Logins happen before the measured window, so they get no rate.
+            rate = "" if label == " ".join(LOGIN) else f"{count / duration:8.1f}"
+            if label != " ".join(LOGIN):
+                total += count
+                errors += entry["errors"]
+            self.stdout.write(
+                f"{label:<44} {count:7d} {entry['errors']:5d} {rate:>8} "
+                f"{_percentile(latencies, 50) * 1000:8.1f} {_percentile(latencies, 95) * 1000:8.1f} "
+                f"{_percentile(latencies, 99) * 1000:8.1f} {latencies[-1] * 1000 if latencies else 0:8.1f}"
+            )
+            failed = {status: n for status, n in entry["statuses"].items() if status >= 400}
+            if failed:
+                self.stdout.write(f"{'':<44} statuses: {dict(sorted(failed.items()))}")
+        self.stdout.write(self.style.SUCCESS(f"Total: {total} requests, {errors} errors, {total / duration:.1f} req/s"))
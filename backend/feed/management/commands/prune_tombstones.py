@@ -0,0 +1,16 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from feed import sync
+
+
+class Command(BaseCommand):
+    help = "Delete old deletion tombstones (run periodically, e.g. daily); older since tokens then get a full refresh"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=30, help="Keep tombstones this many days")
+
+    def handle(self, *args, **options):
+        pruned = sync.prune(datetime.timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} tombstones"))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from feed import trending
+
+
+class Command(BaseCommand):
+    help = "Recompute trending hot scores from EngagementLog and Comment and clear decayed ones (run periodically, e.g. hourly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--horizon", type=float, default=20, help="Half-lives after which a post's score is dropped"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = trending.renormalize(horizon_half_lives=options["horizon"])
+        summary = ", ".join(f"{n} {content_type}" for content_type, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Scored {summary} in {time.perf_counter() - start:.1f}s"))
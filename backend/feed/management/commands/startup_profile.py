@@ -0,0 +1,70 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported.
+PROBE = """
+import time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print("STARTUP_MS", (time.perf_counter() - start) * 1000)
+"""
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+class Command(BaseCommand):
+    help = "Report import-time cost per module for django.setup() plus URL loading, optionally against a budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25, help="Modules to list, by cumulative time")
+        parser.add_argument("--prefix", help="Only list modules starting with this prefix, e.g. 'accounts'")
+        parser.add_argument("--runs", type=int, default=3, help="Take the fastest of this many runs")
+        parser.add_argument("--budget-ms", type=float, help="Fail if the fastest startup exceeds this many ms")
+        parser.add_argument(
+            "--forbid", action="append", default=[],
+            help="Fail if this module is imported at startup (repeatable), e.g. --forbid PIL.Image",
+        )
+
+    def _probe(self):
+        env = dict(os.environ)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "awasarhub.settings")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE],
+            capture_output=True, text=True, env=env, cwd=os.getcwd(),
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr[-2000:])
+        total = float(result.stdout.split("STARTUP_MS", 1)[1].split()[0])
+        modules = {}
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, _, name = match.groups()
+                modules[name] = (int(self_us), int(cumulative_us))
+        return total, modules
+
+    def handle(self, *args, **options):
+        runs = [self._probe() for _ in range(max(options["runs"], 1))]
+        total, modules = min(runs, key=lambda run: run[0])
+
+        listed = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+        if options["prefix"]:
+            listed = [item for item in listed if item[0].startswith(options["prefix"])]
+        self.stdout.write(f"{'module':<50} {'self ms':>9} {'cumul. ms':>10}")
+        for name, (self_us, cumulative_us) in listed[:options["top"]]:
+            self.stdout.write(f"{name:<50} {self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}")
+        self.stdout.write(f"\ndjango.setup() + URL loading: {total:.1f} ms ({len(modules)} modules imported)")
+
+        problems = [f"{name} is imported at startup" for name in options["forbid"] if name in modules]
+        if options["budget_ms"] is not None and total > options["budget_ms"]:
+            problems.append(f"startup took {total:.1f} ms, budget is {options['budget_ms']:.1f} ms")
+        if problems:
+            raise CommandError("; ".join(problems))
+        if options["budget_ms"] is not None or options["forbid"]:
+            self.stdout.write(self.style.SUCCESS("Startup is within budget"))
@@ -0,0 +1,59 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from engagement.models import EngagementLog
+from feed import recommender
+
+
+class Command(BaseCommand):
+    help = "Train implicit-feedback ALS embeddings from EngagementLog and publish them for online scoring"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--factors", type=int, default=32)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--regularization", type=float, default=0.1)
+        parser.add_argument("--alpha", type=float, default=10.0, help="Confidence scale: C = 1 + alpha * weight")
+        parser.add_argument("--since-days", type=int, default=180, help="Only use interactions this recent; 0 for all")
+        parser.add_argument("--keep", type=int, default=3, help="Published versions to keep on disk")
+
+    def handle(self, *args, **options):
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        start = time.perf_counter()
+        logs = EngagementLog.objects.all()
+        if options["since_days"]:
+            logs = logs.filter(created_at__gte=timezone.now() - timedelta(days=options["since_days"]))
+        rows = logs.values_list("user_id", "content_type", "content_id", "action").iterator(chunk_size=20000)
+        weights = recommender.interaction_weights(rows)
+        if not weights:
+            raise CommandError("No usable interactions to train on.")
+
+        user_ids = sorted({user_id for user_id, _ in weights})
+        item_keys = sorted({key for _, key in weights})
+        user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        item_index = {key: i for i, key in enumerate(item_keys)}
+        matrix = csr_matrix(
+            (
+                np.fromiter(weights.values(), dtype=np.float32, count=len(weights)),
+                (
+                    np.fromiter((user_index[u] for u, _ in weights), dtype=np.int64, count=len(weights)),
+                    np.fromiter((item_index[k] for _, k in weights), dtype=np.int64, count=len(weights)),
+                ),
+            ),
+            shape=(len(user_ids), len(item_keys)),
+        )
+        self.stdout.write(f"{matrix.nnz} interactions, {len(user_ids)} users, {len(item_keys)} items")
+
+        user_factors, item_factors = recommender.train_als(
+            matrix,
+            factors=options["factors"],
+            regularization=options["regularization"],
+            alpha=options["alpha"],
+            iterations=options["iterations"],
+        )
+        path = recommender.publish(user_ids, item_keys, user_factors, item_factors, keep=options["keep"])
+        self.stdout.write(self.style.SUCCESS(f"Published {path} in {time.perf_counter() - start:.1f}s"))
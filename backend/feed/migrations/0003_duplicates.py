@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0002_relateditems'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=32)),
+                ('key', models.CharField(max_length=20)),
+                ('content_id', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['content_type', 'key'], name='feed_lshbuc_content_e8873e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MinHashSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=32)),
+                ('content_id', models.IntegerField()),
+                ('signature', models.BinaryField()),
+            ],
+            options={
+                'unique_together': {('content_type', 'content_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0003_duplicates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedcontent',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='feedcontent',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
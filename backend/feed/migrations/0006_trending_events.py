@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0005_change_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('applied_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -1,7 +1,47 @@
-from django.db import models
+from django.db import models, router, transaction
 
 
-class FeedContent(models.Model):
+class ChangeTracked(models.Model):
+    """Stamps every save with a fresh value of the global change sequence, see feed.sync."""
+
+    change_seq = models.BigIntegerField(default=0, editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from . import sync
+
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        # The sequence row stays locked until this commits, so rows become visible in sequence order.
+        with transaction.atomic(using=using):
+            self.change_seq = sync.next_seq(using)
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "change_seq"}
+            super().save(*args, **kwargs)
+
+
+class ChangeSequence(models.Model):
+    """The single counter behind ``change_seq`` and tombstones."""
+
+    value = models.BigIntegerField(default=0)
+    # Tombstones up to this value have been pruned; older ``since`` tokens need a full refresh.
+    pruned_through = models.BigIntegerField(default=0)
+
+
+class Tombstone(models.Model):
+    """A deleted job, opportunity or feed item, kept so delta syncs can report the deletion."""
+
+    content_type = models.CharField(max_length=32)
+    content_id = models.IntegerField()
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.content_type}:{self.content_id}@{self.change_seq}"
+
+
+class FeedContent(ChangeTracked):
     CONTENT_TYPES = [
         ("NEWS", "News"),
         ("JOB", "Job"),
@@ -9,7 +49,7 @@ class FeedContent(models.Model):
         ("VIDEO", "Video"),
     ]
     content_type = models.CharField(max_length=20, choices=CONTENT_TYPES, default="NEWS")
-    title = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, db_index=True)
     body = models.TextField(blank=True)
     source_url = models.URLField(blank=True)
     tags = models.JSONField(default=list, blank=True)
@@ -17,7 +57,60 @@ class FeedContent(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     video_url = models.URLField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.content_type}: {self.title}"
+
+
+class RelatedItems(models.Model):
+    """Precomputed top-K similar jobs/opportunities of one item, as [content_type, id, score] triples."""
+
+    content_type = models.CharField(max_length=32)
+    content_id = models.IntegerField()
+    neighbours = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("content_type", "content_id")
+
+    def __str__(self):
+        return f"{self.content_type}:{self.content_id}"
+
+
+class MinHashSignature(models.Model):
+    """MinHash of a job/opportunity's text (uint32 array bytes), see feed.dedup."""
+
+    content_type = models.CharField(max_length=32)
+    content_id = models.IntegerField()
+    signature = models.BinaryField()
+
+    class Meta:
+        unique_together = ("content_type", "content_id")
+
+    def __str__(self):
+        return f"{self.content_type}:{self.content_id}"
+
+
+class LshBucket(models.Model):
+    """One LSH band bucket a post's signature falls into; posts sharing a key are duplicate candidates."""
+
+    content_type = models.CharField(max_length=32)
+    key = models.CharField(max_length=20)
+    content_id = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=["content_type", "key"])]
+
+    def __str__(self):
+        return f"{self.content_type}:{self.key}:{self.content_id}"
+
+
+class TrendingEvent(models.Model):
+    """An engagement event already folded into a hot score by a queued batch, so redelivery skips it."""
+
+    key = models.CharField(max_length=64, unique=True)
+    applied_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,47 @@
+from math import sqrt
+from typing import List
+
+
+def proximity_score(user_loc, item_loc):
+    if not user_loc or not item_loc:
+        return 0.0
+    (ulat, ulon) = user_loc
+    (ilat, ilon) = item_loc
+    dist = sqrt((ulat - ilat) ** 2 + (ulon - ilon) ** 2)
+    return max(0.0, 1.0 - min(dist / 10.0, 1.0))
+
+
+def interest_score(interests: List[str], tags: List[str]):
+    if not interests or not tags:
+        return 0.1
+    inter = set(i.lower() for i in interests)
+    tset = set(t.lower() for t in tags)
+    overlap = inter.intersection(tset)
+    return 0.2 + (0.8 * (len(overlap) / max(len(tset), 1)))
+
+
+def rank_score(interests: List[str], user_loc, tags: List[str], latitude, longitude):
+    item_loc = (latitude, longitude) if latitude is not None and longitude is not None else None
+    return (0.6 * interest_score(interests, tags or [])) + (0.4 * proximity_score(user_loc, item_loc))
+
+
+def rank_scores(interests: List[str], user_loc, overlap, tag_counts, latitude, longitude):
+    """``rank_score`` for many items at once (NumPy arrays).
+
+    ``overlap`` and ``tag_counts`` are each item's number of distinct tags
+    matching an interest and of distinct tags; missing coordinates are NaN.
+    """
+    import numpy as np
+
+    tag_counts = np.asarray(tag_counts)
+    if interests:
+        interest = np.where(tag_counts > 0, 0.2 + (0.8 * (overlap / np.maximum(tag_counts, 1))), 0.1)
+    else:
+        interest = np.full(len(tag_counts), 0.1)
+    if user_loc:
+        ulat, ulon = user_loc
+        dist = np.sqrt((ulat - np.asarray(latitude)) ** 2 + (ulon - np.asarray(longitude)) ** 2)
+        proximity = np.where(np.isnan(dist), 0.0, np.maximum(0.0, 1.0 - np.minimum(dist / 10.0, 1.0)))
+    else:
+        proximity = np.zeros(len(tag_counts))
+    return (0.6 * interest) + (0.4 * proximity)
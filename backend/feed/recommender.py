@@ -0,0 +1,198 @@
+"""Implicit-feedback collaborative filtering (Hu, Koren & Volinsky ALS).
+
+``train_als`` factorizes the user x item confidence matrix built from
+``EngagementLog``; ``publish`` writes the factors as float32 ``.npy`` files
+into a new version directory, flips ``CURRENT`` atomically and prunes old
+versions; workers memory-map the current version through ``get_model``.
+
+NumPy/SciPy are imported lazily so workers that never score do not load them.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Confidence added per action; "skip" carries no positive preference and is ignored.
+ACTION_WEIGHTS = {"view": 1.0, "click": 2.0, "like": 4.0, "repost": 4.0, "share": 4.0, "apply": 8.0}
+
+
+def item_key(content_type: str, content_id: int) -> str:
+    # FeedViewSet.log records FeedContent interactions without a content_type.
+    return f"{content_type or 'feed'}:{content_id}"
+
+
+def model_dir() -> Path:
+    return Path(getattr(settings, "RECOMMENDER_DIR", Path(settings.BASE_DIR) / "var" / "recommender"))
+
+
+def train_als(matrix, factors: int = 32, regularization: float = 0.1, alpha: float = 10.0, iterations: int = 10, seed: int = 0):
+    """Return (user_factors, item_factors) as float32 arrays for a users x items CSR of raw weights."""
+    import numpy as np
+
+    confidence = matrix.tocsr().astype(np.float64)
+    confidence.data = alpha * confidence.data  # C - 1; preferences are 1 wherever C > 1
+    confidence_t = confidence.T.tocsr()
+    rng = np.random.default_rng(seed)
+    users = rng.normal(scale=0.01, size=(confidence.shape[0], factors))
+    items = rng.normal(scale=0.01, size=(confidence.shape[1], factors))
+    eye = regularization * np.eye(factors)
+
+    def solve(fixed, weights, out):
+        # With YtY precomputed, each row only touches the items it interacted with.
+        gram = fixed.T @ fixed + eye
+        for row in range(weights.shape[0]):
+            start, end = weights.indptr[row], weights.indptr[row + 1]
+            if start == end:
+                out[row] = 0.0
+                continue
+            cols = weights.indices[start:end]
+            c_minus_1 = weights.data[start:end]
+            y = fixed[cols]
+            a = gram + (y.T * c_minus_1) @ y
+            b = (y.T * (1.0 + c_minus_1)).sum(axis=1)
+            out[row] = np.linalg.solve(a, b)
+
+    for _ in range(iterations):
+        solve(items, confidence, users)
+        solve(users, confidence_t, items)
+    return users.astype(np.float32), items.astype(np.float32)
+
+
+def user_stats(user_factors, item_factors, block: int = 1024):
+    """Per-user (min, max, mean) of the raw scores over every item, float32 of shape (users, 3)."""
+    import numpy as np
+
+    out = np.zeros((len(user_factors), 3), dtype=np.float32)
+    if not len(item_factors):
+        return out
+    for start in range(0, len(user_factors), block):
+        raw = np.asarray(user_factors[start:start + block], dtype=np.float32) @ np.asarray(item_factors).T
+        out[start:start + block] = np.stack([raw.min(axis=1), raw.max(axis=1), raw.mean(axis=1)], axis=1)
+    return out
+
+
+def publish(user_ids: Sequence[int], item_keys: Sequence[str], user_factors, item_factors, keep: int = 3) -> Path:
+    """Write a new version and point ``CURRENT`` at it; older versions beyond ``keep`` are removed.
+
+    Workers still mapping a removed version keep their pages until they reload.
+    """
+    import numpy as np
+
+    root = model_dir()
+    # Nanoseconds and pid keep same-second publishes apart, and names still sort by age for pruning.
+    now = time.time_ns()
+    version = f"{time.strftime('%Y%m%d%H%M%S', time.localtime(now // 10 ** 9))}.{now % 10 ** 9:09d}-{os.getpid()}"
+    staging = root / f".{version}"
+    staging.mkdir(parents=True, exist_ok=True)
+    np.save(staging / "user_factors.npy", np.ascontiguousarray(user_factors, dtype=np.float32))
+    np.save(staging / "item_factors.npy", np.ascontiguousarray(item_factors, dtype=np.float32))
+    np.save(staging / "user_ids.npy", np.asarray(user_ids, dtype=np.int64))
+    np.save(staging / "user_stats.npy", user_stats(user_factors, item_factors))
+    (staging / "item_keys.json").write_text(json.dumps(list(item_keys)))
+    # The directory only appears under its real name once complete, then CURRENT flips to it.
+    os.replace(staging, root / version)
+    pointer = root / f"CURRENT.{os.getpid()}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, root / "CURRENT")
+
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-keep] if keep else []:
+        if old.name != version:
+            shutil.rmtree(old, ignore_errors=True)
+    return root / version
+
+
+class FactorModel:
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self.path = path
+        self.user_factors = np.load(path / "user_factors.npy", mmap_mode="r")
+        self.item_factors = np.load(path / "item_factors.npy", mmap_mode="r")
+        self.user_rows = {int(uid): row for row, uid in enumerate(np.load(path / "user_ids.npy"))}
+        self.item_rows = {key: row for row, key in enumerate(json.loads((path / "item_keys.json").read_text()))}
+        stats = path / "user_stats.npy"
+        self.user_stats = np.load(stats) if stats.exists() else user_stats(self.user_factors, self.item_factors)
+
+    @property
+    def version(self) -> str:
+        return self.path.name
+
+    def scores(self, user_id: int, keys: List[str]) -> Optional[List[float]]:
+        """Dot products for ``keys`` scaled by the user's min and max over all items; ``None`` if the user is unknown.
+
+        The scale does not depend on which keys are asked for, so scores from
+        different requests (a full feed and a delta) are comparable. Items
+        without an embedding get the user's mean score so they are neither
+        boosted nor buried.
+        """
+        import numpy as np
+
+        user_row = self.user_rows.get(user_id)
+        if user_row is None:
+            return None
+        rows = [self.item_rows.get(key, -1) for key in keys]
+        known = np.fromiter((row >= 0 for row in rows), dtype=bool, count=len(rows))
+        low, high, mean = (float(v) for v in self.user_stats[user_row])
+        index = np.fromiter((row for row in rows if row >= 0), dtype=np.int64)
+        raw = self.item_factors[index] @ self.user_factors[user_row]
+        out = np.full(len(rows), mean, dtype=np.float32)
+        out[known] = raw
+        if high > low:
+            out = np.clip((out - low) / (high - low), 0.0, 1.0)
+        else:
+            out = np.full(len(rows), 0.5, dtype=np.float32)
+        return out.tolist()
+
+
+_model: Optional[FactorModel] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_model() -> Optional[FactorModel]:
+    """The current published model, re-checking ``CURRENT`` at most every RECOMMENDER_RELOAD_INTERVAL."""
+    global _model, _checked_at
+    interval = getattr(settings, "RECOMMENDER_RELOAD_INTERVAL", 60)
+    if time.monotonic() - _checked_at < interval:
+        return _model
+    with _lock:
+        if time.monotonic() - _checked_at >= interval:
+            _checked_at = time.monotonic()
+            try:
+                version = (model_dir() / "CURRENT").read_text().strip()
+            except OSError:
+                _model = None
+            else:
+                if _model is None or _model.path.name != version:
+                    try:
+                        _model = FactorModel(model_dir() / version)
+                    except (OSError, ValueError):
+                        logger.exception("Could not load recommender version %s", version)
+    return _model
+
+
+def blend(base: List[float], cf: Optional[List[float]]) -> List[float]:
+    if cf is None:
+        return base
+    weight = getattr(settings, "RECOMMENDER_BLEND", 0.3)
+    return [(1.0 - weight) * b + weight * c for b, c in zip(base, cf)]
+
+
+def interaction_weights(rows) -> Dict[tuple, float]:
+    """Sum action weights per (user_id, item key) from (user_id, content_type, content_id, action) rows."""
+    weights: Dict[tuple, float] = {}
+    for user_id, content_type, content_id, action in rows:
+        weight = ACTION_WEIGHTS.get(action)
+        if weight:
+            key = (user_id, item_key(content_type, content_id))
+            weights[key] = weights.get(key, 0.0) + weight
+    return weights
@@ -0,0 +1,334 @@
+"""Item-item "related posts" index over jobs and opportunities.
+
+``build_index`` computes TF-IDF vectors of title, description and tags and
+the top-K cosine neighbours of every item. It reads the corpus twice rather
+than holding every document, multiplies blocks of at most
+RELATED_MAX_BLOCK_CELLS similarities at a time and writes each block's
+neighbours as it goes. The vocabulary, IDF and matrix are kept on disk so
+``add_posts`` (run by the task worker, see feed.tasks) can place new posts
+without a rebuild; posts created since the build are vectorised into the
+loaded snapshot, so they are related to each other too. That is opt-in
+(``RELATED_INCREMENTAL``, see ``incremental``); otherwise new posts are
+picked up by the next ``build_related``.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our the to we with you your will this that".split()
+)
+TAG_WEIGHT = 2
+
+
+def _tokens(title: str, description: str, tags) -> List[str]:
+    words = TOKEN.findall(f"{title} {title} {description}".lower())
+    words = [w for w in words if w not in STOPWORDS]
+    for tag in tags or []:
+        words.extend([f"tag:{str(tag).lower()}"] * TAG_WEIGHT)
+    return words
+
+
+def document(title: str, description: str, tags, *extra: str) -> List[str]:
+    return _tokens(title, " ".join([description, *extra]), tags)
+
+
+def corpus(after: Optional[Dict[str, int]] = None, up_to: Optional[Dict[str, int]] = None):
+    """(content_type, pk, words) for every post, or only those with ids above ``after``/up to ``up_to`` per type."""
+    from jobs.models import Job
+    from opportunities.models import Opportunity
+
+    def bounded(queryset, content_type):
+        if after is not None:
+            queryset = queryset.filter(id__gt=after.get(content_type, 0))
+        if up_to is not None:
+            queryset = queryset.filter(id__lte=up_to.get(content_type, 0))
+        return queryset.order_by("id")
+
+    for pk, title, description, tags, company in bounded(Job.objects, "job").values_list(
+        "id", "title", "description", "tags", "company"
+    ).iterator(chunk_size=5000):
+        yield "job", pk, document(title, description, tags, company)
+    for pk, title, description, tags, org, category in bounded(Opportunity.objects, "opportunity").values_list(
+        "id", "title", "description", "tags", "org", "category"
+    ).iterator(chunk_size=5000):
+        yield "opportunity", pk, document(title, description, tags, org, category)
+
+
+def _high_water() -> Dict[str, int]:
+    from django.db.models import Max
+
+    from jobs.models import Job
+    from opportunities.models import Opportunity
+
+    return {
+        content_type: model.objects.aggregate(top=Max("id"))["top"] or 0
+        for content_type, model in (("job", Job), ("opportunity", Opportunity))
+    }
+
+
+def instance_document(instance) -> Tuple[str, List[str]]:
+    content_type = instance._meta.model_name
+    if content_type == "job":
+        return content_type, document(instance.title, instance.description, instance.tags, instance.company)
+    return content_type, document(instance.title, instance.description, instance.tags, instance.org, instance.category)
+
+
+def index_dir() -> Path:
+    return Path(getattr(settings, "RECOMMENDER_DIR", Path(settings.BASE_DIR) / "var" / "recommender")) / "related"
+
+
+def incremental() -> bool:
+    """Whether new posts should be queued for ``add_posts``: switched on and an index has been built."""
+    return getattr(settings, "RELATED_INCREMENTAL", False) and (index_dir() / "meta.json").exists()
+
+
+def _vectorize(docs: Iterable[List[str]], vocab: Dict[str, int], idf):
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    indptr, indices, data = [0], [], []
+    for words in docs:
+        counts = Counter(w for w in words if w in vocab)
+        weights = {vocab[w]: (1.0 + math.log(c)) * idf[vocab[w]] for w, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in weights.values())) or 1.0
+        for col, weight in sorted(weights.items()):
+            indices.append(col)
+            data.append(weight / norm)
+        indptr.append(len(indices))
+    return csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(vocab)),
+    )
+
+
+def _top_k(similarities, k: int, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Top ``k`` (column, score) pairs of a 1 x N sparse row."""
+    import numpy as np
+
+    row = similarities.tocsr()
+    cols, scores = row.indices, row.data
+    if exclude is not None:
+        keep = cols != exclude
+        cols, scores = cols[keep], scores[keep]
+    if len(scores) > k:
+        part = np.argpartition(-scores, k)[:k]
+        cols, scores = cols[part], scores[part]
+    order = np.argsort(-scores, kind="stable")
+    return [(int(cols[i]), float(scores[i])) for i in order if scores[i] > 0]
+
+
+def build_index(k: int = 10, block_size: int = 1000, min_df: int = 1) -> int:
+    """Rebuild every item's neighbours; returns the number of items indexed."""
+    import numpy as np
+    from django.utils import timezone
+    from scipy.sparse import save_npz
+
+    from .models import RelatedItems
+
+    # Posts created while this runs are above the high-water mark; the worker adds them afterwards.
+    started, high_water = timezone.now(), _high_water()
+    df, count = Counter(), 0
+    for _, _, words in corpus(up_to=high_water):
+        df.update(set(words))
+        count += 1
+    if not count:
+        return 0
+
+    vocab = {w: i for i, w in enumerate(sorted(w for w, c in df.items() if c >= min_df))}
+    idf = np.zeros(len(vocab), dtype=np.float32)
+    for w, i in vocab.items():
+        idf[i] = math.log((1 + count) / (1 + df[w])) + 1.0
+    del df
+
+    keys = []
+
+    def documents():
+        for content_type, pk, words in corpus(up_to=high_water):
+            keys.append((content_type, pk))
+            yield words
+
+    matrix = _vectorize(documents(), vocab, idf)
+    matrix_t = matrix.T.tocsc()
+
+    # A block's product can be dense, so cap it at RELATED_MAX_BLOCK_CELLS similarities.
+    max_cells = getattr(settings, "RELATED_MAX_BLOCK_CELLS", 10_000_000)
+    rows_per_block = max(1, min(block_size, max_cells // len(keys)))
+    for start in range(0, len(keys), rows_per_block):
+        block = (matrix[start:start + rows_per_block] @ matrix_t).tocsr()
+        rows = []
+        for offset in range(block.shape[0]):
+            i = start + offset
+            neighbours = _top_k(block[offset], k, exclude=i)
+            content_type, pk = keys[i]
+            rows.append(RelatedItems(
+                content_type=content_type,
+                content_id=pk,
+                neighbours=[[keys[j][0], keys[j][1], round(score, 4)] for j, score in neighbours],
+            ))
+        RelatedItems.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True,
+            unique_fields=["content_type", "content_id"], update_fields=["neighbours", "updated_at"],
+        )
+    # Rows not rewritten above belong to posts deleted since the last build.
+    RelatedItems.objects.filter(updated_at__lt=started).delete()
+
+    target = index_dir()
+    target.mkdir(parents=True, exist_ok=True)
+    save_npz(target / "matrix.tmp.npz", matrix)
+    os.replace(target / "matrix.tmp.npz", target / "matrix.npz")
+    meta = {"k": k, "vocab": vocab, "idf": idf.tolist(), "keys": keys, "high_water": high_water}
+    (target / "meta.tmp.json").write_text(json.dumps(meta))
+    os.replace(target / "meta.tmp.json", target / "meta.json")
+    reset()
+    return len(keys)
+
+
+class _Snapshot:
+    def __init__(self, path: Path):
+        from scipy.sparse import load_npz
+
+        meta = json.loads((path / "meta.json").read_text())
+        self.k = meta["k"]
+        self.vocab = meta["vocab"]
+        self.idf = meta["idf"]
+        self.keys = [tuple(key) for key in meta["keys"]]
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self.matrix = load_npz(path / "matrix.npz").tocsr()
+        self.mtime = (path / "meta.json").stat().st_mtime
+        # Highest id per type seen so far; older indexes did not record it.
+        self.seen = dict(meta.get("high_water") or {
+            content_type: max((pk for t, pk in self.keys if t == content_type), default=0)
+            for content_type in ("job", "opportunity")
+        })
+        self._lock = threading.Lock()
+
+    def catch_up(self):
+        """Vectorise posts created since the last look against the build's vocabulary; returns (keys, matrix)."""
+        from scipy.sparse import vstack
+
+        with self._lock:
+            keys, docs = [], []
+            for content_type, pk, words in corpus(after=self.seen):
+                keys.append((content_type, pk))
+                docs.append(words)
+                self.seen[content_type] = max(self.seen.get(content_type, 0), pk)
+            if keys:
+                self.matrix = vstack([self.matrix, _vectorize(docs, self.vocab, self.idf)]).tocsr()
+                self.positions.update((key, len(self.keys) + i) for i, key in enumerate(keys))
+                self.keys = self.keys + keys
+            return self.keys, self.matrix
+
+
+_snapshot: Optional[_Snapshot] = None
+_lock = threading.Lock()
+
+
+def reset():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def _get_snapshot() -> Optional[_Snapshot]:
+    global _snapshot
+    path = index_dir()
+    try:
+        mtime = (path / "meta.json").stat().st_mtime
+    except OSError:
+        return None
+    with _lock:
+        if _snapshot is None or _snapshot.mtime != mtime:
+            _snapshot = _Snapshot(path)
+        return _snapshot
+
+
+def _splice(snapshot: _Snapshot, keys, matrix, instance):
+    from .models import RelatedItems
+
+    content_type, words = instance_document(instance)
+    pk = instance.pk
+    vector = _vectorize([words], snapshot.vocab, snapshot.idf)
+    neighbours = _top_k(vector @ matrix.T, snapshot.k, exclude=snapshot.positions.get((content_type, pk)))
+    by_key = {keys[j]: round(score, 4) for j, score in neighbours}
+    with transaction.atomic():
+        RelatedItems.objects.update_or_create(
+            content_type=content_type,
+            content_id=pk,
+            defaults={"neighbours": [[*key, score] for key, score in by_key.items()]},
+        )
+        # Locked, so concurrent additions splicing into the same lists do not overwrite each other.
+        existing = RelatedItems.objects.select_for_update().filter(
+            content_type__in={t for t, _ in by_key}, content_id__in=[i for _, i in by_key]
+        ).order_by("pk")
+        changed = []
+        for row in existing:
+            score = by_key.get((row.content_type, row.content_id))
+            if score is None:
+                continue
+            # Drop any earlier entry for this post, so a redelivered task leaves the same list.
+            others = [n for n in row.neighbours if (n[0], n[1]) != (content_type, pk)]
+            merged = sorted(others + [[content_type, pk, score]], key=lambda n: -n[2])[:snapshot.k]
+            if merged != row.neighbours:
+                row.neighbours = merged
+                changed.append(row)
+        RelatedItems.objects.bulk_update(changed, ["neighbours", "updated_at"])
+
+
+def add_posts(posts: Iterable[Tuple[str, int]]):
+    """Place new jobs/opportunities against the index and splice each into its neighbours' lists.
+
+    Called by the task worker (``feed.tasks.index_related``), never on the request path.
+    """
+    from jobs.models import Job
+    from opportunities.models import Opportunity
+
+    snapshot = _get_snapshot()
+    if snapshot is None:
+        return
+    keys, matrix = snapshot.catch_up()
+    wanted: Dict[str, set] = {}
+    for content_type, pk in posts:
+        wanted.setdefault(content_type, set()).add(int(pk))
+    for content_type, model in (("job", Job), ("opportunity", Opportunity)):
+        if wanted.get(content_type):
+            for instance in model.objects.filter(id__in=wanted[content_type]):
+                _splice(snapshot, keys, matrix, instance)
+
+
+def related_payload(content_type: str, pk: int, limit: int = 10) -> List[dict]:
+    """Serialized neighbours of one item, most similar first."""
+    from jobs.models import Job
+    from jobs.serializers import JobSerializer
+    from opportunities.models import Opportunity
+    from opportunities.serializers import OpportunitySerializer
+
+    from .models import RelatedItems
+
+    row = RelatedItems.objects.filter(content_type=content_type, content_id=pk).values_list("neighbours", flat=True).first()
+    neighbours = (row or [])[:limit]
+    job_ids = [n[1] for n in neighbours if n[0] == "job"]
+    opp_ids = [n[1] for n in neighbours if n[0] == "opportunity"]
+    found = {}
+    for item in JobSerializer(Job.objects.filter(id__in=job_ids).select_related("posted_by"), many=True).data:
+        found[("job", item["id"])] = item
+    for item in OpportunitySerializer(Opportunity.objects.filter(id__in=opp_ids).select_related("posted_by"), many=True).data:
+        found[("opportunity", item["id"])] = item
+    items = []
+    for content_type_, content_id, score in neighbours:
+        item = found.get((content_type_, content_id))
+        if item is not None:
+            items.append({**item, "type": content_type_, "similarity": score})
+    return items
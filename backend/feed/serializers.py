@@ -1,8 +1,10 @@
 from rest_framework import serializers
+
+from awasarhub.sparse import SparseFieldsetMixin
 from .models import FeedContent
 
 
-class FeedContentSerializer(serializers.ModelSerializer):
+class FeedContentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = FeedContent
         fields = "__all__"
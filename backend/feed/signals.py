@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from engagement.models import Comment, EngagementLog
+from jobs.models import Job
+from opportunities.models import Opportunity
+
+from . import dedup, related, sync, tasks, trending
+from .models import FeedContent
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_save, sender=Opportunity)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+
+    # Synchronous so the post is already collapsed the first time a feed is built.
+    dedup.index_instance(instance)
+    # The related index loads a snapshot and multiplies against it, so the worker does that.
+    if related.incremental():
+        tasks.index_related.enqueue({"content_type": sender._meta.model_name, "content_id": instance.pk}, on_commit=True)
+
+
+@receiver(pre_delete, sender=Job)
+@receiver(pre_delete, sender=Opportunity)
+def post_deleting(sender, instance, using, **kwargs):
+    # Its duplicates reappear in feeds once duplicate_of is nulled, so delta syncs must send them.
+    sync.touch(sender.objects.using(using).filter(duplicate_of=instance))
+
+
+@receiver(post_delete, sender=Job)
+@receiver(post_delete, sender=Opportunity)
+def post_deleted(sender, instance, using, **kwargs):
+    dedup.forget(sender._meta.model_name, instance.pk)
+    sync.record_deletion(sender._meta.model_name, instance.pk, using)
+
+
+@receiver(post_delete, sender=FeedContent)
+def feed_content_deleted(sender, instance, using, **kwargs):
+    sync.record_deletion("feed", instance.pk, using)
+
+
+def _record_engagement(sender, instance, undo=False):
+    action = "comment" if sender is Comment else instance.action
+    if getattr(settings, "TRENDING_DEFERRED", False):
+        # The counts change now even though the score is folded later, so delta syncs must resend the post.
+        model = {"job": Job, "opportunity": Opportunity}.get(instance.content_type)
+        if model is not None:
+            sync.touch(model.objects.filter(pk=instance.content_id))
+        # One INSERT now; the worker folds queued events into each post's score in batches.
+        tasks.record_trending.enqueue({
+            "content_type": instance.content_type, "content_id": instance.content_id, "action": action,
+            "at": instance.created_at.isoformat(), "undo": undo,
+            "key": trending.event_key("comment" if sender is Comment else "engagement", instance.pk, undo),
+        }, on_commit=True)
+    else:
+        trending.record(instance.content_type, instance.content_id, action, instance.created_at, undo=undo)
+
+
+@receiver(post_save, sender=EngagementLog)
+@receiver(post_save, sender=Comment)
+def engagement_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _record_engagement(sender, instance)
+
+
+@receiver(post_delete, sender=EngagementLog)
+@receiver(post_delete, sender=Comment)
+def engagement_deleted(sender, instance, **kwargs):
+    _record_engagement(sender, instance, undo=True)
@@ -0,0 +1,16 @@
+from taskqueue.queue import task
+
+from . import related, trending
+
+
+@task(batch_size=500)
+def record_trending(events):
+    """Deferred ``trending.record`` calls; a batch touches each post once however many events it holds."""
+    trending.record_many(events)
+
+
+@task(batch_size=100)
+def index_related(posts):
+    """Place new posts in the related index; the batch shares one snapshot catch-up."""
+    related.add_posts((post["content_type"], post["content_id"]) for post in posts)
+
@@ -0,0 +1,402 @@
+import datetime
+import math
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from engagement.models import Comment, EngagementLog
+from feed import bulk_import, catalog, dedup, recommender, related, sync, trending
+from feed.models import FeedContent, MinHashSignature, RelatedItems
+from jobs.models import Job
+from opportunities.models import Opportunity
+from taskqueue.models import Task
+
+
+def _job(**fields):
+    return Job.objects.create(**{"company": "Acme", "title": "Python developer", "description": "Django APIs", **fields})
+
+
+class RelatedQueueTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        overrides = override_settings(RECOMMENDER_DIR=self.dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def queued(self):
+        return Task.objects.filter(name="feed.tasks.index_related").count()
+
+    def build(self):
+        (self.dir / "related").mkdir()
+        (self.dir / "related" / "meta.json").write_text("{}")
+
+    def test_nothing_queued_by_default(self):
+        self.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            _job()
+        self.assertEqual(self.queued(), 0)
+
+    @override_settings(RELATED_INCREMENTAL=True)
+    def test_nothing_queued_without_an_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            _job()
+        self.assertFalse(related.incremental())
+        self.assertEqual(self.queued(), 0)
+
+    @override_settings(RELATED_INCREMENTAL=True)
+    def test_queued_when_enabled_and_built(self):
+        self.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            _job()
+        rows = [(n, {"company": "Acme", "title": f"Job {n}", "description": "d"}) for n in (1, 2)]
+        bulk_import.import_rows("job", rows)
+        self.assertEqual(self.queued(), 3)
+
+
+@override_settings(CATALOG_RELOAD_INTERVAL=0, ADMISSION_CONTROL={})
+class PersonalizedPagingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(CATALOG_DIR=Path(tmp.name), RECOMMENDER_DIR=Path(tmp.name) / "none")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        tags = ["python", "design", "law", "music"]
+        FeedContent.objects.bulk_create([
+            FeedContent(title=f"item {i}", tags=[tags[i % 4], tags[i * 7 % 4]], latitude=27 + i / 100, longitude=85.0)
+            for i in range(30)
+        ])
+        self.user = User.objects.create(username="reader", interests=["python"], latitude=27.1, longitude=85.0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        catalog._checked_at = 0
+
+    def pages(self, limit):
+        items, offset = [], 0
+        while offset is not None:
+            data = self.client.get(f"/api/feed/personalized/?offset={offset}&limit={limit}").data
+            items += [(card["id"], card["rank"]) for card in data["items"] if "rank" in card]
+            offset = data["next"]
+        return items
+
+    def test_pages_cover_the_whole_ranking(self):
+        everything = self.pages(1000)
+        self.assertEqual(len(everything), 30)
+        self.assertEqual(self.pages(7), everything)
+
+    def test_catalog_pages_match_database_ranking(self):
+        expected = self.pages(1000)
+        catalog.publish(catalog.build())
+        catalog._checked_at = 0
+        gone = FeedContent.objects.get(title="item 3").pk
+        FeedContent.objects.filter(pk=gone).delete()
+        expected = [entry for entry in expected if entry[0] != gone]
+        self.assertIsNotNone(catalog.get_catalog())
+        self.assertEqual(self.pages(4), expected)
+
+
+@override_settings(ADMISSION_CONTROL={})
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="syncer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job, self.other = _job(), _job(title="Designer")
+
+    def delta(self, token):
+        data = self.client.get("/api/feed/global_feed/", {"since": token}).data
+        self.assertTrue(data["delta"])
+        return data
+
+    def test_engagement_resends_the_post(self):
+        token = self.client.get("/api/feed/global_feed/").data["since"]
+        EngagementLog.objects.create(user=self.user, content_type="job", content_id=self.job.pk, action="like")
+        Comment.objects.create(user=self.user, content_type="job", content_id=self.job.pk, text="nice")
+        data = self.delta(token)
+        self.assertEqual([item["id"] for item in data["items"]], [self.job.pk])
+        self.assertEqual((data["items"][0]["likes"], data["items"][0]["comments"]), (1, 1))
+        self.assertEqual(self.delta(data["since"])["items"], [])
+
+    @override_settings(TRENDING_DEFERRED=True)
+    def test_deferred_engagement_resends_the_post(self):
+        token = self.client.get("/api/feed/global_feed/").data["since"]
+        EngagementLog.objects.create(user=self.user, content_type="job", content_id=self.job.pk, action="repost")
+        self.assertEqual([item["id"] for item in self.delta(token)["items"]], [self.job.pk])
+
+    def test_delta_reports_saves_and_deletions(self):
+        token = self.client.get("/api/feed/global_feed/").data["since"]
+        self.assertEqual(self.delta(token)["items"], [])
+        Job.objects.filter(pk=self.job.pk).update(title="unchanged")  # no save, so no change
+        self.other.title = "Senior designer"
+        self.other.save()
+        gone = self.job.pk
+        self.job.delete()
+        data = self.delta(token)
+        self.assertEqual([(item["id"], item["title"]) for item in data["items"]], [(self.other.pk, "Senior designer")])
+        self.assertEqual(data["deleted"], [{"type": "job", "id": gone}])
+        self.assertEqual(self.delta(data["since"]), {"items": [], "deleted": [], "delta": True, "since": data["since"]})
+
+    def test_stale_tokens_get_a_full_refresh(self):
+        token = self.client.get("/api/feed/global_feed/").data["since"]
+        self.job.delete()
+        state = sync.current()
+        self.assertEqual(sync.parse(token, state), int(token))
+        self.assertIsNone(sync.parse(str(state.value + 1), state))
+        self.assertIsNone(sync.parse(token + ".scope", state))
+        with self.assertRaises(ValueError):
+            sync.parse("abc", state)
+        self.assertEqual(self.client.get("/api/feed/global_feed/", {"since": "abc"}).status_code, 400)
+
+        self.assertEqual(sync.prune(datetime.timedelta(seconds=-1)), 1)
+        self.assertIsNone(sync.parse(token, sync.current()))
+        data = self.client.get("/api/feed/global_feed/", {"since": token}).data
+        self.assertFalse(data["delta"])
+        self.assertEqual([item["id"] for item in data["items"]], [self.other.pk])
+
+    def test_personalized_tokens_are_scoped_to_the_user(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(CATALOG_DIR=Path(tmp.name), RECOMMENDER_DIR=Path(tmp.name) / "none")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        FeedContent.objects.create(title="Python meetup", tags=["python"])
+        token = self.client.get("/api/feed/personalized/").data["since"]
+        item = FeedContent.objects.create(title="Design jam", tags=["design"])
+        data = self.client.get("/api/feed/personalized/", {"since": token}).data
+        self.assertTrue(data["delta"])
+        self.assertEqual([card["id"] for card in data["items"]], [item.pk])
+        # New interests change every rank, so the old token no longer applies.
+        User.objects.filter(pk=self.user.pk).update(interests=["design"])
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+        data = self.client.get("/api/feed/personalized/", {"since": token}).data
+        self.assertFalse(data["delta"])
+        self.assertEqual(len(data["items"]), 2)
+
+    def test_renormalize_resends_only_repaired_scores(self):
+        EngagementLog.objects.create(user=self.user, content_type="job", content_id=self.job.pk, action="like")
+        token = self.client.get("/api/feed/global_feed/").data["since"]
+        trending.renormalize()
+        self.assertEqual(self.delta(token)["items"], [])
+        Job.objects.filter(pk=self.other.pk).update(hot_score=5.0)
+        trending.renormalize()
+        data = self.delta(token)
+        self.assertEqual([item["id"] for item in data["items"]], [self.other.pk])
+        self.assertIsNone(Job.objects.get(pk=self.other.pk).hot_score)
+
+
+POSTING = (
+    "We are hiring a backend engineer to build and operate Django REST APIs for our hiring platform, "
+    "own the PostgreSQL schema, write tests, review pull requests and mentor two junior developers in Kathmandu"
+)
+
+
+@override_settings(ADMISSION_CONTROL={})
+class DedupTests(TestCase):
+    def test_near_copies_collapse_into_the_original(self):
+        original = _job(description=POSTING)
+        copy = _job(description=POSTING + " remotely")
+        again = _job(description=POSTING + " remotely please")
+        other = _job(title="Accountant", description="Prepare monthly statements and payroll for a small NGO")
+        self.assertEqual(Job.objects.get(pk=copy.pk).duplicate_of_id, original.pk)
+        # A copy of a copy points at the first post, not at the copy it matched.
+        self.assertEqual(Job.objects.get(pk=again.pk).duplicate_of_id, original.pk)
+        self.assertIsNone(Job.objects.get(pk=other.pk).duplicate_of_id)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="dedup"))
+        ids = {item["id"] for item in client.get("/api/feed/global_feed/").data["items"]}
+        self.assertEqual(ids, {original.pk, other.pk})
+
+    def test_deleting_the_original_restores_its_copies(self):
+        original = _job(description=POSTING)
+        copy = _job(description=POSTING + " remotely")
+        token = sync.token(sync.current().value)
+        original_pk = original.pk
+        original.delete()
+        self.assertIsNone(Job.objects.get(pk=copy.pk).duplicate_of_id)
+        self.assertFalse(MinHashSignature.objects.filter(content_type="job", content_id=original_pk).exists())
+        self.assertEqual([row.pk for row in sync.changed_posts(sync.parse(token, sync.current()))[0]], [copy.pk])
+
+    def test_backfill_matches_within_a_batch(self):
+        with override_settings(DEDUP_THRESHOLD=2):
+            first, second = _job(description=POSTING), _job(description=POSTING + " remotely")
+        self.assertIsNone(Job.objects.get(pk=second.pk).duplicate_of_id)
+        dedup.clear("job")
+        self.assertEqual(len(dedup.unindexed("job")), 2)
+        batch = [(pk, dedup.text_of(title, description, owner)) for pk, title, description, owner in dedup.unindexed("job")]
+        self.assertEqual(dedup.index_posts("job", batch), {second.pk: first.pk})
+        self.assertEqual(Job.objects.get(pk=second.pk).duplicate_of_id, first.pk)
+        self.assertFalse(dedup.unindexed("job").exists())
+
+
+class RecommenderTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(RECOMMENDER_DIR=Path(tmp.name), RECOMMENDER_RELOAD_INTERVAL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(setattr, recommender, "_model", None)
+        recommender._model = None
+
+    def train(self):
+        from scipy.sparse import csr_matrix
+
+        # Users 0-2 share items 0-3 and users 3-5 items 4-7; user 0 has not seen item 3 yet.
+        cells = [(u, i) for u in range(3) for i in range(4) if (u, i) != (0, 3)]
+        cells += [(u, i) for u in range(3, 6) for i in range(4, 8)]
+        rows, cols = zip(*cells)
+        matrix = csr_matrix((np.full(len(cells), 2.0), (rows, cols)), shape=(6, 8))
+        return recommender.train_als(matrix, factors=4, iterations=15)
+
+    def test_als_prefers_items_of_similar_users(self):
+        users, items = self.train()
+        self.assertEqual((users.shape, items.shape, users.dtype), ((6, 4), (8, 4), np.float32))
+        raw = items @ users[0]
+        self.assertGreater(raw[3], raw[4:].max())
+
+    def test_published_model_scores_on_a_fixed_scale(self):
+        users, items = self.train()
+        keys = [recommender.item_key("job", i) for i in range(8)]
+        recommender.publish([10, 11, 12, 13, 14, 15], keys, users, items)
+        model = recommender.get_model()
+        self.assertIsNotNone(model)
+        self.assertIsNone(model.scores(99, keys))
+        full = model.scores(10, keys)
+        self.assertTrue(all(0.0 <= score <= 1.0 for score in full))
+        self.assertGreater(full[3], max(full[4:]))
+        # Asking for fewer keys, or for unknown ones, does not move the others.
+        self.assertAlmostEqual(model.scores(10, [keys[3], "job:999"])[0], full[3], places=5)
+        low, high, mean = model.user_stats[model.user_rows[10]]
+        self.assertAlmostEqual(model.scores(10, ["job:999"])[0], (mean - low) / (high - low), places=5)
+
+    def test_publish_keeps_recent_versions(self):
+        users, items = self.train()
+        keys = [recommender.item_key("job", i) for i in range(8)]
+        paths = [recommender.publish(range(6), keys, users, items, keep=2) for _ in range(3)]
+        self.assertEqual([path.exists() for path in paths], [False, True, True])
+        self.assertEqual(recommender.get_model().version, paths[-1].name)
+
+    def test_interaction_weights_and_blend(self):
+        rows = [(1, "job", 5, "view"), (1, "job", 5, "apply"), (1, "", 7, "like"), (1, "job", 6, "skip")]
+        self.assertEqual(recommender.interaction_weights(rows), {(1, "job:5"): 9.0, (1, "feed:7"): 4.0})
+        with override_settings(RECOMMENDER_BLEND=0.25):
+            self.assertEqual(recommender.blend([1.0, 0.0], [0.0, 1.0]), [0.75, 0.25])
+        self.assertEqual(recommender.blend([0.5], None), [0.5])
+
+
+@override_settings(ADMISSION_CONTROL={})
+class RelatedIndexTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(RECOMMENDER_DIR=Path(tmp.name))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(related.reset)
+        self.backend = _job(title="Python backend developer", description="Django REST APIs and PostgreSQL", tags=["python"])
+        self.data = _job(title="Python data engineer", description="Pandas pipelines and PostgreSQL", tags=["python"])
+        self.design = _job(title="Graphic designer", description="Brand identity, posters and Figma", tags=["design"])
+        self.grant = Opportunity.objects.create(
+            org="Arts council", title="Design grant", description="Funding for poster and brand design", category="grant"
+        )
+
+    def neighbours(self, content_type, pk):
+        return [tuple(n[:2]) for n in RelatedItems.objects.get(content_type=content_type, content_id=pk).neighbours]
+
+    def test_neighbours_rank_by_tfidf_similarity(self):
+        self.assertEqual(related.build_index(k=2), 4)
+        self.assertEqual(self.neighbours("job", self.backend.pk)[0], ("job", self.data.pk))
+        self.assertEqual(self.neighbours("job", self.design.pk)[0], ("opportunity", self.grant.pk))
+        self.assertNotIn(("job", self.backend.pk), self.neighbours("job", self.backend.pk))
+
+        client = APIClient()
+        items = client.get(f"/api/jobs/{self.backend.pk}/related/").data["items"]
+        self.assertEqual(items[0]["id"], self.data.pk)
+        self.assertEqual([item["similarity"] for item in items], sorted((item["similarity"] for item in items), reverse=True))
+
+    def test_small_blocks_give_the_same_index(self):
+        related.build_index(k=3)
+        whole = {(row.content_type, row.content_id): row.neighbours for row in RelatedItems.objects.all()}
+        with override_settings(RELATED_MAX_BLOCK_CELLS=1):
+            related.build_index(k=3)
+        self.assertEqual({(row.content_type, row.content_id): row.neighbours for row in RelatedItems.objects.all()}, whole)
+
+    def test_new_posts_are_spliced_in(self):
+        related.build_index(k=2)
+        newer = _job(title="Python API developer", description="Django REST APIs", tags=["python"])
+        again = _job(title="Senior Python API developer", description="Django REST APIs", tags=["python"])
+        related.add_posts([("job", newer.pk), ("job", again.pk)])
+        self.assertEqual(self.neighbours("job", again.pk)[0], ("job", newer.pk))
+        self.assertIn(("job", newer.pk), self.neighbours("job", self.backend.pk))
+        # Redelivery leaves the same entries (the two new posts tie, so their order may swap).
+        before = RelatedItems.objects.get(content_type="job", content_id=self.backend.pk).neighbours
+        related.add_posts([("job", newer.pk)])
+        self.assertCountEqual(RelatedItems.objects.get(content_type="job", content_id=self.backend.pk).neighbours, before)
+
+    def test_rebuild_drops_deleted_posts(self):
+        related.build_index(k=2)
+        gone = self.data.pk
+        self.data.delete()
+        related.build_index(k=2)
+        self.assertFalse(RelatedItems.objects.filter(content_type="job", content_id=gone).exists())
+        self.assertNotIn(("job", gone), self.neighbours("job", self.backend.pk))
+
+
+@override_settings(ADMISSION_CONTROL={}, TRENDING_HALF_LIFE_HOURS=24)
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="fan")
+        self.job, self.other = _job(), _job(title="Designer")
+
+    def score(self, job):
+        return Job.objects.get(pk=job.pk).hot_score
+
+    def test_score_is_the_log_of_decayed_weights(self):
+        like = EngagementLog.objects.create(user=self.user, content_type="job", content_id=self.job.pk, action="like")
+        comment = Comment.objects.create(user=self.user, content_type="job", content_id=self.job.pk, text="hi")
+        expected = np.logaddexp(trending.log_weight("like", like.created_at), trending.log_weight("comment", comment.created_at))
+        self.assertAlmostEqual(self.score(self.job), expected, places=6)
+        EngagementLog.objects.create(user=self.user, content_type="job", content_id=self.job.pk, action="view")
+        self.assertAlmostEqual(self.score(self.job), expected, places=6)
+        like.delete()
+        comment.delete()
+        self.assertIsNone(self.score(self.job))
+
+    def test_recent_engagement_outranks_older(self):
+        now = timezone.now()
+        trending.record("job", self.job.pk, "like", now)
+        for _ in range(3):
+            trending.record("job", self.other.pk, "like", now - datetime.timedelta(days=2))
+        # Three likes two half-lives ago are worth 0.75 of one like now.
+        self.assertAlmostEqual(self.score(self.other) - self.score(self.job), math.log(0.75), places=6)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        items = client.get("/api/feed/global_feed/", {"sort": "trending"}).data["items"]
+        self.assertEqual([item["id"] for item in items], [self.job.pk, self.other.pk])
+
+    def test_batches_fold_once_per_key(self):
+        at = timezone.now().isoformat()
+        events = [
+            {"content_type": "job", "content_id": self.job.pk, "action": "like", "at": at, "key": "engagement:1"},
+            {"content_type": "job", "content_id": self.job.pk, "action": "share", "at": at, "key": "engagement:2"},
+            {"content_type": "job", "content_id": self.job.pk, "action": "like", "at": at, "undo": True, "key": "engagement:1:undo"},
+        ]
+        trending.record_many(events)
+        trending.record_many(events)
+        self.assertAlmostEqual(self.score(self.job), trending.log_weight("share", datetime.datetime.fromisoformat(at)), places=6)
+
+    def test_renormalize_repairs_drift(self):
+        EngagementLog.objects.create(user=self.user, content_type="job", content_id=self.job.pk, action="like")
+        expected = self.score(self.job)
+        Job.objects.filter(pk=self.job.pk).update(hot_score=None)
+        self.assertEqual(trending.renormalize(), {"job": 1, "opportunity": 0})
+        self.assertAlmostEqual(self.score(self.job), expected, places=6)
@@ -0,0 +1,281 @@
+"""Time-decayed "hot" score for jobs and opportunities.
+
+A post's hotness is ``sum(w_i * exp(-lambda * (now - t_i)))`` over its
+engagement events. Factoring out ``exp(-lambda * now)``, which is the same for
+every post, leaves ``sum(w_i * exp(lambda * (t_i - epoch)))``: a value that
+never decays, so each event only adds to it and the ordering it induces at any
+moment is the trending order. That sum overflows a float after ~1000 half-lives, so the
+column stores its logarithm and events are folded in with log-add-exp, inside
+a single UPDATE so concurrent events never lose each other.
+
+``hot_score`` is NULL for posts without engagement; ``renormalize`` recomputes
+every score from the raw events and clears those that have decayed away.
+``hottest`` picks the top of the trending order with index-ordered LIMIT queries.
+
+Queued batches (``record_many``) may be delivered more than once, so each
+event carries a key that is stored with the fold in one transaction and
+skipped when seen again.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from . import sync
+
+DEFAULT_WEIGHTS = {"like": 1.0, "repost": 3.0, "comment": 2.0, "share": 4.0}
+
+
+def weights() -> Dict[str, float]:
+    return getattr(settings, "TRENDING_WEIGHTS", DEFAULT_WEIGHTS)
+
+
+def decay_rate() -> float:
+    """Lambda, per second."""
+    return math.log(2) / (getattr(settings, "TRENDING_HALF_LIFE_HOURS", 24) * 3600)
+
+
+def epoch() -> datetime:
+    return datetime.fromisoformat(getattr(settings, "TRENDING_EPOCH", "2024-01-01T00:00:00+00:00"))
+
+
+def log_weight(action: str, at: datetime) -> Optional[float]:
+    """``ln(w * exp(lambda * (at - epoch)))`` for one event, or None if the action does not count."""
+    weight = weights().get(action)
+    if not weight:
+        return None
+    return math.log(weight) + decay_rate() * (at - epoch()).total_seconds()
+
+
+def _model(content_type: str):
+    from jobs.models import Job
+    from opportunities.models import Opportunity
+
+    return {"job": Job, "opportunity": Opportunity}.get(content_type)
+
+
+def _fold(model, pk, x: float, undo: bool):
+    current = F("hot_score")
+    if not undo:
+        # logaddexp(a, x) = max(a, x) + ln(1 + exp(-|a - x|))
+        new = Case(
+            When(hot_score__isnull=True, then=Value(x)),
+            default=Greatest(current, Value(x)) + Ln(1 + Exp(-Abs(current - Value(x)))),
+            output_field=FloatField(),
+        )
+    else:
+        # ln(exp(a) - exp(x)) = a + ln(1 - exp(x - a)); nothing left once x reaches a.
+        new = Case(
+            When(hot_score__gt=x + 1e-9, then=current + Ln(1 - Exp(Value(x) - current))),
+            default=Value(None),
+            output_field=FloatField(),
+        )
+    # Marked changed too, so delta syncs send the new score (and the counts behind it).
+    sync.touch(model.objects.filter(pk=pk), hot_score=new)
+
+
+def record(content_type: str, content_id, action: str, at: Optional[datetime] = None, undo: bool = False):
+    """Fold one event into the post's score, or take it back out when ``undo`` (an unlike)."""
+    model = _model(content_type)
+    x = log_weight(action, at or timezone.now())
+    if model is None or x is None:
+        return
+    _fold(model, content_id, x, undo)
+
+
+def _same(a: Optional[float], b: Optional[float]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=0, abs_tol=1e-9)
+
+
+def _logsumexp(values: List[float]) -> float:
+    top = max(values)
+    return top + math.log(sum(math.exp(v - top) for v in values))
+
+
+def event_key(source: str, pk, undo: bool = False) -> str:
+    """Identity of one fold, e.g. ``engagement:42`` or ``comment:7:undo``."""
+    return f"{source}:{pk}:undo" if undo else f"{source}:{pk}"
+
+
+def record_many(events: List[dict]):
+    """Fold many events at once: one UPDATE per post for its additions and one for its undos.
+
+    Each event is a dict with ``content_type``, ``content_id``, ``action``,
+    ``at`` (ISO datetime) and optionally ``undo`` and ``key`` (see
+    ``event_key``). Runs in one transaction; events whose key was already
+    applied are skipped, so a retried or redelivered batch counts once.
+    """
+    from .models import TrendingEvent
+
+    with transaction.atomic():
+        keys = {event["key"] for event in events if event.get("key")}
+        applied = set(TrendingEvent.objects.filter(key__in=list(keys)).values_list("key", flat=True)) if keys else set()
+        # A concurrent delivery inserting the same keys makes this fail and roll back; the retry then skips them.
+        TrendingEvent.objects.bulk_create([TrendingEvent(key=key) for key in keys - applied])
+        grouped = {}
+        for event in events:
+            if event.get("key") in applied:
+                continue
+            x = log_weight(event["action"], datetime.fromisoformat(event["at"]))
+            if x is not None:
+                key = (event["content_type"], int(event["content_id"]))
+                grouped.setdefault(key, ([], []))[bool(event.get("undo"))].append(x)
+        for (content_type, content_id), (added, undone) in grouped.items():
+            model = _model(content_type)
+            if model is None:
+                continue
+            # Additions first, so an unlike batched with its own like never finds the score too small.
+            if added:
+                _fold(model, content_id, _logsumexp(added), undo=False)
+            if undone:
+                _fold(model, content_id, _logsumexp(undone), undo=True)
+
+
+def trending_first(*groups: List[dict]) -> List[dict]:
+    """Merge serialized posts hottest first; unscored posts follow, newest first."""
+    items = sorted((item for group in groups for item in group), key=lambda x: x["created_at"], reverse=True)
+    return sorted(items, key=lambda x: (x.get("hot_score") is not None, x.get("hot_score") or 0.0), reverse=True)
+
+
+def hottest(queryset, limit: int):
+    """``queryset`` narrowed to its ``limit`` hottest posts, unscored ones filling up newest first.
+
+    Both halves are ordered LIMIT queries, so they walk the hot_score and
+    created_at indexes instead of sorting every post.
+    """
+    ids = list(
+        queryset.filter(hot_score__isnull=False).order_by("-hot_score", "-created_at").values_list("pk", flat=True)[:limit]
+    )
+    if len(ids) < limit:
+        ids += queryset.filter(hot_score__isnull=True).order_by("-created_at").values_list("pk", flat=True)[:limit - len(ids)]
+    return queryset.filter(pk__in=ids)
+
+
+def _claim_pending(now: datetime):
+    """Mark queued ``record_many`` events up to ``now`` as applied: ``renormalize`` counts them itself."""
+    from taskqueue.models import Task
+
+    from .models import TrendingEvent
+    from .tasks import record_trending
+
+    pending = Task.objects.filter(name=record_trending.task_name, status__in=[Task.QUEUED, Task.RUNNING])
+    keys = set()
+    for payload in pending.values_list("payload", flat=True).iterator(chunk_size=1000):
+        for event in payload if isinstance(payload, list) else [payload]:
+            if event.get("key") and datetime.fromisoformat(event["at"]) <= now:
+                keys.add(event["key"])
+    # A batch already folding one of these fails on the conflict and, on retry, skips it.
+    TrendingEvent.objects.bulk_create([TrendingEvent(key=key) for key in keys], batch_size=500, ignore_conflicts=True)
+
+
+def _late(content_type: str, ids: List[int], now: datetime) -> Dict[int, List[float]]:
+    """Log-weights of events after ``now`` that are already folded into the posts' scores."""
+    from engagement.models import Comment, EngagementLog
+
+    from .models import TrendingEvent
+
+    events = [
+        ("engagement", pk, content_id, action, at)
+        for pk, content_id, action, at in EngagementLog.objects.filter(
+            content_type=content_type, content_id__in=ids, action__in=list(weights()), created_at__gt=now
+        ).values_list("pk", "content_id", "action", "created_at")
+    ] + [
+        ("comment", pk, content_id, "comment", at)
+        for pk, content_id, at in Comment.objects.filter(
+            content_type=content_type, content_id__in=ids, created_at__gt=now
+        ).values_list("pk", "content_id", "created_at")
+    ]
+    if getattr(settings, "TRENDING_DEFERRED", False) and events:
+        # Deferred events count once the worker has folded them; the rest it folds on top later.
+        applied = set(TrendingEvent.objects.filter(
+            key__in=[event_key(source, pk) for source, pk, *_ in events]
+        ).values_list("key", flat=True))
+        events = [event for event in events if event_key(event[0], event[1]) in applied]
+    late: Dict[int, List[float]] = {}
+    for _, _, content_id, action, at in events:
+        x = log_weight(action, at)
+        if x is not None:
+            late.setdefault(content_id, []).append(x)
+    return late
+
+
+def renormalize(horizon_half_lives: float = 20, now: Optional[datetime] = None, batch_size: int = 500) -> Dict[str, int]:
+    """Recompute every score from EngagementLog and Comment.
+
+    Repairs drift from events that bypassed ``record`` (bulk loads, deletes,
+    weight changes) and clears scores whose decayed value has dropped below
+    ``2 ** -horizon_half_lives``, so the index only holds posts that can trend.
+    Events up to the start are recomputed; scores are then written in batches
+    under row locks, adding back events recorded since the start, so folds
+    that ran meanwhile are not lost. Also forgets ``record_many`` event keys
+    older than the horizon. Returns the number of scored posts per content type.
+    """
+    from engagement.models import Comment, EngagementLog
+
+    from .models import TrendingEvent
+
+    now = now or timezone.now()
+    horizon = timedelta(hours=getattr(settings, "TRENDING_HALF_LIFE_HOURS", 24) * horizon_half_lives)
+    cutoff = now - horizon
+    floor = decay_rate() * (cutoff - epoch()).total_seconds()
+    if getattr(settings, "TRENDING_DEFERRED", False):
+        _claim_pending(now)
+
+    scores: Dict[str, Dict[int, float]] = {"job": {}, "opportunity": {}}
+
+    def add(content_type, content_id, action, at):
+        bucket = scores.get(content_type)
+        x = log_weight(action, at)
+        if bucket is None or x is None:
+            return
+        a = bucket.get(content_id)
+        bucket[content_id] = x if a is None else max(a, x) + math.log1p(math.exp(-abs(a - x)))
+
+    events = EngagementLog.objects.filter(
+        content_type__in=list(scores), action__in=list(weights()), created_at__gte=cutoff, created_at__lte=now
+    ).values_list("content_type", "content_id", "action", "created_at")
+    for content_type, content_id, action, at in events.iterator(chunk_size=5000):
+        add(content_type, content_id, action, at)
+    comments = Comment.objects.filter(
+        content_type__in=list(scores), created_at__gte=cutoff, created_at__lte=now
+    ).values_list("content_type", "content_id", "created_at")
+    for content_type, content_id, at in comments.iterator(chunk_size=5000):
+        add(content_type, content_id, "comment", at)
+
+    counts = {}
+    for content_type, bucket in scores.items():
+        model = _model(content_type)
+        live = {pk: score for pk, score in bucket.items() if score >= floor}
+        # Everything scored now or about to be; ids only, in bounded batches below.
+        targets = sorted(set(live).union(model.objects.filter(hot_score__isnull=False).values_list("pk", flat=True)))
+        scored = 0
+        for start in range(0, len(targets), batch_size):
+            ids = targets[start:start + batch_size]
+            with transaction.atomic():
+                rows = list(model.objects.select_for_update().filter(pk__in=ids).only("pk", "hot_score"))
+                late = _late(content_type, [row.pk for row in rows], now)
+                changed = []
+                for row in rows:
+                    values = ([live[row.pk]] if row.pk in live else []) + late.get(row.pk, [])
+                    score = _logsumexp(values) if values else None
+                    scored += score is not None
+                    if not _same(row.hot_score, score):
+                        row.hot_score = score
+                        changed.append(row)
+                if changed:
+                    # Only repaired scores count as changes; rewriting the rest would resend them to every delta sync.
+                    seq = sync.next_seq()
+                    for row in changed:
+                        row.change_seq = seq
+                    model.objects.bulk_update(changed, ["hot_score", "change_seq"])
+        counts[content_type] = scored
+    # Keys only guard against redelivery, which happens within hours; older ones can go.
+    TrendingEvent.objects.filter(applied_at__lt=cutoff).delete()
+    return counts
@@ -1,7 +1,12 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 from .views import FeedViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r"", FeedViewSet, basename="feed")
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("global_feed/async/", async_views.global_feed, name="feed-global-async"),
+    path("live/", async_views.live_counts, name="feed-live"),
+] + router.urls
@@ -1,73 +1,97 @@
-from math import sqrt
+import heapq
 from typing import List, Dict, Any
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
 from django.db.models import Q
 from .models import FeedContent
 from .serializers import FeedContentSerializer
-from ads.models import Advertisement
-from engagement.models import EngagementLog, Comment
-from jobs.models import Job
-from opportunities.models import Opportunity
-from jobs.serializers import JobSerializer
-from opportunities.serializers import OpportunitySerializer
-
-
-def proximity_score(user_loc, item_loc):
-    if not user_loc or not item_loc:
-        return 0.0
-    (ulat, ulon) = user_loc
-    (ilat, ilon) = item_loc
-    dist = sqrt((ulat - ilat) ** 2 + (ulon - ilon) ** 2)
-    return max(0.0, 1.0 - min(dist / 10.0, 1.0))
-
-
-def interest_score(interests: List[str], tags: List[str]):
-    if not interests or not tags:
-        return 0.1
-    inter = set(i.lower() for i in interests)
-    tset = set(t.lower() for t in tags)
-    overlap = inter.intersection(tset)
-    return 0.2 + (0.8 * (len(overlap) / max(len(tset), 1)))
-
-
-class FeedViewSet(viewsets.ModelViewSet):
+from ads.targeting import select_ads
+from engagement.models import EngagementLog
+from .ranking import rank_score
+from .recommender import blend, get_model, item_key
+from .aggregates import POST_KEEP_FIELDS, decorated_posts, newest_first
+from awasarhub.admission import admission
+from awasarhub.sparse import SparseFieldsViewMixin
+from .trending import hottest, trending_first
+from . import catalog, sync
+
+
+class FeedViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = FeedContent.objects.all().order_by("-created_at")
     serializer_class = FeedContentSerializer
     permission_classes = [permissions.AllowAny]
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    @admission("feed")
     def personalized(self, request):
         user = request.user
         interests = user.interests or []
         user_loc = user.location_tuple()
 
-        qs = FeedContent.objects.all()
-        results: List[Dict[str, Any]] = []
-        for item in qs:
-            pscore = proximity_score(user_loc, (item.latitude, item.longitude) if item.latitude is not None and item.longitude is not None else None)
-            iscore = interest_score(interests, item.tags or [])
-            rank = (0.6 * iscore) + (0.4 * pscore)
-            results.append({"rank": rank, "item": item})
-
-        results.sort(key=lambda x: x["rank"], reverse=True)
-        feed = [self.serializer_class(r["item"]).data for r in results]
-
-        ads = Advertisement.objects.filter(enabled=True)
-        ad_cards = []
-        for ad in ads[:3]:
-            ad_cards.append({
-                "content_type": "AD",
-                "title": ad.title,
-                "body": ad.body,
-                "source_url": ad.link_url,
-                "city": ad.city,
-                "latitude": ad.latitude,
-                "longitude": ad.longitude,
-                "created_at": ad.created_at.isoformat(),
+        # Ranks depend on the user's interests, location and the recommender version,
+        # so a token is only valid while those hold.
+        model = get_model()
+        scope = sync.fingerprint(interests, user_loc, model.version if model is not None else None)
+        state = sync.current()
+        try:
+            since = sync.parse(request.query_params.get("since"), state, scope)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        # Full refreshes are paged by rank (?offset=&limit=); "next" is the following page's offset.
+        try:
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+            limit = min(max(int(request.query_params.get("limit", settings.PERSONALIZED_FEED_LIMIT)), 1), 1000)
+        except ValueError:
+            return Response({"detail": "offset and limit must be integers"}, status=400)
+        end = offset + limit
+        snapshot = catalog.get_catalog()
+        if since is None and snapshot is not None:
+            # Rank ids straight from the shared catalog and load only the items that make the cut.
+            ids, ranks = catalog.all_feed_ranks(snapshot, interests, user_loc)
+            if model is not None:
+                ranks = blend(ranks, model.scores(user.id, [item_key("feed", pk) for pk in ids]))
+            # Items deleted since the snapshot still have ids there; skip them so pages start where they should.
+            gone = {row["id"] for row in sync.deleted(["feed"], snapshot.change_seq)}
+            top = heapq.nlargest(end + 1 + len(gone), range(len(ids)), key=ranks.__getitem__)
+            ranked = [i for i in top if ids[i] not in gone]
+            more = len(ranked) > end
+            page = FeedContent.objects.in_bulk([ids[i] for i in ranked[offset:end]])
+            results = [{"rank": ranks[i], "item": page[ids[i]]} for i in ranked[offset:end] if ids[i] in page]
+        else:
+            items = FeedContent.objects.all() if since is None else FeedContent.objects.filter(change_seq__gt=since)
+            items = list(items)
+            if snapshot is not None:
+                # Vectorised over the shared catalog; rows saved since it was built are ranked one by one.
+                ranks = [
+                    rank_score(interests, user_loc, item.tags, item.latitude, item.longitude) if rank is None else rank
+                    for rank, item in zip(catalog.feed_ranks(snapshot, items, interests, user_loc), items)
+                ]
+            else:
+                ranks = [rank_score(interests, user_loc, item.tags, item.latitude, item.longitude) for item in items]
+            if model is not None:
+                # Blend in collaborative-filtering affinity from the latest train_als run.
+                ranks = blend(ranks, model.scores(user.id, [item_key("feed", item.id) for item in items]))
+            results: List[Dict[str, Any]] = [{"rank": rank, "item": item} for rank, item in zip(ranks, items)]
+            results.sort(key=lambda x: x["rank"], reverse=True)
+            if since is None:
+                more = len(results) > end
+                results = results[offset:end]
+
+        feed = list(self.get_serializer([r["item"] for r in results], many=True).data)
+        for card, result in zip(feed, results):
+            card["rank"] = result["rank"]
+        if since is not None:
+            # Changed items carry their rank so the client can re-slot them; ads come with full refreshes.
+            return Response({
+                "items": feed, "deleted": sync.deleted(["feed"], since), "delta": True,
+                "since": sync.token(state.value, scope),
             })
 
+        # Only request as many ads as there are slots, so every selected ad is an impression.
+        ad_cards = [ad["card"] for ad in select_ads(user, min(3, len(feed) // 5))] if len(feed) >= 5 else []
+
         final_feed = []
         ad_index = 0
         for i, card in enumerate(feed):
@@ -76,34 +100,32 @@ class FeedViewSet(viewsets.ModelViewSet):
                 final_feed.append(ad_cards[ad_index])
                 ad_index += 1
 
-        return Response({"items": final_feed})
+        return Response({
+            "items": final_feed, "delta": False, "since": sync.token(state.value, scope),
+            "next": end if more else None,
+        })
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
+    @admission("feed")
     def global_feed(self, request):
-        jobs = Job.objects.all()
-        opportunities = Opportunity.objects.all()
-        
-        job_data = JobSerializer(jobs, many=True).data
-        opp_data = OpportunitySerializer(opportunities, many=True).data
-        
-        for j in job_data:
-            j['type'] = 'job'
-            j['likes'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='like').count()
-            j['comments'] = Comment.objects.filter(content_type='job', content_id=j['id']).count()
-            j['reposts'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='repost').count()
-            j['shares'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='share').count()
-            j['liked_by_user'] = EngagementLog.objects.filter(content_type='job', content_id=j['id'], action='like', user=request.user).exists()
-
-        for o in opp_data:
-            o['type'] = 'opportunity'
-            o['likes'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='like').count()
-            o['comments'] = Comment.objects.filter(content_type='opportunity', content_id=o['id']).count()
-            o['reposts'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='repost').count()
-            o['shares'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='share').count()
-            o['liked_by_user'] = EngagementLog.objects.filter(content_type='opportunity', content_id=o['id'], action='like', user=request.user).exists()
-
-        all_posts = sorted(job_data + opp_data, key=lambda x: x['created_at'], reverse=True)
-        return Response({"items": all_posts})
+        state = sync.current()
+        try:
+            since = sync.parse(request.query_params.get("since"), state)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        jobs, opportunities, removed = sync.changed_posts(since)
+        trending = request.query_params.get("sort") == "trending"
+        if trending:
+            limit = getattr(settings, "TRENDING_FEED_LIMIT", 100)
+            jobs, opportunities = hottest(jobs, limit), hottest(opportunities, limit)
+
+        keep = POST_KEEP_FIELDS + ("hot_score",) if trending else POST_KEEP_FIELDS
+        job_data, opp_data = decorated_posts(request, jobs, opportunities, keep)
+
+        all_posts = trending_first(job_data, opp_data)[:limit] if trending else newest_first(job_data, opp_data)
+        if since is not None:
+            return Response({"items": all_posts, "deleted": removed, "delta": True, "since": sync.token(state.value)})
+        return Response({"items": all_posts, "delta": False, "since": sync.token(state.value)})
 
     @action(detail=False, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def log(self, request):
@@ -4,5 +4,7 @@ from .models import Job
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
-    list_display = ("id", "company", "title", "city", "created_at")
+    list_display = ("id", "company", "title", "city", "created_at", "duplicate_of")
+    list_filter = (("duplicate_of", admin.EmptyFieldListFilter),)
+    raw_id_fields = ("duplicate_of",)
     search_fields = ("company", "title", "city", "tags")
@@ -1,8 +1,10 @@
 from django.db import models
 from django.conf import settings
 
+from feed.models import ChangeTracked
 
-class Job(models.Model):
+
+class Job(ChangeTracked):
     company = models.CharField(max_length=255)
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -13,6 +15,12 @@ class Job(models.Model):
     link_url = models.URLField(blank=True)
     posted_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # ln of the undecayed engagement sum, see feed.trending.
+    hot_score = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    # Set by feed.dedup when this is a near-copy of an earlier post; cleared by moderators if wrong.
+    duplicate_of = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, related_name="duplicates"
+    )
 
     def __str__(self):
         return f"{self.company} - {self.title}"
@@ -1,12 +1,15 @@
 from rest_framework import serializers
+
+from awasarhub.sparse import SparseFieldsetMixin
 from .models import Job
 from accounts.serializers import UserSerializer
 
 
-class JobSerializer(serializers.ModelSerializer):
+class JobSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     posted_by_details = UserSerializer(source='posted_by', read_only=True)
 
     class Meta:
         model = Job
         fields = "__all__"
-        read_only_fields = ["posted_by", "created_at"]
+        expandable_fields = ["posted_by_details"]
+        read_only_fields = ["posted_by", "created_at", "duplicate_of"]
@@ -0,0 +1,20 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from jobs.models import Job
+
+
+@override_settings(ADMISSION_CONTROL={})
+class JobApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="poster"))
+        self.job = Job.objects.create(company="Acme", title="Python developer", description="Django APIs")
+        self.other = Job.objects.create(company="Globex", title="Accountant", description="Monthly statements")
+
+    def test_duplicate_of_is_read_only(self):
+        response = self.client.patch(f"/api/jobs/{self.other.pk}/", {"duplicate_of": self.job.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["duplicate_of"])
+        self.assertIsNone(Job.objects.get(pk=self.other.pk).duplicate_of_id)
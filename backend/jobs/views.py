@@ -1,12 +1,24 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from awasarhub.sparse import SparseFieldsViewMixin
+from feed.bulk_import import ImportFileMixin
+from feed.related import related_payload
 from .models import Job
 from .serializers import JobSerializer
 
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(SparseFieldsViewMixin, ImportFileMixin, viewsets.ModelViewSet):
     queryset = Job.objects.all().order_by("-created_at")
     serializer_class = JobSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    import_kind = "job"
 
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user)
+
+    @action(detail=True, methods=["get"])
+    def related(self, request, pk=None):
+        item = self.get_object()
+        return Response({"items": related_payload("job", item.pk)})
@@ -4,5 +4,7 @@ from .models import Opportunity
 
 @admin.register(Opportunity)
 class OpportunityAdmin(admin.ModelAdmin):
-    list_display = ("id", "org", "title", "category", "city", "created_at")
+    list_display = ("id", "org", "title", "category", "city", "created_at", "duplicate_of")
+    list_filter = (("duplicate_of", admin.EmptyFieldListFilter),)
+    raw_id_fields = ("duplicate_of",)
     search_fields = ("org", "title", "category", "city", "tags")
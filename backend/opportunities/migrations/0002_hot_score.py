@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunity',
+            name='hot_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-19 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0002_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunity',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='opportunities.opportunity'),
+        ),
+    ]
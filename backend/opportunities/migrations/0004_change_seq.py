@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunities', '0003_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunity',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
@@ -1,11 +1,15 @@
 from rest_framework import serializers
+
+from awasarhub.sparse import SparseFieldsetMixin
 from .models import Opportunity
 from accounts.serializers import UserSerializer
 
 
-class OpportunitySerializer(serializers.ModelSerializer):
+class OpportunitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     posted_by_details = UserSerializer(source='posted_by', read_only=True)
 
     class Meta:
         model = Opportunity
         fields = "__all__"
+        expandable_fields = ["posted_by_details"]
+        read_only_fields = ["duplicate_of"]
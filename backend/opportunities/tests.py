@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from opportunities.models import Opportunity
+
+
+@override_settings(ADMISSION_CONTROL={})
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="org", city="Pune")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.item = Opportunity.objects.create(
+            org="Arts council", title="Design grant", description="Funding", category="grant", posted_by=self.user
+        )
+
+    def test_everything_without_parameters(self):
+        item = self.client.get(f"/api/opportunities/{self.item.pk}/").data
+        self.assertEqual(item["description"], "Funding")
+        self.assertEqual(item["posted_by_details"]["username"], "org")
+
+    def test_fields_trim_the_response_and_the_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            items = self.client.get("/api/opportunities/", {"fields": "id,title"}).data
+        self.assertEqual(items, [{"id": self.item.pk, "title": "Design grant"}])
+        select = next(q["sql"] for q in queries if "opportunities_opportunity" in q["sql"])
+        self.assertNotIn('"description"', select)
+
+    def test_nested_fields_and_expand(self):
+        item = self.client.get(f"/api/opportunities/{self.item.pk}/", {"fields": "title,posted_by_details.city"}).data
+        self.assertEqual(item, {"title": "Design grant", "posted_by_details": {"city": "Pune"}})
+        # Embedded objects are left out of trimmed responses unless expanded.
+        item = self.client.get(f"/api/opportunities/{self.item.pk}/", {"expand": ""}).data
+        self.assertNotIn("posted_by_details", item)
+        self.assertIn("description", item)
+        item = self.client.get(f"/api/opportunities/{self.item.pk}/", {"expand": "posted_by_details"}).data
+        self.assertEqual(item["posted_by_details"]["username"], "org")
+
+    def test_writes_ignore_the_fieldset(self):
+        response = self.client.post(
+            "/api/opportunities/?fields=id",
+            {"org": "NGO", "title": "Internship", "description": "Six months"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["description"], "Six months")
@@ -1,12 +1,24 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from awasarhub.sparse import SparseFieldsViewMixin
+from feed.bulk_import import ImportFileMixin
+from feed.related import related_payload
 from .models import Opportunity
 from .serializers import OpportunitySerializer
 
 
-class OpportunityViewSet(viewsets.ModelViewSet):
+class OpportunityViewSet(SparseFieldsViewMixin, ImportFileMixin, viewsets.ModelViewSet):
     queryset = Opportunity.objects.all().order_by("-created_at")
     serializer_class = OpportunitySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    import_kind = "opportunity"
 
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user)
+
+    @action(detail=True, methods=["get"])
+    def related(self, request, pk=None):
+        item = self.get_object()
+        return Response({"items": related_payload("opportunity", item.pk)})
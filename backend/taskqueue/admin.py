@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "attempts", "max_attempts", "run_at", "created_at")
+    list_filter = ("status", "name")
+    search_fields = ("name__startswith",)
+    actions = ("retry_now",)
+
+    @admin.action(description="Run again now (resets attempts)")
+    def retry_now(self, request, queryset):
+        queryset.exclude(status=Task.RUNNING).update(
+            status=Task.QUEUED, attempts=0, run_at=timezone.now(), last_error="",
+        )
@@ -0,0 +1,35 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from taskqueue.queue import registry
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks on a thread or process pool until stopped (SIGTERM/SIGINT finish running tasks first)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Pool size, i.e. units of work run at once")
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread",
+                            help="Threads suit I/O-bound tasks; processes suit CPU-bound ones such as image resizing")
+        parser.add_argument("--task", action="append", dest="names", metavar="NAME",
+                            help="Only run this task (repeatable); default all")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls when idle")
+        parser.add_argument("--burst", action="store_true", help="Exit once no task is due")
+
+    def handle(self, *args, **options):
+        unknown = set(options["names"] or ()) - set(registry)
+        if unknown:
+            raise CommandError(f"Unknown task(s): {', '.join(sorted(unknown))}. Registered: {', '.join(sorted(registry))}")
+        worker = Worker(options["concurrency"], options["pool"], options["names"], options["poll_interval"])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Worker {worker.id}: {options['concurrency']} in a {options['pool']} pool, tasks: "
+                          f"{', '.join(options['names'] or sorted(registry)) or '(none registered)'}")
+        start = time.perf_counter()
+        worker.run(burst=options["burst"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stopped after {time.perf_counter() - start:.1f}s: {worker.succeeded} succeeded, {worker.failed} failed"
+        ))
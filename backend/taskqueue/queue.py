@@ -0,0 +1,97 @@
+"""Registering and enqueueing background tasks.
+
+A task is a function in some app's ``tasks.py`` decorated with ``@task``. It
+receives the JSON payload it was enqueued with, or, for tasks registered with
+``batch_size > 1``, a list of up to that many payloads that the worker claimed
+together. Enqueueing is a single INSERT into the ``Task`` table; the
+``run_tasks`` command executes them (see ``taskqueue.worker``).
+
+Tasks may run more than once (a retry after a failure, or a worker that died
+mid-task), so handlers should be idempotent.
+"""
+import functools
+import random
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+class TaskSpec:
+    def __init__(self, name: str, func: Callable, priority: int = 0, max_attempts: Optional[int] = None,
+                 backoff: Optional[float] = None, batch_size: int = 1):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.batch_size = batch_size
+
+    def attempts(self) -> int:
+        return self.max_attempts or getattr(settings, "TASKS_MAX_ATTEMPTS", 5)
+
+    def retry_delay(self, attempt: int) -> float:
+        """Seconds before retrying after failed attempt ``attempt`` (1-based): exponential with jitter, capped."""
+        base = self.backoff if self.backoff is not None else getattr(settings, "TASKS_RETRY_BACKOFF", 10)
+        delay = min(base * 2 ** (attempt - 1), getattr(settings, "TASKS_MAX_BACKOFF", 3600))
+        # Jitter spreads out the retries of tasks that failed together (e.g. during an outage).
+        return delay * random.uniform(0.5, 1.0)
+
+
+registry: Dict[str, TaskSpec] = {}
+
+
+def task(name: Optional[str] = None, *, priority: int = 0, max_attempts: Optional[int] = None,
+         backoff: Optional[float] = None, batch_size: int = 1):
+    """Register a task handler under ``name`` (default ``<module>.<function>``)."""
+
+    def decorator(func):
+        spec = TaskSpec(name or f"{func.__module__}.{func.__name__}", func, priority, max_attempts, backoff, batch_size)
+        registry[spec.name] = spec
+        func.task_name = spec.name
+        func.enqueue = functools.partial(enqueue, spec.name)
+        return func
+
+    return decorator
+
+
+def get(name: str) -> TaskSpec:
+    try:
+        return registry[name]
+    except KeyError:
+        raise LookupError(f"No task registered as {name!r}") from None
+
+
+def _build(spec: TaskSpec, payload, priority: Optional[int], delay: float):
+    from .models import Task
+
+    return Task(
+        name=spec.name,
+        payload=payload if payload is not None else {},
+        priority=spec.priority if priority is None else priority,
+        max_attempts=spec.attempts(),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(task_or_name: Union[str, Callable], payload=None, *, priority: Optional[int] = None,
+            delay: float = 0, on_commit: bool = False):
+    """Queue one run of a task. With ``on_commit`` the row is written only once the current transaction commits."""
+    spec = get(getattr(task_or_name, "task_name", task_or_name))
+    row = _build(spec, payload, priority, delay)
+    if on_commit:
+        transaction.on_commit(row.save)
+    else:
+        row.save()
+    return row
+
+
+def enqueue_many(task_or_name: Union[str, Callable], payloads: Iterable, *, priority: Optional[int] = None,
+                 delay: float = 0):
+    """Queue one run per payload with a single multi-row INSERT."""
+    from .models import Task
+
+    spec = get(getattr(task_or_name, "task_name", task_or_name))
+    return Task.objects.bulk_create([_build(spec, payload, priority, delay) for payload in payloads])
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from taskqueue import queue, worker
+from taskqueue.models import Task
+
+calls = []
+
+
+@queue.task(name="tests.remember")
+def remember(payload):
+    calls.append(payload["n"])
+
+
+@queue.task(name="tests.remember_many", batch_size=3)
+def remember_many(payloads):
+    calls.append(sorted(p["n"] for p in payloads))
+
+
+@queue.task(name="tests.explode", max_attempts=2, backoff=60)
+def explode(payload):
+    raise RuntimeError("boom")
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_on_commit_waits_for_the_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            remember.enqueue({"n": 1}, on_commit=True)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(list(Task.objects.values_list("name", "payload")), [("tests.remember", {"n": 1})])
+
+    def test_claims_are_exclusive_and_by_priority(self):
+        queue.enqueue_many(remember, [{"n": n} for n in range(3)])
+        urgent = remember.enqueue({"n": 9}, priority=5)
+        later = remember.enqueue({"n": 10}, delay=60)
+        first = worker.claim("a", 2)
+        second = worker.claim("b", 5)
+        self.assertEqual(first[0].pk, urgent.pk)
+        self.assertEqual(len(first) + len(second), 4)
+        self.assertFalse({t.pk for t in first} & {t.pk for t in second})
+        self.assertNotIn(later.pk, {t.pk for t in first + second})
+        self.assertEqual(worker.claim("c", 5), [])
+
+    def test_batched_tasks_are_claimed_together(self):
+        queue.enqueue_many(remember_many, [{"n": n} for n in range(5)])
+        remember.enqueue({"n": 9})
+        # Two claimed rows of a batched task are topped up to a full batch.
+        units = worker.claim_units("a", 2)
+        self.assertEqual([[t.payload["n"] for t in unit] for unit in units], [[0, 1, 2]])
+        units = worker.claim_units("a", 3)
+        self.assertEqual(sorted((unit[0].name, len(unit)) for unit in units), [("tests.remember", 1), ("tests.remember_many", 2)])
+
+    def test_failures_back_off_then_fail_for_good(self):
+        explode.enqueue({})
+        for attempt in (1, 2):
+            Task.objects.update(run_at=timezone.now())
+            unit = worker.claim("a", 1)
+            error = worker.execute(unit[0].name, [t.payload for t in unit])
+            self.assertIn("RuntimeError: boom", error)
+            with self.assertLogs("taskqueue.worker"):
+                worker.settle("a", unit, error)
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts, row.locked_by), (Task.FAILED, 2, ""))
+        self.assertIn("boom", row.last_error)
+
+    def test_retry_is_delayed(self):
+        explode.enqueue({})
+        unit = worker.claim("a", 1)
+        with self.assertLogs("taskqueue.worker", "WARNING"):
+            worker.settle("a", unit, "boom")
+        row = Task.objects.get()
+        self.assertEqual(row.status, Task.QUEUED)
+        self.assertGreaterEqual(row.run_at, timezone.now() + timedelta(seconds=25))
+
+    def test_expired_leases_are_handed_out_again(self):
+        remember.enqueue({"n": 1})
+        explode.enqueue({})
+        worker.claim("dead", 2)
+        Task.objects.filter(name="tests.explode").update(attempts=2)
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(worker.requeue_expired(), 1)
+        self.assertEqual(dict(Task.objects.values_list("name", "status")),
+                         {"tests.remember": Task.QUEUED, "tests.explode": Task.FAILED})
+        self.assertEqual(len(worker.claim("alive", 2)), 1)
+
+
+class WorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_run_drains_the_queue(self):
+        queue.enqueue_many(remember, [{"n": n} for n in range(4)])
+        queue.enqueue_many(remember_many, [{"n": n} for n in range(3)])
+        explode.enqueue({})
+        run = worker.Worker(concurrency=2, names=["tests.remember", "tests.remember_many", "tests.explode"],
+                            poll_interval=0.01)
+        with self.assertLogs("taskqueue.worker", "WARNING"):
+            run.run(burst=True)
+        self.assertEqual(sorted(n for n in calls if isinstance(n, int)), [0, 1, 2, 3])
+        self.assertIn([0, 1, 2], calls)
+        self.assertEqual((run.succeeded, run.failed), (7, 1))
+        # Only the failed task is left, waiting for its retry.
+        self.assertEqual(list(Task.objects.values_list("name", "status")), [("tests.explode", Task.QUEUED)])
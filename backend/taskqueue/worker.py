@@ -0,0 +1,203 @@
+"""Claiming, running and settling queued tasks: the loop behind ``run_tasks``.
+
+A worker claims rows by marking them RUNNING with its id and a lease in one
+UPDATE guarded by ``status = 'queued'``, so two workers polling the same table
+never both win a task; on PostgreSQL the candidate SELECT also uses
+``FOR UPDATE SKIP LOCKED`` so they do not wait on each other. Rows left
+RUNNING by a worker that died are handed out again once their lease expires.
+
+Claimed tasks run on a thread or process pool. Tasks registered with
+``batch_size > 1`` are claimed and run in same-name groups. A successful task
+row is deleted; a failed one is retried after an exponential backoff until
+``max_attempts``, then kept as FAILED for inspection in the admin.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+from .queue import TaskSpec, get, registry
+
+logger = logging.getLogger(__name__)
+
+
+def new_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def lease_seconds() -> int:
+    return getattr(settings, "TASKS_LEASE_SECONDS", 300)
+
+
+def claim(worker: str, limit: int, names: Optional[Iterable[str]] = None) -> List[Task]:
+    """Lease up to ``limit`` due tasks to ``worker``, highest priority first."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = Task.objects.select_for_update(skip_locked=True).filter(status=Task.QUEUED, run_at__lte=now)
+        if names:
+            candidates = candidates.filter(name__in=list(names))
+        ids = list(candidates.order_by("-priority", "run_at", "id").values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids, status=Task.QUEUED).update(
+            status=Task.RUNNING,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=lease_seconds()),
+            attempts=F("attempts") + 1,
+        )
+    # Rows another worker won in the meantime carry its id, not ours.
+    return list(
+        Task.objects.filter(id__in=ids, status=Task.RUNNING, locked_by=worker).order_by("-priority", "run_at", "id")
+    )
+
+
+def claim_units(worker: str, slots: int, names: Optional[Iterable[str]] = None) -> List[List[Task]]:
+    """Up to ``slots`` units of work: single tasks, or same-name groups of up to ``batch_size`` for batched tasks."""
+    groups = {}
+    for claimed in claim(worker, slots, names):
+        groups.setdefault(claimed.name, []).append(claimed)
+    units = []
+    for name, group in groups.items():
+        spec = registry.get(name)
+        if spec is None or spec.batch_size <= 1:
+            units.extend([claimed] for claimed in group)
+            continue
+        if len(group) < spec.batch_size:
+            group += claim(worker, spec.batch_size - len(group), [name])
+        units.extend(group[i:i + spec.batch_size] for i in range(0, len(group), spec.batch_size))
+    return units
+
+
+def execute(name: str, payloads: list) -> Optional[str]:
+    """Run one unit of work; the traceback of a failure, or None. Safe to call in a pool process."""
+    close_old_connections()
+    try:
+        spec = get(name)
+        spec.func(payloads if spec.batch_size > 1 else payloads[0])
+        return None
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        close_old_connections()
+
+
+def settle(worker: str, tasks: List[Task], error: Optional[str] = None):
+    """Delete tasks that succeeded; schedule a retry, or mark FAILED, for those that did not."""
+    ids = [t.pk for t in tasks]
+    if error is None:
+        Task.objects.filter(id__in=ids, locked_by=worker).delete()
+        return
+    now = timezone.now()
+    for failed in tasks:
+        rows = Task.objects.filter(pk=failed.pk, locked_by=worker)
+        if failed.attempts >= failed.max_attempts:
+            rows.update(status=Task.FAILED, locked_by="", locked_until=None, last_error=error)
+            logger.error("Task %s#%s failed for good after %d attempts:\n%s", failed.name, failed.pk, failed.attempts, error)
+        else:
+            spec = registry.get(failed.name) or TaskSpec(failed.name, None)
+            delay = spec.retry_delay(failed.attempts)
+            rows.update(
+                status=Task.QUEUED, locked_by="", locked_until=None, last_error=error,
+                run_at=now + timedelta(seconds=delay),
+            )
+            logger.warning("Task %s#%s failed (attempt %d), retrying in %.0fs", failed.name, failed.pk, failed.attempts, delay)
+
+
+def requeue_expired() -> int:
+    """Hand out again the tasks whose worker's lease ran out; those with no attempts left fail."""
+    now = timezone.now()
+    expired = Task.objects.filter(status=Task.RUNNING, locked_until__lt=now)
+    expired.filter(attempts__gte=F("max_attempts")).update(
+        status=Task.FAILED, locked_by="", locked_until=None, last_error="Lease expired before the task finished.",
+    )
+    return expired.update(status=Task.QUEUED, locked_by="", locked_until=None, run_at=now)
+
+
+def _init_process():
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+class Worker:
+    def __init__(self, concurrency: int = 4, pool: str = "thread", names: Optional[Iterable[str]] = None,
+                 poll_interval: float = 1.0):
+        self.id = new_worker_id()
+        self.concurrency = concurrency
+        self.pool = pool
+        self.names = list(names or ())
+        self.poll_interval = poll_interval
+        self.succeeded = self.failed = 0
+        self._stop = threading.Event()
+
+    def stop(self, *args):
+        """Stop claiming; tasks already running are finished and settled."""
+        self._stop.set()
+
+    def _executor(self):
+        if self.pool == "process":
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            return ProcessPoolExecutor(max_workers=self.concurrency, initializer=_init_process)
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="task")
+
+    def run(self, burst: bool = False):
+        """Work until stopped, or with ``burst`` until nothing is due and nothing is running."""
+        inflight = {}
+        next_sweep = 0.0
+        executor = self._executor()
+        try:
+            while True:
+                if time.monotonic() >= next_sweep:
+                    requeue_expired()
+                    next_sweep = time.monotonic() + min(lease_seconds(), 60)
+                contended = False
+                if not self._stop.is_set():
+                    try:
+                        units = claim_units(self.id, self.concurrency - len(inflight), self.names)
+                    except DatabaseError:
+                        # E.g. SQLite's "database is locked" while another worker writes; poll again.
+                        logger.warning("Could not claim tasks", exc_info=True)
+                        units, contended = [], True
+                    for unit in units:
+                        future = executor.submit(execute, unit[0].name, [t.payload for t in unit])
+                        inflight[future] = unit
+                if not inflight:
+                    if (burst and not contended) or self._stop.is_set():
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                done, _ = wait(inflight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = inflight.pop(future)
+                    try:
+                        error = future.result()
+                    except Exception:
+                        # The pool itself broke (e.g. a child process was killed).
+                        error = traceback.format_exc()
+                    try:
+                        settle(self.id, unit, error)
+                    except DatabaseError:
+                        # The rows stay leased to us and are handed out again when the lease expires.
+                        logger.warning("Could not settle %d task(s)", len(unit), exc_info=True)
+                    if error is None:
+                        self.succeeded += len(unit)
+                    else:
+                        self.failed += len(unit)
+        finally:
+            executor.shutdown(wait=True)